@@ -0,0 +1,88 @@
+"""
+Benchmark del perfil de rendimiento de SQLite (PRAGMA e índices).
+
+Compara, sobre la misma carga de datos, las consultas de status de tareas y
+de eventos recientes con el perfil "seguro" sin índices (como las bases
+antiguas) y con el perfil "rendimiento" con los índices de `INDICES_SQLITE`.
+
+Uso:
+    python scripts/benchmark_sqlite.py [tareas] [eventos] [repeticiones]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.recoleccion.database.database_manager import DatabaseManager, INDICES_SQLITE  # noqa: E402
+from src.recoleccion.models.alimento import Alimento  # noqa: E402
+from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion  # noqa: E402
+from src.recoleccion.models.estado_tarea import EstadoTarea  # noqa: E402
+
+
+def poblar(db: DatabaseManager, tareas: int, eventos: int):
+    """Carga alimentos, tareas en varios estados y eventos."""
+    estados = [EstadoTarea.PENDIENTE, EstadoTarea.EN_PROCESO, EstadoTarea.COMPLETADA, EstadoTarea.CANCELADA]
+    db.iniciar_transaccion()
+    for i in range(tareas):
+        alimento = Alimento(
+            id=f"A{i}", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60
+        )
+        db.guardar_alimento(alimento)
+        db.guardar_tarea(TareaRecoleccion(id=f"T{i}", alimento=alimento, estado=estados[i % len(estados)]))
+    db.confirmar_transaccion()
+    lote = [("tarea_guardada", f"Evento {i}", {"i": i}) for i in range(eventos)]
+    for inicio in range(0, eventos, 1000):
+        db.guardar_eventos(lote[inicio:inicio + 1000])
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Milisegundos por llamada (media de `repeticiones`)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def ejecutar(perfil: str, con_indices: bool, tareas: int, eventos: int, repeticiones: int) -> dict:
+    """Crea una base temporal con el perfil indicado y mide las consultas."""
+    os.environ["SQLITE_PERFIL"] = perfil
+    with tempfile.TemporaryDirectory() as directorio:
+        db = DatabaseManager(os.path.join(directorio, "benchmark.db"))
+        if not con_indices:
+            for nombre, _ in INDICES_SQLITE:
+                db.connection.execute(f"DROP INDEX IF EXISTS {nombre}")
+            db.connection.commit()
+        inicio = time.perf_counter()
+        poblar(db, tareas, eventos)
+        carga_ms = (time.perf_counter() - inicio) * 1000
+        resultado = {
+            "carga": carga_ms,
+            "status en_proceso": medir(lambda: db.obtener_tareas_por_estado(EstadoTarea.EN_PROCESO), repeticiones),
+            "eventos recientes": medir(lambda: db.obtener_eventos(50), repeticiones),
+        }
+        db.cerrar()
+    return resultado
+
+
+def main():
+    """Ejecuta el benchmark antes/después e imprime la comparación."""
+    tareas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    antes = ejecutar("seguro", False, tareas, eventos, repeticiones)
+    despues = ejecutar("rendimiento", True, tareas, eventos, repeticiones)
+
+    print(f"\n=== SQLite: {tareas} tareas, {eventos} eventos, {repeticiones} repeticiones ===")
+    print(f"{'consulta':<20}{'antes (ms)':>14}{'después (ms)':>16}{'mejora':>10}")
+    for consulta in antes:
+        mejora = antes[consulta] / despues[consulta] if despues[consulta] else float("inf")
+        print(f"{consulta:<20}{antes[consulta]:>14.2f}{despues[consulta]:>16.2f}{mejora:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
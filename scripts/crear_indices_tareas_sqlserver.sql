@@ -0,0 +1,39 @@
+-- Script para crear los indices de consulta de tareas en SQL Server
+-- Ejecutar en la base de datos Hormiguero
+-- Soportan las busquedas por estado y la carga de lotes/asignaciones por tarea
+
+-- Indice por estado de tarea
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Tareas_estado' AND object_id = OBJECT_ID(N'dbo.Tareas'))
+BEGIN
+    CREATE INDEX IX_Tareas_estado ON dbo.Tareas (estado);
+    PRINT 'Indice IX_Tareas_estado creado';
+END
+GO
+
+-- Indice de lotes por tarea
+IF EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'dbo.lotes_hormigas') AND type in (N'U'))
+   AND NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_lotes_hormigas_tarea' AND object_id = OBJECT_ID(N'dbo.lotes_hormigas'))
+BEGIN
+    CREATE INDEX IX_lotes_hormigas_tarea ON dbo.lotes_hormigas (tarea_id);
+    PRINT 'Indice IX_lotes_hormigas_tarea creado';
+END
+GO
+
+-- Indices de asignaciones por tarea y por lote
+IF EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'dbo.asignaciones_hormiga_tarea') AND type in (N'U'))
+BEGIN
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_asignaciones_tarea' AND object_id = OBJECT_ID(N'dbo.asignaciones_hormiga_tarea'))
+    BEGIN
+        CREATE INDEX IX_asignaciones_tarea ON dbo.asignaciones_hormiga_tarea (tarea_id);
+        PRINT 'Indice IX_asignaciones_tarea creado';
+    END
+
+    IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_asignaciones_lote' AND object_id = OBJECT_ID(N'dbo.asignaciones_hormiga_tarea'))
+    BEGIN
+        CREATE INDEX IX_asignaciones_lote ON dbo.asignaciones_hormiga_tarea (lote_id);
+        PRINT 'Indice IX_asignaciones_lote creado';
+    END
+END
+GO
+
+PRINT 'Script completado';
@@ -141,7 +141,7 @@ try {
     Write-Host "   Verificando estado final..." -ForegroundColor Cyan
     $statusFinal = Invoke-SafeRestMethod -Uri "$BaseUrl/tareas/$tareaId/status" -Method GET
     Write-Host "   Estado final: $($statusFinal.estado)" -ForegroundColor Green
-    Write-Host "   Completada automáticamente: $($statusFinal.completada_automaticamente)" -ForegroundColor $(if ($statusFinal.completada_automaticamente) { "Green" } else { "Yellow" })
+    Write-Host "   Programada para completar: $($statusFinal.programada_para_completar)" -ForegroundColor Cyan
     Write-Host "   Inicio: $($statusFinal.inicio)" -ForegroundColor Cyan
     Write-Host "   Fin: $($statusFinal.fin)" -ForegroundColor Cyan
     Write-Host ""
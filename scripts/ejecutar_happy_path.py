@@ -155,8 +155,8 @@ def main():
         print_info("Verificando estado final...")
         status_final = safe_request("GET", f"{base_url}/tareas/{tarea_id}/status")
         print_success(f"Estado final: {status_final.get('estado')}")
-        completada_auto = status_final.get('completada_automaticamente', False)
-        print_success(f"Completada automáticamente: {completada_auto}")
+        programada = status_final.get('programada_para_completar', False)
+        print_success(f"Programada para completar: {programada}")
         print_info(f"Inicio: {status_final.get('inicio')}")
         print_info(f"Fin: {status_final.get('fin')}")
         
@@ -164,7 +164,7 @@ def main():
         print_step(10, "Consultando todas las tareas")
         todas_tareas = safe_request("GET", f"{base_url}/tareas/status")
         print_success(f"Total tareas: {todas_tareas.get('total_tareas')}")
-        print_success(f"Tareas completadas automáticamente: {todas_tareas.get('tareas_completadas_automaticamente')}")
+        print_success(f"Versión del estado: {todas_tareas.get('version')}")
         
         # 11. Estadísticas
         print_step(11, "Consultando estadísticas")
@@ -618,9 +618,9 @@ def main():
             data = print_response(response)
             if data:
                 estado = data.get('estado', 'N/A')
-                completada_auto = data.get('completada_automaticamente', False)
+                programada = data.get('programada_para_completar', False)
                 print(f"{COLORS['GREEN']}[OK] Estado final: {estado}{COLORS['RESET']}")
-                print(f"{COLORS['GREEN']}  Completada automáticamente: {completada_auto}{COLORS['RESET']}")
+                print(f"{COLORS['GREEN']}  Programada para completar: {programada}{COLORS['RESET']}")
                 print(f"{COLORS['GREEN']}  Inicio: {data.get('inicio', 'N/A')}{COLORS['RESET']}")
                 print(f"{COLORS['GREEN']}  Fin: {data.get('fin', 'N/A')}{COLORS['RESET']}")
         
@@ -637,7 +637,7 @@ def main():
             data = print_response(response)
             if data:
                 print(f"{COLORS['GREEN']}[OK] Total tareas: {data.get('total_tareas', 'N/A')}{COLORS['RESET']}")
-                print(f"{COLORS['GREEN']}  Tareas completadas automáticamente: {data.get('tareas_completadas_automaticamente', 'N/A')}{COLORS['RESET']}")
+                print(f"{COLORS['GREEN']}  Versión del estado: {data.get('version', 'N/A')}{COLORS['RESET']}")
         
         time.sleep(1)
         
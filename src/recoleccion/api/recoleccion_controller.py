@@ -2,7 +2,8 @@
 Controlador REST para el subsistema de recolección.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Query, Body, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Body, Header, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import asyncio
@@ -10,6 +11,9 @@ import asyncio
 from ..services.recoleccion_service import RecoleccionService
 from ..services.entorno_service import EntornoService
 from ..services.comunicacion_service import ComunicacionService
+from ..services.tarea_registry import TareaRegistry
+from ..services.interruptor_circuito import InterruptorCircuito
+from ..services.transporte_http import transporte_http
 from ..models.alimento import Alimento
 from ..models.tarea_recoleccion import TareaRecoleccion
 from ..models.estado_tarea import EstadoTarea
@@ -26,6 +30,12 @@ class CrearAlimentoRequest(BaseModel):
     tiempo_recoleccion: int
     disponible: Optional[bool] = True
 
+class CrearTareasLoteRequest(BaseModel):
+    tareas: List[CrearTareaRequest]
+
+class RespuestaHormigasRequest(BaseModel):
+    hormigas: List[Dict[str, Any]] = []
+
 class IniciarTareaRequest(BaseModel):
     hormigas_lote_id: str
 
@@ -33,6 +43,9 @@ class AsignarHormigasRequest(BaseModel):
     hormigas_lote_id: Optional[str] = None
     cantidad: Optional[int] = None
 
+# Máximo de tareas aceptadas por POST /tareas/lote
+MAX_TAREAS_POR_LOTE = 1000
+
 class ErrorResponse(BaseModel):
     """Modelo de respuesta de error estándar."""
     detail: str
@@ -69,6 +82,32 @@ RESPONSES = {
 }
 
 
+def _buscar_tarea_en_memoria(
+    servicio: Any,
+    tarea_id: str,
+    ignorar_mayusculas: bool = True
+) -> Optional[TareaRecoleccion]:
+    """
+    Busca una tarea en memoria usando el registro indexado del servicio.
+    
+    Si el servicio no expone un registro (p. ej. dobles de prueba que solo
+    tienen las listas `tareas_activas`/`tareas_completadas`), recorre las listas.
+    """
+    registro = getattr(servicio, "registro_tareas", None)
+    if isinstance(registro, TareaRegistry):
+        return registro.obtener(tarea_id, ignorar_mayusculas=ignorar_mayusculas)
+    
+    tarea_id_normalizado = str(tarea_id).strip()
+    candidatas = list(servicio.tareas_activas) + list(servicio.tareas_completadas)
+    tarea = next((t for t in candidatas if str(t.id).strip() == tarea_id_normalizado), None)
+    if tarea is None and ignorar_mayusculas:
+        tarea = next(
+            (t for t in candidatas if str(t.id).strip().lower() == tarea_id_normalizado.lower()),
+            None
+        )
+    return tarea
+
+
 def create_app(
     entorno_service: EntornoService, 
     comunicacion_service: ComunicacionService
@@ -141,6 +180,64 @@ def create_app(
     # Inicializar servicio de recolección
     recoleccion_service = RecoleccionService(entorno_service, comunicacion_service)
     
+    async def vaciar_diario_eventos():
+        """Escribe los eventos pendientes del diario al detener la aplicación."""
+        try:
+            from ..services.persistence_service import persistence_service
+            await persistence_service.vaciar_eventos()
+        except Exception as e:
+            print(f"Advertencia: no se pudieron vaciar los eventos pendientes: {e}")
+    
+    app.add_event_handler("shutdown", vaciar_diario_eventos)
+    
+    async def cerrar_clientes_http():
+        """Cierra los clientes HTTP de las APIs externas y sus conexiones keep-alive."""
+        try:
+            await transporte_http.cerrar()
+        except Exception as e:
+            print(f"Advertencia: no se pudieron cerrar los clientes HTTP: {e}")
+    
+    app.add_event_handler("shutdown", cerrar_clientes_http)
+    
+    async def recuperar_timers():
+        """Rearma los timers de las tareas en proceso persistidas al arrancar la aplicación."""
+        try:
+            servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
+            resumen = await servicio_a_usar.recuperar_tareas_en_proceso()
+            print(f"Timers recuperados: {resumen['recuperadas']} tareas en proceso ({resumen['vencidas']} vencidas)")
+        except Exception as e:
+            print(f"Advertencia: no se pudieron recuperar los timers de tareas en proceso: {e}")
+    
+    app.add_event_handler("startup", recuperar_timers)
+    
+    async def programar_si_vencida(servicio, tarea: TareaRecoleccion) -> bool:
+        """
+        Entrega al timer una tarea en proceso ya vencida que este no conoce.
+        
+        Los endpoints de estado no completan tareas dentro de la petición: si
+        encuentran una tarea vencida fuera del planificador (p. ej. escrita por
+        otra instancia), la programan y el timer la completa en su próximo lote.
+        
+        La fila de la BD puede seguir "en_proceso" mientras se confirma (o tras
+        fallar) la finalización hecha en memoria; si la tarea en memoria ya no
+        está en proceso, manda ella y no se vuelve a programar.
+        
+        Returns:
+            True si la tarea se entregó al timer
+        """
+        estado_valor = tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado)
+        if estado_valor != "en_proceso" or not tarea.fecha_inicio:
+            return False
+        from datetime import datetime
+        from ..services.timer_service import timer_service
+        tiempo_transcurrido = (datetime.now() - tarea.fecha_inicio).total_seconds()
+        if tiempo_transcurrido < tarea.alimento.tiempo_recoleccion:
+            return False
+        tarea_en_memoria = _buscar_tarea_en_memoria(servicio, tarea.id, ignorar_mayusculas=False)
+        if tarea_en_memoria is not None and tarea_en_memoria.estado != EstadoTarea.EN_PROCESO:
+            return False
+        return await timer_service.reanudar_tarea_timer(tarea_en_memoria or tarea)
+    
     @app.get("/", tags=["Salud y Estado"])
     async def root():
         """Endpoint raíz."""
@@ -150,14 +247,32 @@ def create_app(
     async def health_check():
         """Verificación de salud del servicio."""
         try:
-            # Healthcheck simple que siempre funciona
-            return {
+            # Healthcheck simple que siempre funciona: la disponibilidad de los
+            # subsistemas sale del estado de sus circuitos, sin hacer peticiones
+            circuitos = {
+                nombre: servicio.circuito
+                for nombre, servicio in (("entorno", entorno_service), ("comunicacion", comunicacion_service))
+                if isinstance(getattr(servicio, "circuito", None), InterruptorCircuito)
+            }
+            respuesta = {
                 "status": "healthy",
                 "service": "subsistema-recoleccion",
                 "version": "1.0.0",
-                "entorno_disponible": True,
-                "comunicacion_disponible": True
+                "entorno_disponible": circuitos["entorno"].disponible if "entorno" in circuitos else True,
+                "comunicacion_disponible": circuitos["comunicacion"].disponible if "comunicacion" in circuitos else True
             }
+            if circuitos:
+                respuesta["circuitos"] = {nombre: c.obtener_metricas() for nombre, c in circuitos.items()}
+                respuesta["http"] = transporte_http.obtener_metricas()
+            # Métricas del pool de BD (solo lectura en memoria, no toca la BD)
+            from ..services.persistence_service import persistence_service
+            metricas_pool = persistence_service.obtener_metricas_pool()
+            if isinstance(metricas_pool, dict):
+                respuesta["pool_bd"] = metricas_pool
+            metricas_cache = persistence_service.obtener_metricas_cache_alimentos()
+            if isinstance(metricas_cache, dict):
+                respuesta["cache_alimentos"] = metricas_cache
+            return respuesta
         except Exception as e:
             # En caso de error, devolver unhealthy pero no lanzar excepción
             return {
@@ -296,25 +411,104 @@ def create_app(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al crear tarea: {str(e)}")
     
+    @app.post(
+        "/tareas/lote",
+        response_model=Dict[str, Any],
+        tags=["Tareas"],
+        responses={
+            400: RESPONSES[400],
+            500: RESPONSES[500]
+        }
+    )
+    async def crear_tareas_lote(payload: CrearTareasLoteRequest = Body(...)):
+        """Crea varias tareas de recolección en una sola llamada.
+        Los alimentos se resuelven con una única consulta a la BD, la disponibilidad se valida
+        en memoria y todas las tareas válidas (con sus eventos) se guardan en una transacción.
+        Devuelve el resultado de cada elemento: los inválidos no impiden crear el resto. Si la
+        transacción se revierte no se crea ninguna y todos los elementos llevan el error."""
+        if len(payload.tareas) > MAX_TAREAS_POR_LOTE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El lote supera el máximo de {MAX_TAREAS_POR_LOTE} tareas"
+            )
+        try:
+            from datetime import datetime
+            from ..services.persistence_service import persistence_service
+            prefijo = f"tarea_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            items = [
+                (str(item.tarea_id or f"{prefijo}_{i}").strip(), str(item.alimento_id or "A1").strip())
+                for i, item in enumerate(payload.tareas, start=1)
+            ]
+            alimentos = await persistence_service.obtener_alimentos_por_ids([alimento_id for _, alimento_id in items])
+            # Tareas que solo están en la BD (p. ej. tras un reinicio): no deben sobrescribirse
+            en_bd = await persistence_service.obtener_ids_tareas_existentes([tarea_id for tarea_id, _ in items])
+            
+            resultados: List[Dict[str, Any]] = []
+            pares = []
+            vistos = set()
+            for tarea_id, alimento_id in items:
+                alimento = alimentos.get(alimento_id)
+                if (
+                    tarea_id in vistos
+                    or tarea_id in en_bd
+                    or _buscar_tarea_en_memoria(recoleccion_service, tarea_id, ignorar_mayusculas=False)
+                ):
+                    error = f"La tarea '{tarea_id}' ya existe"
+                elif alimento is None:
+                    error = "Alimento no encontrado"
+                elif not alimento.disponible:
+                    error = f"El alimento '{alimento.nombre}' (ID: {alimento.id}) no está disponible. Estado: agotado"
+                else:
+                    error = None
+                    pares.append((tarea_id, alimento))
+                vistos.add(tarea_id)
+                resultados.append({
+                    "tarea_id": tarea_id,
+                    "alimento_id": alimento_id,
+                    "creada": error is None,
+                    "error": error
+                })
+            
+            creadas = len(pares)
+            if pares:
+                try:
+                    await recoleccion_service.crear_tareas_recoleccion(pares)
+                except RuntimeError as e:
+                    creadas = 0
+                    for resultado in resultados:
+                        if resultado["creada"]:
+                            resultado["creada"] = False
+                            resultado["error"] = str(e)
+            return {
+                "total": len(resultados),
+                "creadas": creadas,
+                "errores": len(resultados) - creadas,
+                "resultados": resultados
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al crear lote de tareas: {str(e)}")
+    
     @app.get("/tareas", response_model=List[TareaRecoleccion], tags=["Tareas"])
     async def listar_tareas():
         """Lista todas las tareas (activas + completadas)."""
-        return recoleccion_service.tareas_activas + recoleccion_service.tareas_completadas
+        return list(recoleccion_service.tareas_activas) + list(recoleccion_service.tareas_completadas)
     
     @app.get("/tareas/activas", response_model=List[TareaRecoleccion], tags=["Tareas"])
     async def listar_tareas_activas():
         """Lista todas las tareas activas."""
-        return recoleccion_service.tareas_activas
+        return list(recoleccion_service.tareas_activas)
     
     @app.get("/tareas/completadas", response_model=List[TareaRecoleccion], tags=["Tareas"])
     async def listar_tareas_completadas():
         """Lista todas las tareas completadas."""
-        return recoleccion_service.tareas_completadas
+        return list(recoleccion_service.tareas_completadas)
     
     @app.get("/tareas/en-proceso", response_model=List[TareaRecoleccion], tags=["Tareas"])
     async def listar_tareas_en_proceso():
         """Lista todas las tareas en proceso."""
-        return recoleccion_service.tareas_activas
+        return list(recoleccion_service.tareas_activas)
     
     @app.post(
         "/tareas/{tarea_id}/asignar-hormigas", 
@@ -341,16 +535,11 @@ def create_app(
             servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
             
             # Buscar tarea en memoria o BD
-            tarea = None
-            for t in servicio_a_usar.tareas_activas + servicio_a_usar.tareas_completadas:
-                if t.id == tarea_id:
-                    tarea = t
-                    break
+            tarea = _buscar_tarea_en_memoria(servicio_a_usar, tarea_id, ignorar_mayusculas=False)
             
             if not tarea:
                 from ..services.persistence_service import persistence_service
-                tareas_bd = await persistence_service.obtener_tareas()
-                tarea = next((t for t in tareas_bd if str(t.id).strip() == tarea_id.strip()), None)
+                tarea = await persistence_service.obtener_tarea_por_id(tarea_id)
                 
                 if tarea and tarea not in servicio_a_usar.tareas_activas:
                     servicio_a_usar.tareas_activas.append(tarea)
@@ -445,6 +634,28 @@ def create_app(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error al asignar hormigas: {str(e)}")
     
+    @app.post(
+        "/hormigas/respuesta/{mensaje_id}",
+        tags=["Procesamiento"],
+        responses={404: RESPONSES[404]}
+    )
+    async def recibir_respuesta_hormigas(mensaje_id: str, payload: RespuestaHormigasRequest = Body(...)):
+        """Callback para que la Hormiga Reina entregue la respuesta a una solicitud de hormigas.
+        Despierta de inmediato la espera correspondiente, sin aguardar al siguiente sondeo."""
+        from ..models.hormiga import Hormiga
+        servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
+        hormigas = [
+            Hormiga(
+                id=str(h.get("id", "")),
+                capacidad_carga=h.get("capacidad_carga", 5),
+                tiempo_vida=h.get("tiempo_vida", 3600),
+                subsistema_origen=h.get("subsistema_origen", "hormiga_reina")
+            ) for h in payload.hormigas
+        ]
+        if not servicio_a_usar.correlador_hormigas.resolver(mensaje_id, hormigas):
+            raise HTTPException(status_code=404, detail=f"No hay una solicitud pendiente para el mensaje '{mensaje_id}'")
+        return {"message": f"Respuesta del mensaje {mensaje_id} entregada", "hormigas": len(hormigas)}
+    
     @app.post(
         "/tareas/{tarea_id}/iniciar", 
         tags=["Tareas"],
@@ -466,17 +677,12 @@ def create_app(
             servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
             
             # Primero buscar en memoria (activas + completadas)
-            tarea = None
-            for t in servicio_a_usar.tareas_activas + servicio_a_usar.tareas_completadas:
-                if t.id == tarea_id:
-                    tarea = t
-                    break
+            tarea = _buscar_tarea_en_memoria(servicio_a_usar, tarea_id, ignorar_mayusculas=False)
             
             # Si no está en memoria, buscar en la base de datos
             if not tarea:
                 from ..services.persistence_service import persistence_service
-                tareas_bd = await persistence_service.obtener_tareas()
-                tarea = next((t for t in tareas_bd if str(t.id).strip() == tarea_id.strip()), None)
+                tarea = await persistence_service.obtener_tarea_por_id(tarea_id)
                 
                 # Si se encuentra en BD, agregarla a memoria para poder iniciarla
                 if tarea:
@@ -524,7 +730,9 @@ def create_app(
     async def completar_tarea(tarea_id: str, cantidad_recolectada: int):
         """Completa una tarea de recolección."""
         try:
-            tarea = next((t for t in recoleccion_service.tareas_activas if t.id == tarea_id), None)
+            tarea = recoleccion_service.obtener_tarea(tarea_id, ignorar_mayusculas=False)
+            if tarea and tarea not in recoleccion_service.tareas_activas:
+                tarea = None
             if not tarea:
                 raise HTTPException(status_code=404, detail="Tarea no encontrada")
             
@@ -540,9 +748,22 @@ def create_app(
         tags=["Procesamiento"],
         responses={500: RESPONSES[500]}
     )
-    async def procesar_recoleccion():
-        """Ejecuta el proceso completo de recolección."""
+    async def procesar_recoleccion(
+        concurrencia: Optional[int] = Query(
+            None, ge=1, le=500,
+            description="Si se indica, procesa los alimentos en paralelo con este máximo de solicitudes de hormigas simultáneas"
+        )
+    ):
+        """Ejecuta el proceso completo de recolección.
+        Con `concurrencia` se usa el modo concurrente, que devuelve un informe por alimento."""
         try:
+            if concurrencia is not None:
+                resultados = await recoleccion_service.procesar_recoleccion_concurrente(concurrencia)
+                return {
+                    "message": "Proceso de recolección completado",
+                    "tareas_procesadas": sum(1 for r in resultados if r["resultado"] == "iniciada"),
+                    "resultados": resultados
+                }
             tareas_procesadas = await recoleccion_service.procesar_recoleccion()
             # Convertir tareas a diccionarios para serialización JSON
             tareas_dict = []
@@ -731,14 +952,12 @@ def create_app(
         """Obtiene una tarea específica desde la base de datos por ID de alimento."""
         try:
             from ..services.persistence_service import persistence_service
-            tareas_bd = await persistence_service.obtener_tareas()
             
-            # Buscar tarea por ID o por alimento_id
-            tarea_encontrada = None
-            for tarea in tareas_bd:
-                if tarea.id == tarea_id or tarea.alimento.id == tarea_id:
-                    tarea_encontrada = tarea
-                    break
+            # Buscar tarea por ID (búsqueda por clave) o, si no existe, por alimento_id
+            tarea_encontrada = await persistence_service.obtener_tarea_por_id(tarea_id)
+            if not tarea_encontrada:
+                tareas_bd = await persistence_service.obtener_tareas()
+                tarea_encontrada = next((t for t in tareas_bd if t.alimento.id == tarea_id), None)
             
             if not tarea_encontrada:
                 raise HTTPException(status_code=404, detail="Tarea no encontrada en BD")
@@ -785,96 +1004,79 @@ def create_app(
         tags=["Estado y Monitoreo"],
         responses={500: RESPONSES[500]}
     )
-    async def obtener_status_tareas():
-        """Devuelve el estado de todas las tareas desde SQL Server, incluyendo IDs de hormigas y alimento.
-        Verifica automáticamente si alguna tarea debe completarse por tiempo transcurrido."""
+    async def obtener_status_tareas(
+        response: Response,
+        estado: Optional[str] = Query(None, description="Filtrar por estado (pendiente, en_proceso, completada, ...)"),
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Máximo de tareas a devolver"),
+        offset: int = Query(0, ge=0, description="Tareas a saltar (orden por ID)"),
+        if_none_match: Optional[str] = Header(None)
+    ):
+        """Devuelve el estado de las tareas desde la proyección de estado, con IDs de lote y alimento.
+        Es de solo lectura: admite paginación, filtro por estado y ETag (`If-None-Match` -> 304)."""
         try:
             from ..services.persistence_service import persistence_service
-            info_bd = await persistence_service.obtener_info_bd()
-            tareas = await persistence_service.obtener_tareas()
+            consulta = await persistence_service.consultar_status_tareas(estado=estado, limit=limit, offset=offset)
             
-            # Usar el servicio de app.state si está disponible (para tests), sino usar el del scope
-            servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
+            etag = consulta["etag"]
+            if if_none_match and etag in [valor.strip() for valor in if_none_match.split(",")]:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            response.headers["ETag"] = etag
             
-            # Verificar y completar tareas automáticamente si es necesario
-            # Validación: fecha_inicio + tiempo_recoleccion <= fecha_actual
-            tareas_completadas_auto = []
-            from datetime import datetime
-            ahora = datetime.now()
-            
-            for t in tareas:
-                # Si la tarea está en memoria, verificar con el servicio
-                tarea_en_memoria = None
-                for tm in servicio_a_usar.tareas_activas + servicio_a_usar.tareas_completadas:
-                    if tm.id == t.id:
-                        tarea_en_memoria = tm
-                        break
-                
-                # Si está en memoria, usar esa (puede estar más actualizada)
-                tarea_a_verificar = tarea_en_memoria if tarea_en_memoria else t
-                
-                # Verificar si debe completarse automáticamente por tiempo
-                estado_valor = tarea_a_verificar.estado.value if hasattr(tarea_a_verificar.estado, 'value') else str(tarea_a_verificar.estado)
-                if estado_valor == "en_proceso" and tarea_a_verificar.fecha_inicio:
-                    tiempo_transcurrido = (ahora - tarea_a_verificar.fecha_inicio).total_seconds()
-                    tiempo_recoleccion = tarea_a_verificar.alimento.tiempo_recoleccion
-                    
-                    # Si el tiempo transcurrido es mayor o igual al tiempo de recolección, completar automáticamente
-                    if tiempo_transcurrido >= tiempo_recoleccion:
-                        # Ejecutar el procesamiento completo de la tarea (completar y actualizar alimento)
-                        completada = await servicio_a_usar.verificar_y_completar_tarea_por_tiempo(tarea_a_verificar)
-                        if completada:
-                            tareas_completadas_auto.append(t.id)
-                            # Asegurar que el alimento se actualizó correctamente
-                            try:
-                                await persistence_service.actualizar_alimento_disponibilidad(tarea_a_verificar.alimento.id, False)
-                                print(f"Tarea {t.id} completada automáticamente desde status. Alimento {tarea_a_verificar.alimento.id} actualizado.")
-                            except Exception as e:
-                                print(f"Advertencia: No se pudo actualizar alimento {tarea_a_verificar.alimento.id} al completar tarea: {e}")
-                            
-                            # Si estaba en memoria, actualizar la referencia
-                            if tarea_en_memoria:
-                                t = tarea_en_memoria
-                            else:
-                                # Recargar desde BD para obtener el estado actualizado
-                                tareas_actualizadas = await persistence_service.obtener_tareas()
-                                t = next((ta for ta in tareas_actualizadas if ta.id == t.id), t)
-            
-            # Recargar tareas después de verificar completados automáticos
-            if tareas_completadas_auto:
-                tareas = await persistence_service.obtener_tareas()
-            
-            resultado: List[Dict[str, Any]] = []
-            for t in tareas:
-                # Obtener estado como string
-                estado_str = t.estado.value if hasattr(t.estado, 'value') else str(t.estado)
-                resultado.append({
-                    "tarea_id": t.id,
-                    "estado": estado_str,
-                    "alimento": {
-                        "id": t.alimento.id if t.alimento else None,
-                        "nombre": t.alimento.nombre if t.alimento else None
-                    },
-                    "hormigas_lote_id": t.hormigas_lote_id if hasattr(t, 'hormigas_lote_id') else None,
-                    "inicio": t.fecha_inicio.isoformat() if t.fecha_inicio else None,
-                    "fin": t.fecha_fin.isoformat() if t.fecha_fin else None,
-                    "alimento_recolectado": t.alimento_recolectado
-                })
+            info_bd = await persistence_service.obtener_info_bd()
             return {
                 "base_datos": {
                     "engine": info_bd.get("engine", "desconocido"),
                     "server": info_bd.get("server", "desconocido"),
                     "database": info_bd.get("database", "desconocido")
                 },
-                "total_tareas": len(resultado),
-                "tareas_completadas_automaticamente": len(tareas_completadas_auto),
-                "tareas": resultado
+                "total_tareas": consulta["total"],
+                "version": consulta["version"],
+                "offset": offset,
+                "limit": limit,
+                "tareas": consulta["tareas"]
             }
         except Exception as e:
             import traceback
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"Error al obtener status de tareas: {str(e)}")
 
+    @app.get(
+        "/tareas/cambios",
+        response_model=Dict[str, Any],
+        tags=["Estado y Monitoreo"],
+        responses={500: RESPONSES[500]}
+    )
+    async def obtener_cambios_tareas(
+        desde: Optional[str] = Query(None, description="Cursor devuelto por la consulta anterior (vacío = todas las tareas)"),
+        limite: int = Query(500, ge=1, le=5000, description="Máximo de tareas por respuesta")
+    ):
+        """Devuelve solo las tareas modificadas desde el cursor `desde`, junto con el nuevo cursor.
+        Si `hay_mas` es True conviene volver a consultar de inmediato; si `reinicio` es True el
+        cursor no era válido (p. ej. tras reiniciar el servicio) y se envía el estado completo.
+        El cursor es del proceso que lo emitió: el feed requiere ejecutar la API en un solo
+        proceso (sin `--workers`), o cada cambio de worker fuerza un reinicio."""
+        try:
+            from ..services.persistence_service import persistence_service
+            return await persistence_service.consultar_cambios_tareas(desde=desde, limite=limite)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al obtener cambios de tareas: {str(e)}")
+
+    @app.get("/tareas/stream", tags=["Estado y Monitoreo"])
+    async def stream_eventos_tareas(
+        tareas: Optional[str] = Query(None, description="IDs de tarea separados por coma (vacío = todas)")
+    ):
+        """Flujo Server-Sent Events con los eventos del ciclo de vida de las tareas
+        (iniciada, completada, cancelada) y ticks periódicos de progreso. Si el cliente
+        no consume a tiempo se descartan los eventos más antiguos y el progreso se
+        agrupa por tarea, de modo que un cliente lento no frena al resto."""
+        from ..services.difusor_eventos import difusor_eventos
+        filtro = [t.strip() for t in tareas.split(",") if t.strip()] if tareas else None
+        return StreamingResponse(
+            difusor_eventos.flujo_sse(filtro),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
     @app.get(
         "/tareas/{tarea_id}/status", 
         response_model=Dict[str, Any], 
@@ -889,70 +1091,29 @@ def create_app(
         try:
             from ..services.persistence_service import persistence_service
             info_bd = await persistence_service.obtener_info_bd()
-            tareas = await persistence_service.obtener_tareas()
             
-            # Normalizar búsqueda (case-insensitive, trim)
+            # Normalizar búsqueda (trim) y buscar por clave; si no hay coincidencia
+            # exacta, se intenta sin distinguir mayúsculas
             tarea_id_normalizado = str(tarea_id).strip()
-            tarea = None
-            
-            # Primero intentar búsqueda exacta
-            for t in tareas:
-                if str(t.id).strip() == tarea_id_normalizado:
-                    tarea = t
-                    break
-            
-            # Si no se encuentra, intentar búsqueda case-insensitive
-            if not tarea:
-                for t in tareas:
-                    if str(t.id).strip().lower() == tarea_id_normalizado.lower():
-                        tarea = t
-                        break
+            tarea = await persistence_service.obtener_tarea_por_id(tarea_id_normalizado, ignorar_mayusculas=True)
             
             # Usar el servicio de app.state si está disponible (para tests), sino usar el del scope
             servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
             
             if not tarea:
                 # Buscar también en memoria
-                for t in servicio_a_usar.tareas_activas + servicio_a_usar.tareas_completadas:
-                    if str(t.id).strip() == tarea_id_normalizado or str(t.id).strip().lower() == tarea_id_normalizado.lower():
-                        tarea = t
-                        break
+                tarea = _buscar_tarea_en_memoria(servicio_a_usar, tarea_id_normalizado)
             
             if not tarea:
                 # Debug: listar IDs disponibles para ayudar al usuario
-                ids_disponibles = [str(t.id).strip() for t in tareas]
+                ids_disponibles = [str(t.id).strip() for t in await persistence_service.obtener_tareas(limit=10)]
                 raise HTTPException(
                     status_code=404, 
                     detail=f"Tarea '{tarea_id}' no encontrada en la base de datos. IDs disponibles: {ids_disponibles[:10]}"
                 )
             
-            # Verificar si la tarea debe completarse automáticamente por tiempo
-            # Validación: fecha_inicio + tiempo_recoleccion <= fecha_actual
-            completada_auto = False
-            estado_valor = tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado)
-            if estado_valor == "en_proceso" and tarea.fecha_inicio:
-                from datetime import datetime, timedelta
-                ahora = datetime.now()
-                tiempo_transcurrido = (ahora - tarea.fecha_inicio).total_seconds()
-                tiempo_recoleccion = tarea.alimento.tiempo_recoleccion
-                
-                # Si el tiempo transcurrido es mayor o igual al tiempo de recolección, completar automáticamente
-                if tiempo_transcurrido >= tiempo_recoleccion:
-                    # Ejecutar el procesamiento completo de la tarea (completar y actualizar alimento)
-                    completada_auto = await servicio_a_usar.verificar_y_completar_tarea_por_tiempo(tarea)
-                    if completada_auto:
-                        # Asegurar que el alimento se actualizó correctamente
-                        try:
-                            await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, False)
-                            print(f"Tarea {tarea.id} completada automáticamente desde status. Alimento {tarea.alimento.id} actualizado.")
-                        except Exception as e:
-                            print(f"Advertencia: No se pudo actualizar alimento {tarea.alimento.id} al completar tarea: {e}")
-                        
-                        # Recargar desde BD para obtener el estado actualizado
-                        tareas_actualizadas = await persistence_service.obtener_tareas()
-                        tarea_actualizada = next((t for t in tareas_actualizadas if t.id == tarea.id), None)
-                        if tarea_actualizada:
-                            tarea = tarea_actualizada
+            # Si la tarea venció y el timer no la tiene, se le entrega para completarla
+            programada = await programar_si_vencida(servicio_a_usar, tarea)
             
             # Obtener estado como string
             estado_str = tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado)
@@ -981,7 +1142,7 @@ def create_app(
                 },
                 "tarea_id": tarea.id,
                 "estado": estado_str,
-                "completada_automaticamente": completada_auto,
+                "programada_para_completar": programada,
                 "alimento": {
                     "id": tarea.alimento.id if tarea.alimento else None,
                     "nombre": tarea.alimento.nombre if tarea.alimento else None
@@ -1028,16 +1189,11 @@ def create_app(
             raise HTTPException(status_code=404, detail="Tarea no encontrada o no en proceso")
         
         # Obtener información del alimento para mostrar el tiempo total asignado
-        tarea = None
-        for t in recoleccion_service.tareas_activas + recoleccion_service.tareas_completadas:
-            if t.id == tarea_id:
-                tarea = t
-                break
+        tarea = recoleccion_service.obtener_tarea(tarea_id, ignorar_mayusculas=False)
         
         if not tarea:
             from ..services.persistence_service import persistence_service
-            tareas_bd = await persistence_service.obtener_tareas()
-            tarea = next((t for t in tareas_bd if str(t.id).strip() == tarea_id.strip()), None)
+            tarea = await persistence_service.obtener_tarea_por_id(tarea_id)
         
         tiempo_total = tarea.alimento.tiempo_recoleccion if tarea else None
         
@@ -1093,29 +1249,14 @@ def create_app(
         tarea_id_normalizado = str(tarea_id).strip()
         
         # Buscar tarea en memoria primero
-        tarea = None
         servicio_a_usar = getattr(app.state, 'recoleccion_service', None) or recoleccion_service
-        
-        for t in servicio_a_usar.tareas_activas + servicio_a_usar.tareas_completadas:
-            if str(t.id).strip() == tarea_id_normalizado:
-                tarea = t
-                break
+        tarea = _buscar_tarea_en_memoria(servicio_a_usar, tarea_id_normalizado)
         
         # Si no está en memoria, buscar en BD (búsqueda más robusta)
         if not tarea:
             try:
-                tareas_bd = await persistence_service.obtener_tareas()
-                # Buscar por coincidencia exacta
-                for t in tareas_bd:
-                    if str(t.id).strip() == tarea_id_normalizado:
-                        tarea = t
-                        break
-                # Si no se encuentra, intentar case-insensitive
-                if not tarea:
-                    for t in tareas_bd:
-                        if str(t.id).strip().lower() == tarea_id_normalizado.lower():
-                            tarea = t
-                            break
+                # Coincidencia exacta por clave y, si no, case-insensitive
+                tarea = await persistence_service.obtener_tarea_por_id(tarea_id_normalizado, ignorar_mayusculas=True)
                 
                 if tarea and tarea not in servicio_a_usar.tareas_activas:
                     servicio_a_usar.tareas_activas.append(tarea)
@@ -1125,8 +1266,8 @@ def create_app(
         if not tarea:
             # Listar IDs disponibles para ayudar al usuario
             try:
-                tareas_bd = await persistence_service.obtener_tareas()
-                ids_disponibles = [str(t.id).strip() for t in tareas_bd[:10]]
+                tareas_bd = await persistence_service.obtener_tareas(limit=10)
+                ids_disponibles = [str(t.id).strip() for t in tareas_bd]
                 raise HTTPException(
                     status_code=404,
                     detail=f"Tarea '{tarea_id}' no encontrada en memoria ni en BD. IDs disponibles: {ids_disponibles}"
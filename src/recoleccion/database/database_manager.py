@@ -5,8 +5,10 @@ Gestor de base de datos para persistencia de datos del subsistema de recolecció
 import os
 import sqlite3
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple, Union
 from pathlib import Path
 
 from ..models.alimento import Alimento
@@ -17,9 +19,237 @@ from ..models.estado_tarea import EstadoTarea
 from ..models.estado_hormiga import EstadoHormiga
 
 
+# Máximo de IDs que se filtran con IN (...) al hidratar tareas; por encima se
+# cargan las relaciones completas (límites de parámetros de SQLite/SQL Server)
+MAX_IDS_EN_CONSULTA = 500
+
+# Perfiles de PRAGMA para las conexiones SQLite (`SQLITE_PERFIL`). "rendimiento"
+# usa WAL con synchronous=NORMAL: un commit sobrevive a la caída del proceso,
+# aunque puede perderse ante un corte de energía. "seguro" deja los valores
+# por defecto de SQLite (rollback journal, synchronous=FULL).
+PERFILES_SQLITE: Dict[str, Dict[str, Any]] = {
+    "rendimiento": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -20000,  # negativo = KiB (unos 20 MB)
+        "busy_timeout": 5000,
+    },
+    "seguro": {
+        "busy_timeout": 5000,
+    },
+}
+
+# Índices de las consultas frecuentes; se crean también en bases existentes
+INDICES_SQLITE = [
+    ("idx_tareas_estado", "tareas (estado)"),
+    ("idx_lotes_hormigas_tarea", "lotes_hormigas (tarea_id)"),
+    ("idx_asignaciones_tarea", "asignaciones_hormiga_tarea (tarea_id)"),
+    ("idx_asignaciones_lote", "asignaciones_hormiga_tarea (lote_id)"),
+    ("idx_eventos_fecha", "eventos (fecha_evento DESC)"),
+    ("idx_mensajes_origen", "mensajes (subsistema_origen)"),
+]
+
+
+def _columnas_sqlite(cursor, tabla: str) -> List[str]:
+    """Nombres de las columnas de una tabla SQLite."""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _agregar_lote_id_asignaciones(cursor):
+    """Bases antiguas: asignaciones sin columna de lote."""
+    if "lote_id" not in _columnas_sqlite(cursor, "asignaciones_hormiga_tarea"):
+        cursor.execute("ALTER TABLE asignaciones_hormiga_tarea ADD COLUMN lote_id TEXT")
+
+
+def _agregar_hormigas_asignadas_tareas(cursor):
+    """Bases antiguas: tareas sin el contador de hormigas asignadas."""
+    if "hormigas_asignadas" not in _columnas_sqlite(cursor, "tareas"):
+        cursor.execute("ALTER TABLE tareas ADD COLUMN hormigas_asignadas INTEGER DEFAULT 0")
+
+
+def _crear_indices_sqlite(cursor):
+    """Crea los índices de `INDICES_SQLITE` que falten."""
+    for nombre, definicion in INDICES_SQLITE:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}")
+
+
+# Migraciones de esquema SQLite (versión, descripción, función sobre el cursor).
+# Se aplican una vez, en orden, y quedan registradas en `version_esquema`; cada
+# una comprueba el estado previo porque las bases anteriores al registro
+# pueden tenerla ya aplicada. Para cambiar el esquema se añade una nueva.
+MIGRACIONES_SQLITE = [
+    (1, "Columna lote_id en asignaciones_hormiga_tarea", _agregar_lote_id_asignaciones),
+    (2, "Columna hormigas_asignadas en tareas", _agregar_hormigas_asignadas_tareas),
+    (3, "Índices de las consultas frecuentes", _crear_indices_sqlite),
+]
+
+# Migraciones de esquema SQL Server (versión, descripción, SQL idempotente).
+# Las tablas las crean los scripts de `scripts/`; aquí solo se ponen al día.
+MIGRACIONES_SQLSERVER = [
+    (1, "Columna hormigas_asignadas en dbo.Tareas", """
+        IF COL_LENGTH('dbo.Tareas', 'hormigas_asignadas') IS NULL
+            ALTER TABLE dbo.Tareas ADD hormigas_asignadas INT DEFAULT 0
+    """),
+    (2, "Índices de las consultas de tareas", """
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Tareas_estado' AND object_id = OBJECT_ID(N'dbo.Tareas'))
+            CREATE INDEX IX_Tareas_estado ON dbo.Tareas (estado);
+        IF OBJECT_ID(N'dbo.lotes_hormigas', N'U') IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_lotes_hormigas_tarea' AND object_id = OBJECT_ID(N'dbo.lotes_hormigas'))
+            CREATE INDEX IX_lotes_hormigas_tarea ON dbo.lotes_hormigas (tarea_id);
+        IF OBJECT_ID(N'dbo.asignaciones_hormiga_tarea', N'U') IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_asignaciones_tarea' AND object_id = OBJECT_ID(N'dbo.asignaciones_hormiga_tarea'))
+            CREATE INDEX IX_asignaciones_tarea ON dbo.asignaciones_hormiga_tarea (tarea_id);
+        IF COL_LENGTH('dbo.asignaciones_hormiga_tarea', 'lote_id') IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_asignaciones_lote' AND object_id = OBJECT_ID(N'dbo.asignaciones_hormiga_tarea'))
+            CREATE INDEX IX_asignaciones_lote ON dbo.asignaciones_hormiga_tarea (lote_id);
+    """),
+]
+
+
+def _perfil_sqlite() -> Dict[str, Any]:
+    """
+    PRAGMA a aplicar en cada conexión SQLite.
+    
+    Parte del perfil `SQLITE_PERFIL` ("rendimiento" por defecto) y admite
+    ajustar cada valor con `SQLITE_JOURNAL_MODE`, `SQLITE_SYNCHRONOUS`,
+    `SQLITE_MMAP_SIZE`, `SQLITE_CACHE_SIZE` y `SQLITE_BUSY_TIMEOUT`.
+    """
+    nombre = os.getenv("SQLITE_PERFIL", "rendimiento").lower()
+    perfil = dict(PERFILES_SQLITE.get(nombre, PERFILES_SQLITE["rendimiento"]))
+    for pragma in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout"):
+        valor = os.getenv(f"SQLITE_{pragma.upper()}")
+        if valor:
+            perfil[pragma] = int(valor) if valor.lstrip("-").isdigit() else valor
+    return perfil
+
+
+def _valores_estado(estado: Union[str, EstadoTarea, Iterable[Union[str, EstadoTarea]], None]) -> List[str]:
+    """Normaliza uno o varios estados (enum o texto) a sus valores de texto."""
+    if estado is None:
+        return []
+    if isinstance(estado, (str, EstadoTarea)):
+        estado = [estado]
+    return [e.value if isinstance(e, EstadoTarea) else str(e) for e in estado]
+
+
+def _fila_hormiga(hormiga: Hormiga) -> Tuple[Any, ...]:
+    """Valores de (id, capacidad_carga, estado, tiempo_vida, subsistema_origen)."""
+    return (
+        hormiga.id,
+        hormiga.capacidad_carga,
+        hormiga.estado.value if hasattr(hormiga.estado, 'value') else str(hormiga.estado),
+        hormiga.tiempo_vida,
+        hormiga.subsistema_origen
+    )
+
+
+# Columnas de `tareas` para los campos de `TareaRecoleccion.instantanea` que
+# admiten actualización parcial (el resto obliga a guardar la tarea completa)
+COLUMNAS_TAREA_SQLITE = {
+    "estado": "estado",
+    "fecha_inicio": "fecha_inicio",
+    "fecha_fin": "fecha_fin",
+    "alimento_recolectado": "alimento_recolectado",
+}
+COLUMNAS_TAREA_SQLSERVER = {
+    "estado": "estado",
+    "fecha_inicio": "inicio",
+    "fecha_fin": "fin",
+    "alimento_recolectado": "cantidad_recolectada",
+}
+
+
+def _valor_campo_tarea(valor: Any) -> Any:
+    """Convierte el valor de un campo de tarea al formato guardado en BD."""
+    if isinstance(valor, EstadoTarea):
+        return valor.value
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+class CacheLRU:
+    """
+    Diccionario acotado que desaloja la entrada usada hace más tiempo.
+    
+    Si se indica `al_desalojar`, se llama con cada valor desalojado (p. ej.
+    para cerrar un cursor). Es segura entre hilos.
+    """
+    
+    def __init__(self, capacidad: int, al_desalojar: Optional[Any] = None):
+        self.capacidad = max(1, capacidad)
+        self.al_desalojar = al_desalojar
+        self._entradas: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+    
+    def obtener(self, clave: Any) -> Optional[Any]:
+        """Devuelve el valor de `clave` (y lo marca como reciente), o None."""
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+            return None
+    
+    def guardar(self, clave: Any, valor: Any) -> None:
+        """Guarda un valor; si se supera la capacidad desaloja el más antiguo."""
+        desalojados = []
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                desalojados.append(self._entradas.popitem(last=False)[1])
+                self.desalojos += 1
+        if self.al_desalojar is not None:
+            for desalojado in desalojados:
+                self.al_desalojar(desalojado)
+    
+    def invalidar(self, clave: Any) -> None:
+        """Olvida una clave."""
+        with self._lock:
+            self._entradas.pop(clave, None)
+    
+    def __len__(self) -> int:
+        return len(self._entradas)
+    
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Ocupación y aciertos de la caché."""
+        return {
+            "capacidad": self.capacidad,
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos
+        }
+
+
+def _cerrar_cursor(cursor: Any) -> None:
+    """Cierra un cursor desalojado de la caché de sentencias."""
+    try:
+        cursor.close()
+    except Exception:
+        pass
+
+
+def _condicion_in(columna: str, valores: List[Any]) -> Tuple[str, List[Any]]:
+    """Construye `columna IN (?, ...)`; sin valores devuelve una condición falsa."""
+    if not valores:
+        return "1 = 0", []
+    return f"{columna} IN ({', '.join('?' for _ in valores)})", list(valores)
+
+
 class DatabaseManager:
     """
     Gestor de base de datos para persistencia de datos.
+    
+    Cada hilo usa su propia conexión SQLite (creada bajo demanda), de modo que
+    los métodos pueden ejecutarse desde el pool de hilos de PersistenceService.
     """
     
     def __init__(self, db_path: str = "recoleccion.db"):
@@ -30,15 +260,119 @@ class DatabaseManager:
             db_path: Ruta del archivo de base de datos
         """
         self.db_path = db_path
-        self.connection = None
         self.last_error = None
+        self._local = threading.local()
+        self._conexiones: List[sqlite3.Connection] = []
+        self._conexiones_lock = threading.Lock()
+        self.perfil = _perfil_sqlite()
+        self.version_esquema = 0
         self._init_database()
     
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se abre la primera vez que se usa)."""
+        conexion = getattr(self._local, "connection", None)
+        if conexion is None:
+            conexion = self._conectar()
+        return conexion
+    
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre una conexión para el hilo actual y la registra para cerrarla luego."""
+        if self.db_path == ":memory:":
+            # Una BD en memoria solo existe en su conexión: se comparte entre hilos
+            with self._conexiones_lock:
+                if self._conexiones:
+                    self._local.connection = self._conexiones[0]
+                    return self._conexiones[0]
+        conexion = sqlite3.connect(self.db_path, check_same_thread=False)
+        conexion.row_factory = sqlite3.Row
+        self._aplicar_perfil(conexion)
+        with self._conexiones_lock:
+            self._conexiones.append(conexion)
+        self._local.connection = conexion
+        return conexion
+    
+    def _aplicar_perfil(self, conexion: sqlite3.Connection):
+        """Aplica los PRAGMA del perfil configurado a una conexión nueva."""
+        for pragma, valor in self.perfil.items():
+            if self.db_path == ":memory:" and pragma in ("journal_mode", "mmap_size"):
+                continue
+            try:
+                conexion.execute(f"PRAGMA {pragma} = {valor}")
+            except sqlite3.Error as e:
+                print(f"Advertencia: no se pudo aplicar PRAGMA {pragma}={valor}: {e}")
+    
+    def _en_transaccion(self) -> bool:
+        """Indica si el hilo actual tiene una unidad de trabajo abierta."""
+        return getattr(self._local, "transaccion", 0) > 0
+    
+    def _confirmar(self):
+        """Confirma la escritura, salvo dentro de una unidad de trabajo (se difiere)."""
+        if not self._en_transaccion():
+            self.connection.commit()
+    
+    def _revertir(self):
+        """
+        Revierte la transacción del hilo actual tras un error de escritura.
+        
+        Dentro de una unidad de trabajo solo la marca como fallida: se
+        revierte completa al confirmarla.
+        """
+        if self._en_transaccion():
+            self._local.transaccion_fallida = True
+            return
+        try:
+            self.connection.rollback()
+        except sqlite3.Error:
+            pass
+    
+    def iniciar_transaccion(self):
+        """
+        Abre una unidad de trabajo en la conexión del hilo actual.
+        
+        Mientras esté abierta, los métodos de escritura no confirman; todo se
+        confirma o revierte junto con `confirmar_transaccion`. Admite anidación.
+        """
+        profundidad = getattr(self._local, "transaccion", 0)
+        if profundidad == 0:
+            if self.connection.in_transaction:
+                self.connection.commit()
+            self.connection.execute("BEGIN IMMEDIATE")
+            self._local.transaccion_fallida = False
+        self._local.transaccion = profundidad + 1
+    
+    def confirmar_transaccion(self) -> bool:
+        """
+        Cierra la unidad de trabajo del hilo actual.
+        
+        Returns:
+            True si se confirmó; False si algún paso falló y se revirtió todo
+        """
+        profundidad = getattr(self._local, "transaccion", 0)
+        if profundidad > 1:
+            self._local.transaccion = profundidad - 1
+            return True
+        self._local.transaccion = 0
+        if getattr(self._local, "transaccion_fallida", False):
+            self.connection.rollback()
+            return False
+        try:
+            self.connection.commit()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self.connection.rollback()
+            return False
+    
+    def revertir_transaccion(self):
+        """Revierte y cierra la unidad de trabajo del hilo actual."""
+        self._local.transaccion = 0
+        self.connection.rollback()
+    
     def _init_database(self):
         """Inicializa la base de datos y crea las tablas."""
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
+            self._conectar()
             self._create_tables()
             print(f"Base de datos inicializada: {self.db_path}")
         except Exception as e:
@@ -72,6 +406,7 @@ class DatabaseManager:
                 fecha_inicio TIMESTAMP,
                 fecha_fin TIMESTAMP,
                 alimento_recolectado INTEGER DEFAULT 0,
+                hormigas_asignadas INTEGER DEFAULT 0,
                 fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (alimento_id) REFERENCES alimentos (id)
             )
@@ -142,9 +477,42 @@ class DatabaseManager:
             )
         """)
         
+        self._migrar_esquema(cursor)
+        
         self.connection.commit()
         print("Tablas de base de datos creadas exitosamente")
     
+    def _migrar_esquema(self, cursor):
+        """
+        Aplica las migraciones de `MIGRACIONES_SQLITE` pendientes.
+        
+        La versión aplicada se guarda en la tabla `version_esquema`, de modo
+        que cada migración se ejecuta una sola vez (al arrancar) y las
+        escrituras no necesitan comprobar el esquema.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS version_esquema (
+                version INTEGER PRIMARY KEY,
+                descripcion TEXT NOT NULL,
+                fecha_aplicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM version_esquema")
+        self.version_esquema = cursor.fetchone()[0]
+        pendientes = [m for m in MIGRACIONES_SQLITE if m[0] > self.version_esquema]
+        for version, descripcion, migracion in pendientes:
+            migracion(cursor)
+            cursor.execute(
+                "INSERT OR IGNORE INTO version_esquema (version, descripcion) VALUES (?, ?)",
+                (version, descripcion)
+            )
+            self.connection.commit()
+            self.version_esquema = version
+            print(f"Migración de esquema {version} aplicada: {descripcion}")
+        if pendientes:
+            # Estadísticas para el planificador tras crear índices
+            cursor.execute("PRAGMA optimize")
+    
     def guardar_alimento(self, alimento: Alimento) -> bool:
         """Guarda un alimento en la base de datos."""
         try:
@@ -161,10 +529,11 @@ class DatabaseManager:
                 alimento.tiempo_recoleccion,
                 alimento.disponible
             ))
-            self.connection.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando alimento: {e}")
             return False
     
@@ -202,10 +571,11 @@ class DatabaseManager:
                 SET disponible = ?
                 WHERE id = ?
             """, (disponible, alimento_id))
-            self.connection.commit()
+            self._confirmar()
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error actualizando disponibilidad de alimento: {e}")
             return False
 
@@ -220,19 +590,36 @@ class DatabaseManager:
             print(f"Error obteniendo alimento por id: {e}")
             return None
     
+    def obtener_alimentos_por_ids(self, alimento_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene varios alimentos por ID (como dicts crudos) con consultas IN por tramos.
+        
+        Args:
+            alimento_ids: IDs a buscar
+            
+        Returns:
+            Diccionario alimento_id -> fila; los IDs inexistentes no aparecen
+        """
+        try:
+            cursor = self.connection.cursor()
+            ids = list(dict.fromkeys(alimento_ids))
+            filas: Dict[str, Dict[str, Any]] = {}
+            for inicio in range(0, len(ids), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("id", ids[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                cursor.execute(f"SELECT * FROM alimentos WHERE {condicion}", params)
+                for row in cursor.fetchall():
+                    filas[str(row['id'])] = dict(row)
+            return filas
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error obteniendo alimentos por ids: {e}")
+            return {}
+    
     def guardar_tarea(self, tarea: TareaRecoleccion) -> bool:
         """Guarda una tarea en la base de datos."""
         try:
             cursor = self.connection.cursor()
             
-            # Agregar columna hormigas_asignadas si no existe
-            try:
-                cursor.execute("ALTER TABLE tareas ADD COLUMN hormigas_asignadas INTEGER DEFAULT 0")
-                self.connection.commit()
-            except Exception:
-                # La columna ya existe, continuar
-                pass
-            
             # Calcular cantidad de hormigas asignadas
             cantidad_hormigas = len(tarea.hormigas_asignadas) if tarea.hormigas_asignadas else 0
             
@@ -257,99 +644,342 @@ class DatabaseManager:
                 WHERE tarea_id = ? AND (lote_id IS NULL OR lote_id = '')
             """, (tarea.id,))
             
-            # Luego insertar las nuevas asignaciones
-            for hormiga in tarea.hormigas_asignadas:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO asignaciones_hormiga_tarea 
-                    (tarea_id, hormiga_id, lote_id)
-                    VALUES (?, ?, ?)
-                """, (tarea.id, hormiga.id, tarea.hormigas_lote_id))
+            # Luego insertar las nuevas asignaciones (una sola sentencia preparada)
+            cursor.executemany("""
+                INSERT OR REPLACE INTO asignaciones_hormiga_tarea 
+                (tarea_id, hormiga_id, lote_id)
+                VALUES (?, ?, ?)
+            """, [(tarea.id, hormiga.id, tarea.hormigas_lote_id) for hormiga in tarea.hormigas_asignadas])
             
-            self.connection.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando tarea: {e}")
             return False
     
-    def obtener_tareas(self) -> List[TareaRecoleccion]:
-        """Obtiene todas las tareas de la base de datos."""
+    def actualizar_cambios_tarea(self, tarea: TareaRecoleccion, cambios: Dict[str, Any]) -> bool:
+        """
+        Escribe solo lo que cambió de una tarea ya guardada.
+        
+        Los campos modificados van en un único UPDATE de la fila de la tarea;
+        las asignaciones solo se tocan si entraron o salieron hormigas (igual
+        que `guardar_tarea`, solo se borran las que no pertenecen a un lote).
+        Si la fila no existe, o su estado ya no es `estado_anterior` porque
+        otro proceso la cambió, se guarda la tarea completa.
+        
+        Args:
+            tarea: Tarea en memoria
+            cambios: Resultado de `TareaRecoleccion.cambios_desde`
+            
+        Returns:
+            True si se guardaron los cambios
+        """
         try:
             cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT t.*, a.nombre, a.cantidad_hormigas_necesarias, 
-                       a.puntos_stock, a.tiempo_recoleccion, a.disponible
-                FROM tareas t
-                JOIN alimentos a ON t.alimento_id = a.id
-            """)
-            rows = cursor.fetchall()
-            
-            tareas = []
-            for row in rows:
-                # Crear alimento
-                alimento = Alimento(
-                    id=row['alimento_id'],
-                    nombre=row['nombre'],
-                    cantidad_hormigas_necesarias=row['cantidad_hormigas_necesarias'],
-                    puntos_stock=row['puntos_stock'],
-                    tiempo_recoleccion=row['tiempo_recoleccion'],
-                    disponible=bool(row['disponible'])
+            agregadas = cambios.get("hormigas_agregadas") or []
+            quitadas = cambios.get("hormigas_quitadas") or []
+            asignaciones = [
+                (f"{COLUMNAS_TAREA_SQLITE[campo]} = ?", _valor_campo_tarea(valor))
+                for campo, valor in cambios.get("campos", {}).items()
+            ]
+            if agregadas or quitadas:
+                asignaciones.append(("hormigas_asignadas = ?", len(tarea.hormigas_asignadas)))
+            estado_anterior = cambios.get("estado_anterior")
+            guarda = " AND estado = ?" if estado_anterior is not None else ""
+            params_guarda = [estado_anterior.value] if estado_anterior is not None else []
+            if asignaciones:
+                cursor.execute(
+                    f"UPDATE tareas SET {', '.join(a for a, _ in asignaciones)} WHERE id = ?{guarda}",
+                    [v for _, v in asignaciones] + [tarea.id] + params_guarda
                 )
-                
-                # Crear tarea
-                tarea = TareaRecoleccion(
-                    id=row['id'],
-                    alimento=alimento,
-                    estado=EstadoTarea(row['estado']),
-                    fecha_inicio=datetime.fromisoformat(row['fecha_inicio']) if row['fecha_inicio'] else None,
-                    fecha_fin=datetime.fromisoformat(row['fecha_fin']) if row['fecha_fin'] else None,
-                    alimento_recolectado=row['alimento_recolectado']
+                if cursor.rowcount == 0:
+                    return self.guardar_tarea(tarea)
+            for inicio in range(0, len(quitadas), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("hormiga_id", quitadas[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                cursor.execute(
+                    f"DELETE FROM asignaciones_hormiga_tarea WHERE tarea_id = ? AND (lote_id IS NULL OR lote_id = '') AND {condicion}",
+                    [tarea.id] + params
                 )
-                
-                # Obtener lote_id de la tarea (si existe en la tabla de tareas)
-                # Primero intentar obtener desde lotes_hormigas
-                cursor.execute("""
-                    SELECT lote_id FROM lotes_hormigas WHERE tarea_id = ? LIMIT 1
-                """, (tarea.id,))
-                lote_row = cursor.fetchone()
-                
-                if lote_row:
-                    lote_id = lote_row[0]
-                    tarea.hormigas_lote_id = lote_id
-                    # Obtener hormigas desde el lote
-                    cursor.execute("""
-                        SELECT h.* FROM hormigas h
-                        JOIN asignaciones_hormiga_tarea aht ON h.id = aht.hormiga_id
-                        WHERE aht.lote_id = ?
-                    """, (lote_id,))
-                else:
-                    # Fallback: obtener hormigas directamente por tarea_id (compatibilidad)
-                    cursor.execute("""
-                        SELECT h.* FROM hormigas h
-                        JOIN asignaciones_hormiga_tarea aht ON h.id = aht.hormiga_id
-                        WHERE aht.tarea_id = ? AND aht.lote_id IS NULL
-                    """, (tarea.id,))
-                
-                hormiga_rows = cursor.fetchall()
-                
-                for hormiga_row in hormiga_rows:
-                    hormiga = Hormiga(
-                        id=hormiga_row['id'],
-                        capacidad_carga=hormiga_row['capacidad_carga'],
-                        estado=EstadoHormiga(hormiga_row['estado']),
-                        tiempo_vida=hormiga_row['tiempo_vida'],
-                        subsistema_origen=hormiga_row['subsistema_origen']
-                    )
-                    tarea.agregar_hormiga(hormiga)
-                
-                tareas.append(tarea)
+            cursor.executemany("""
+                INSERT OR REPLACE INTO asignaciones_hormiga_tarea 
+                (tarea_id, hormiga_id, lote_id)
+                VALUES (?, ?, ?)
+            """, [(tarea.id, hormiga_id, tarea.hormigas_lote_id) for hormiga_id in agregadas])
+            self._confirmar()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self._revertir()
+            print(f"Error guardando cambios de tarea: {e}")
+            return False
+    
+    def completar_tareas(self, tareas: List[TareaRecoleccion]) -> bool:
+        """
+        Persiste en bloque el cierre de varias tareas completadas.
+        
+        Actualiza estado, fecha de fin y alimento recolectado de las tareas y
+        marca sus alimentos como no disponibles con dos UPDATE por lotes, en
+        una sola transacción. Las tareas que aún no existen en la BD se
+        guardan completas con `guardar_tarea`.
+        
+        Args:
+            tareas: Tareas ya completadas en memoria
             
-            return tareas
+        Returns:
+            True si se persistieron todas
+        """
+        if not tareas:
+            return True
+        self.iniciar_transaccion()
+        try:
+            cursor = self.connection.cursor()
+            existentes = set()
+            ids = [tarea.id for tarea in tareas]
+            for inicio in range(0, len(ids), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("id", ids[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                cursor.execute(f"SELECT id FROM tareas WHERE {condicion}", params)
+                existentes.update(row[0] for row in cursor.fetchall())
+            
+            cursor.executemany("""
+                UPDATE tareas SET estado = ?, fecha_fin = ?, alimento_recolectado = ?
+                WHERE id = ?
+            """, [
+                (
+                    tarea.estado.value,
+                    tarea.fecha_fin.isoformat() if tarea.fecha_fin else None,
+                    tarea.alimento_recolectado,
+                    tarea.id
+                )
+                for tarea in tareas if tarea.id in existentes
+            ])
+            for tarea in tareas:
+                if tarea.id not in existentes:
+                    self.guardar_tarea(tarea)
+            
+            cursor.executemany(
+                "UPDATE alimentos SET disponible = 0 WHERE id = ?",
+                [(alimento_id,) for alimento_id in {tarea.alimento.id for tarea in tareas}]
+            )
+        except Exception as e:
+            self.last_error = str(e)
+            self._revertir()
+            print(f"Error completando lote de tareas: {e}")
+        return self.confirmar_transaccion()
+    
+    _SELECT_TAREAS = """
+        SELECT t.*, a.nombre, a.cantidad_hormigas_necesarias, a.puntos_stock, 
+               a.tiempo_recoleccion, a.disponible
+        FROM tareas t
+        JOIN alimentos a ON t.alimento_id = a.id
+    """
+    
+    def obtener_tareas(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        estado: Union[str, EstadoTarea, Iterable[Union[str, EstadoTarea]], None] = None
+    ) -> List[TareaRecoleccion]:
+        """
+        Obtiene tareas de la base de datos, opcionalmente filtradas y paginadas.
+        
+        Tareas, lotes y hormigas asignadas se cargan con un número fijo de
+        consultas (una por tabla) y se combinan en memoria, en lugar de
+        consultar lotes y hormigas tarea por tarea.
+        
+        Args:
+            limit: Máximo de tareas a devolver (None = sin límite)
+            offset: Tareas a saltar; al paginar el orden es por ID
+            estado: Estado o lista de estados a filtrar (None = todos)
+            
+        Returns:
+            Lista de tareas
+        """
+        try:
+            cursor = self.connection.cursor()
+            sql = self._SELECT_TAREAS
+            params: List[Any] = []
+            
+            estados = _valores_estado(estado)
+            if estado is not None:
+                condicion, params = _condicion_in("t.estado", estados)
+                sql += f" WHERE {condicion}"
+            
+            if limit is not None or offset:
+                sql += " ORDER BY t.id LIMIT ? OFFSET ?"
+                params += [limit if limit is not None else -1, offset]
+            
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            return self._hidratar_tareas(cursor, rows)
         except Exception as e:
             self.last_error = str(e)
             print(f"Error obteniendo tareas: {e}")
             return []
     
+    def obtener_tareas_por_estado(
+        self,
+        estado: Union[str, EstadoTarea, Iterable[Union[str, EstadoTarea]]]
+    ) -> List[TareaRecoleccion]:
+        """
+        Obtiene las tareas en uno o varios estados (usa idx_tareas_estado).
+        
+        Args:
+            estado: Estado o lista de estados
+            
+        Returns:
+            Lista de tareas en esos estados
+        """
+        return self.obtener_tareas(estado=estado)
+    
+    def obtener_ids_tareas_existentes(self, tarea_ids: List[str]) -> set:
+        """
+        Indica cuáles de los IDs ya tienen una tarea guardada.
+        
+        Args:
+            tarea_ids: IDs a comprobar (se consultan con IN por tramos)
+            
+        Returns:
+            Conjunto con los IDs que existen en la BD
+        """
+        try:
+            cursor = self.connection.cursor()
+            ids = list(dict.fromkeys(tarea_ids))
+            existentes = set()
+            for inicio in range(0, len(ids), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("id", ids[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                cursor.execute(f"SELECT id FROM tareas WHERE {condicion}", params)
+                existentes.update(row[0] for row in cursor.fetchall())
+            return existentes
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error comprobando tareas existentes: {e}")
+            raise
+    
+    def obtener_tarea_por_id(self, tarea_id: str, ignorar_mayusculas: bool = False) -> Optional[TareaRecoleccion]:
+        """
+        Obtiene una tarea por su ID con una búsqueda por clave primaria.
+        
+        Args:
+            tarea_id: ID de la tarea
+            ignorar_mayusculas: Si True y no hay coincidencia exacta, busca
+                sin distinguir mayúsculas
+            
+        Returns:
+            Tarea encontrada o None
+        """
+        try:
+            cursor = self.connection.cursor()
+            tarea_id = str(tarea_id).strip()
+            cursor.execute(self._SELECT_TAREAS + " WHERE t.id = ?", (tarea_id,))
+            rows = cursor.fetchall()
+            if not rows and ignorar_mayusculas:
+                cursor.execute(self._SELECT_TAREAS + " WHERE lower(trim(t.id)) = lower(?) LIMIT 1", (tarea_id,))
+                rows = cursor.fetchall()
+            tareas = self._hidratar_tareas(cursor, rows)
+            return tareas[0] if tareas else None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error obteniendo tarea por id: {e}")
+            return None
+    
+    def _hidratar_tareas(self, cursor, rows) -> List[TareaRecoleccion]:
+        """
+        Construye las tareas a partir de filas tareas⋈alimentos.
+        
+        Carga lotes y asignaciones en bloque y las reparte por tarea:
+        - Si la tarea tiene lote, sus hormigas son las asignadas a ese lote.
+        - Si no, las asignadas a la tarea sin lote (compatibilidad).
+        
+        Args:
+            cursor: Cursor abierto sobre la conexión
+            rows: Filas de la consulta tareas⋈alimentos
+            
+        Returns:
+            Lista de tareas hidratadas
+        """
+        if not rows:
+            return []
+        
+        # Con pocas tareas se filtran las relaciones por ID (índices por tarea_id/lote_id)
+        tarea_ids = [row['id'] for row in rows]
+        filtrar = len(tarea_ids) <= MAX_IDS_EN_CONSULTA
+        
+        # Primer lote de cada tarea (en orden de inserción)
+        filtro_lotes, params_lotes = ("", [])
+        if filtrar:
+            condicion, params_lotes = _condicion_in("tarea_id", tarea_ids)
+            filtro_lotes = f"WHERE {condicion}"
+        cursor.execute(f"SELECT tarea_id, lote_id FROM lotes_hormigas {filtro_lotes} ORDER BY rowid", params_lotes)
+        lote_por_tarea: Dict[str, str] = {}
+        for lote_row in cursor.fetchall():
+            lote_por_tarea.setdefault(lote_row['tarea_id'], lote_row['lote_id'])
+        
+        # Asignaciones (de esas tareas o de sus lotes) con los datos de la hormiga
+        filtro_asignaciones, params_asignaciones = ("", [])
+        if filtrar:
+            condicion_tareas, params_tareas = _condicion_in("aht.tarea_id", tarea_ids)
+            condicion_lotes, params_lotes = _condicion_in("aht.lote_id", list(dict.fromkeys(lote_por_tarea.values())))
+            filtro_asignaciones = f"WHERE {condicion_tareas} OR {condicion_lotes}"
+            params_asignaciones = params_tareas + params_lotes
+        cursor.execute(f"""
+            SELECT aht.tarea_id AS asignacion_tarea_id, aht.lote_id AS asignacion_lote_id, h.*
+            FROM asignaciones_hormiga_tarea aht
+            JOIN hormigas h ON h.id = aht.hormiga_id
+            {filtro_asignaciones}
+            ORDER BY aht.id
+        """, params_asignaciones)
+        hormigas_por_lote: Dict[str, List[Any]] = {}
+        hormigas_sin_lote: Dict[str, List[Any]] = {}
+        for hormiga_row in cursor.fetchall():
+            if hormiga_row['asignacion_lote_id'] is not None:
+                hormigas_por_lote.setdefault(hormiga_row['asignacion_lote_id'], []).append(hormiga_row)
+            else:
+                hormigas_sin_lote.setdefault(hormiga_row['asignacion_tarea_id'], []).append(hormiga_row)
+        
+        tareas = []
+        for row in rows:
+            # Crear alimento
+            alimento = Alimento(
+                id=row['alimento_id'],
+                nombre=row['nombre'],
+                cantidad_hormigas_necesarias=row['cantidad_hormigas_necesarias'],
+                puntos_stock=row['puntos_stock'],
+                tiempo_recoleccion=row['tiempo_recoleccion'],
+                disponible=bool(row['disponible'])
+            )
+            
+            # Crear tarea
+            tarea = TareaRecoleccion(
+                id=row['id'],
+                alimento=alimento,
+                estado=EstadoTarea(row['estado']),
+                fecha_inicio=datetime.fromisoformat(row['fecha_inicio']) if row['fecha_inicio'] else None,
+                fecha_fin=datetime.fromisoformat(row['fecha_fin']) if row['fecha_fin'] else None,
+                alimento_recolectado=row['alimento_recolectado']
+            )
+            
+            lote_id = lote_por_tarea.get(tarea.id)
+            if lote_id:
+                tarea.hormigas_lote_id = lote_id
+                hormiga_rows = hormigas_por_lote.get(lote_id, [])
+            else:
+                hormiga_rows = hormigas_sin_lote.get(tarea.id, [])
+            
+            for hormiga_row in hormiga_rows:
+                tarea.agregar_hormiga(Hormiga(
+                    id=hormiga_row['id'],
+                    capacidad_carga=hormiga_row['capacidad_carga'],
+                    estado=EstadoHormiga(hormiga_row['estado']),
+                    tiempo_vida=hormiga_row['tiempo_vida'],
+                    subsistema_origen=hormiga_row['subsistema_origen']
+                ))
+            
+            tareas.append(tarea)
+        
+        return tareas
+    
     def guardar_evento(self, tipo_evento: str, descripcion: str, datos_adicionales: Dict[str, Any] = None):
         """Guarda un evento en la base de datos."""
         try:
@@ -361,13 +991,43 @@ class DatabaseManager:
                 VALUES (?, ?, ?)
             """, (tipo_evento, descripcion, datos_json))
             
-            self.connection.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando evento: {e}")
             return False
     
+    def guardar_eventos(self, eventos: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> bool:
+        """
+        Guarda varios eventos en una sola transacción.
+        
+        Args:
+            eventos: Tuplas (tipo_evento, descripcion, datos_adicionales)
+            
+        Returns:
+            True si se guardaron todos
+        """
+        if not eventos:
+            return True
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany("""
+                INSERT INTO eventos (tipo_evento, descripcion, datos_adicionales)
+                VALUES (?, ?, ?)
+            """, [
+                (tipo, descripcion, json.dumps(datos) if datos else None)
+                for tipo, descripcion, datos in eventos
+            ])
+            self._confirmar()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self._revertir()
+            print(f"Error guardando lote de eventos: {e}")
+            return False
+    
     def obtener_eventos(self, limite: int = 100) -> List[Dict[str, Any]]:
         """Obtiene los eventos más recientes."""
         try:
@@ -396,9 +1056,13 @@ class DatabaseManager:
             return []
     
     def cerrar(self):
-        """Cierra la conexión a la base de datos."""
-        if self.connection:
-            self.connection.close()
+        """Cierra las conexiones a la base de datos de todos los hilos."""
+        with self._conexiones_lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conexion in conexiones:
+            conexion.close()
+        self._local = threading.local()
+        if conexiones:
             print("Conexión a base de datos cerrada")
 
     # Nuevos helpers para unificar uso desde PersistenceService
@@ -413,10 +1077,11 @@ class DatabaseManager:
                 """,
                 (nuevo_estado, tarea_id),
             )
-            self.connection.commit()
+            self._confirmar()
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error actualizando estado de tarea (SQLite): {e}")
             return False
 
@@ -439,10 +1104,11 @@ class DatabaseManager:
                     mensaje.procesado,
                 ),
             )
-            self.connection.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando mensaje (SQLite): {e}")
             return False
 
@@ -503,10 +1169,11 @@ class DatabaseManager:
                 (lote_id, tarea_id, cantidad_hormigas_enviadas, cantidad_hormigas_requeridas, estado)
                 VALUES (?, ?, ?, ?, 'pendiente')
             """, (lote_id, tarea_id, cantidad_enviada, cantidad_requerida))
-            self.connection.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error creando lote de hormigas: {e}")
             return False
     
@@ -543,10 +1210,11 @@ class DatabaseManager:
                 SET estado = 'aceptado', fecha_aceptacion = CURRENT_TIMESTAMP
                 WHERE lote_id = ?
             """, (lote_id,))
-            self.connection.commit()
+            self._confirmar()
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error aceptando lote de hormigas: {e}")
             return False
     
@@ -567,10 +1235,11 @@ class DatabaseManager:
                 SET estado = 'en_uso'
                 WHERE lote_id = ?
             """, (lote_id,))
-            self.connection.commit()
+            self._confirmar()
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error marcando lote en uso: {e}")
             return False
     
@@ -631,32 +1300,24 @@ class DatabaseManager:
             
             tarea_id = row[0]
             
-            # Guardar cada hormiga en asignaciones con el lote_id
-            for hormiga in hormigas:
-                # Guardar hormiga si no existe
-                cursor.execute("""
-                    INSERT OR IGNORE INTO hormigas 
-                    (id, capacidad_carga, estado, tiempo_vida, subsistema_origen)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    hormiga.id,
-                    hormiga.capacidad_carga,
-                    hormiga.estado.value if hasattr(hormiga.estado, 'value') else str(hormiga.estado),
-                    hormiga.tiempo_vida,
-                    hormiga.subsistema_origen
-                ))
-                
-                # Guardar asignación con lote_id
-                cursor.execute("""
-                    INSERT OR REPLACE INTO asignaciones_hormiga_tarea 
-                    (tarea_id, hormiga_id, lote_id)
-                    VALUES (?, ?, ?)
-                """, (tarea_id, hormiga.id, lote_id))
+            # Guardar las hormigas que no existan y sus asignaciones con el
+            # lote_id: dos sentencias preparadas para todo el lote
+            cursor.executemany("""
+                INSERT OR IGNORE INTO hormigas 
+                (id, capacidad_carga, estado, tiempo_vida, subsistema_origen)
+                VALUES (?, ?, ?, ?, ?)
+            """, [_fila_hormiga(hormiga) for hormiga in hormigas])
+            cursor.executemany("""
+                INSERT OR REPLACE INTO asignaciones_hormiga_tarea 
+                (tarea_id, hormiga_id, lote_id)
+                VALUES (?, ?, ?)
+            """, [(tarea_id, hormiga.id, lote_id) for hormiga in hormigas])
             
-            self.connection.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando hormigas en lote: {e}")
             return False
     
@@ -728,6 +1389,9 @@ class SqlServerDatabaseManager:
     """
     Gestor de base de datos para Microsoft SQL Server (autenticación de Windows).
     Requiere el controlador ODBC adecuado instalado (p. ej., ODBC Driver 18 for SQL Server).
+    
+    Las conexiones pyodbc no se comparten entre hilos: cada hilo abre la suya
+    bajo demanda con la misma cadena de conexión.
     """
 
     def __init__(self, server: str, database: str):
@@ -742,14 +1406,177 @@ class SqlServerDatabaseManager:
             f"DRIVER={{{driver}}};SERVER={server};DATABASE={database};"
             f"Trusted_Connection=yes;Encrypt={encrypt};TrustServerCertificate={trust_server_cert}"
         )
-        self.connection = self.pyodbc.connect(conn_str)
-        self.connection.autocommit = True
+        self._conn_str = conn_str
+        self.fast_executemany = os.getenv("SQLSERVER_FAST_EXECUTEMANY", "true").lower() == "true"
+        # ID de alimento de la aplicación -> ID numérico (IDENTITY) del esquema script
+        self.ids_alimentos = CacheLRU(int(os.getenv("SQLSERVER_CACHE_IDS", "1000")))
+        self.capacidad_sentencias = int(os.getenv("SQLSERVER_CACHE_SENTENCIAS", "32"))
+        self._local = threading.local()
+        self._conexiones: List[Any] = []
+        self._conexiones_lock = threading.Lock()
+        self._conectar()
         self._detect_schema()
+        self.version_esquema = 0
+        self._migrar_esquema()
         print(f"Base de datos SQL Server inicializada: {server} / {database}")
 
+    @property
+    def connection(self):
+        """Conexión del hilo actual (se abre la primera vez que se usa)."""
+        conexion = getattr(self._local, "connection", None)
+        if conexion is None:
+            conexion = self._conectar()
+        return conexion
+
+    def _conectar(self):
+        """Abre una conexión para el hilo actual y la registra para cerrarla luego."""
+        conexion = self.pyodbc.connect(self._conn_str)
+        conexion.autocommit = True
+        with self._conexiones_lock:
+            self._conexiones.append(conexion)
+        self._local.connection = conexion
+        self._local.sentencias = CacheLRU(self.capacidad_sentencias, _cerrar_cursor)
+        return conexion
+
+    def _en_transaccion(self) -> bool:
+        """Indica si el hilo actual tiene una unidad de trabajo abierta."""
+        return getattr(self._local, "transaccion", 0) > 0
+
+    def _confirmar(self):
+        """Confirma la escritura, salvo dentro de una unidad de trabajo (se difiere)."""
+        if not self._en_transaccion():
+            self.connection.commit()
+
+    def _revertir(self):
+        """
+        Revierte la escritura fallida del hilo actual.
+
+        Dentro de una unidad de trabajo solo la marca como fallida: se
+        revierte completa al confirmarla.
+        """
+        if self._en_transaccion():
+            self._local.transaccion_fallida = True
+            return
+        try:
+            self.connection.rollback()
+        except Exception:
+            pass
+
+    def iniciar_transaccion(self):
+        """
+        Abre una unidad de trabajo en la conexión del hilo actual.
+
+        Desactiva el autocommit hasta `confirmar_transaccion` o
+        `revertir_transaccion`. Admite anidación.
+        """
+        profundidad = getattr(self._local, "transaccion", 0)
+        if profundidad == 0:
+            self.connection.autocommit = False
+            self._local.transaccion_fallida = False
+        self._local.transaccion = profundidad + 1
+
+    def confirmar_transaccion(self) -> bool:
+        """
+        Cierra la unidad de trabajo del hilo actual.
+
+        Returns:
+            True si se confirmó; False si algún paso falló y se revirtió todo
+        """
+        profundidad = getattr(self._local, "transaccion", 0)
+        if profundidad > 1:
+            self._local.transaccion = profundidad - 1
+            return True
+        self._local.transaccion = 0
+        conexion = self.connection
+        try:
+            if getattr(self._local, "transaccion_fallida", False):
+                conexion.rollback()
+                return False
+            conexion.commit()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            conexion.rollback()
+            return False
+        finally:
+            conexion.autocommit = True
+
+    def revertir_transaccion(self):
+        """Revierte y cierra la unidad de trabajo del hilo actual."""
+        self._local.transaccion = 0
+        conexion = self.connection
+        try:
+            conexion.rollback()
+        finally:
+            conexion.autocommit = True
+
     def _exec(self, cursor, sql: str, params: tuple = ()):
         cursor.execute(sql, params) if params else cursor.execute(sql)
 
+    def _cursor_sentencia(self, sql: str):
+        """
+        Cursor del hilo actual reservado para la sentencia `sql`.
+        
+        pyodbc solo prepara de nuevo una sentencia si cambia el texto SQL
+        respecto a la última ejecutada en el cursor, así que usar siempre el
+        mismo cursor para una sentencia frecuente evita volver a analizarla en
+        cada llamada. Se guardan como mucho `SQLSERVER_CACHE_SENTENCIAS`
+        cursores por conexión (LRU).
+        """
+        conexion = self.connection
+        sentencias = self._local.sentencias
+        cursor = sentencias.obtener(sql)
+        if cursor is None:
+            cursor = conexion.cursor()
+            sentencias.guardar(sql, cursor)
+        return cursor
+
+    def _exec_preparada(self, sql: str, params: tuple = ()):
+        """Ejecuta `sql` en su cursor reservado y lo devuelve (ver `_cursor_sentencia`)."""
+        cursor = self._cursor_sentencia(sql)
+        self._exec(cursor, sql, params)
+        return cursor
+
+    def _traducir_alimento_id(self, alimento_id: str) -> Any:
+        """
+        ID de alimento tal como se guarda en `dbo.Alimentos.id`.
+        
+        En el esquema script el ID es un INT (IDENTITY): los IDs numéricos se
+        usan tal cual y los demás se buscan en `ids_alimentos`, que rellena
+        `guardar_alimento` al insertarlos. La traducción vive solo en memoria:
+        tras un reinicio un ID no numérico no se puede resolver. Sin
+        traducción conocida se devuelve el ID sin cambios.
+        """
+        if self.schema_type != "script":
+            return alimento_id
+        try:
+            return int(alimento_id)
+        except (ValueError, TypeError):
+            pass
+        numerico = self.ids_alimentos.obtener(alimento_id)
+        return numerico if numerico is not None else alimento_id
+
+    def obtener_metricas_cache(self) -> Dict[str, Any]:
+        """Métricas de la caché de IDs de alimentos y de sentencias del hilo actual."""
+        sentencias = getattr(self._local, "sentencias", None)
+        return {
+            "ids_alimentos": self.ids_alimentos.obtener_metricas(),
+            "sentencias": sentencias.obtener_metricas() if sentencias is not None else None
+        }
+
+    def _executemany(self, cursor, sql: str, filas: List[tuple]):
+        """
+        Ejecuta `sql` para todas las filas en un único envío.
+        
+        Con `fast_executemany` pyodbc manda las filas como arrays de
+        parámetros, así que el coste en idas y vueltas no depende de cuántas
+        filas haya. Se desactiva con `SQLSERVER_FAST_EXECUTEMANY=false`.
+        """
+        if not filas:
+            return
+        cursor.fast_executemany = self.fast_executemany
+        cursor.executemany(sql, filas)
+
     def _fetchall_dicts(self, cursor) -> List[Dict[str, Any]]:
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -767,8 +1594,44 @@ class SqlServerDatabaseManager:
         else:
             self.schema_type = "script"
 
+    def _migrar_esquema(self):
+        """
+        Aplica una vez las migraciones de `MIGRACIONES_SQLSERVER` pendientes.
+        
+        La versión aplicada se guarda en `dbo.version_esquema`. Si el usuario
+        no tiene permisos de DDL se avisa y se continúa con el esquema actual.
+        """
+        try:
+            cursor = self.connection.cursor()
+            self._exec(cursor, """
+                IF OBJECT_ID(N'dbo.version_esquema', N'U') IS NULL
+                    CREATE TABLE dbo.version_esquema (
+                        version INT PRIMARY KEY,
+                        descripcion NVARCHAR(200) NOT NULL,
+                        fecha_aplicacion DATETIME2 DEFAULT SYSDATETIME()
+                    )
+            """)
+            self._exec(cursor, "SELECT COALESCE(MAX(version), 0) FROM dbo.version_esquema")
+            self.version_esquema = cursor.fetchone()[0]
+            for version, descripcion, sql in MIGRACIONES_SQLSERVER:
+                if version <= self.version_esquema:
+                    continue
+                self._exec(cursor, sql)
+                self._exec(
+                    cursor,
+                    "IF NOT EXISTS (SELECT 1 FROM dbo.version_esquema WHERE version = ?) "
+                    "INSERT INTO dbo.version_esquema (version, descripcion) VALUES (?, ?)",
+                    (version, version, descripcion)
+                )
+                self.version_esquema = version
+                print(f"Migración de esquema {version} aplicada: {descripcion}")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Advertencia: no se pudieron aplicar las migraciones de esquema: {e}")
+
     # API similar a DatabaseManager
     def guardar_alimento(self, alimento: Alimento) -> bool:
+        self.ids_alimentos.invalidar(alimento.id)
         try:
             cursor = self.connection.cursor()
             if self.schema_type == "nuevo":
@@ -813,6 +1676,7 @@ class SqlServerDatabaseManager:
                 estado = "disponible" if alimento.disponible else "recolectado"
                 self._exec(cursor, """
                     INSERT INTO dbo.Alimentos (nombre, tipo, zona_id, cantidad_unitaria, peso, duracion_recoleccion, hormigas_requeridas, estado, disponible)
+                    OUTPUT INSERTED.id
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     alimento.nombre,
@@ -825,9 +1689,15 @@ class SqlServerDatabaseManager:
                     estado,
                     1 if alimento.disponible else 0,
                 ))
+                # Recordar el ID asignado a los alimentos con ID no numérico
+                # (los numéricos ya son el ID de la tabla y no se traducen)
+                fila = cursor.fetchone()
+                if fila is not None and alimento.id is not None and not str(alimento.id).strip().isdigit():
+                    self.ids_alimentos.guardar(alimento.id, fila[0])
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando alimento (SQL Server): {e}")
             return False
 
@@ -877,10 +1747,9 @@ class SqlServerDatabaseManager:
                 columns = [col[0] for col in cursor.description]
                 return dict(zip(columns, row))
             else:
-                # En esquema script, id es INT; intentar convertir
-                try:
-                    aid = int(alimento_id)
-                except:
+                # En esquema script, id es INT; traducir si hace falta
+                aid = self._traducir_alimento_id(alimento_id)
+                if not isinstance(aid, int):
                     return None
                 self._exec(cursor, "SELECT id, nombre, cantidad_unitaria AS puntos_stock, duracion_recoleccion AS tiempo_recoleccion, hormigas_requeridas AS cantidad_hormigas_necesarias, disponible FROM dbo.Alimentos WHERE id = ?", (aid,))
                 row = cursor.fetchone()
@@ -892,6 +1761,33 @@ class SqlServerDatabaseManager:
             print(f"Error obteniendo alimento por id (SQL Server): {e}")
             return None
 
+    def obtener_alimentos_por_ids(self, alimento_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene varios alimentos por ID (como dicts crudos) con consultas IN por tramos.
+        
+        En el esquema script los IDs son INT; los que no son numéricos se omiten.
+        """
+        try:
+            cursor = self.connection.cursor()
+            if self.schema_type == "nuevo":
+                columnas = "id, nombre, cantidad_hormigas_necesarias, puntos_stock, tiempo_recoleccion, disponible"
+                ids: List[Any] = list(dict.fromkeys(alimento_ids))
+            else:
+                columnas = ("id, nombre, cantidad_unitaria AS puntos_stock, duracion_recoleccion AS tiempo_recoleccion, "
+                            "hormigas_requeridas AS cantidad_hormigas_necesarias, disponible")
+                ids = list(dict.fromkeys(int(a) for a in alimento_ids if str(a).strip().isdigit()))
+            filas: Dict[str, Dict[str, Any]] = {}
+            for inicio in range(0, len(ids), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("id", ids[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                self._exec(cursor, f"SELECT {columnas} FROM dbo.Alimentos WHERE {condicion}", params)
+                for row in self._fetchall_dicts(cursor):
+                    filas[str(row['id'])] = row
+            return filas
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error obteniendo alimentos por ids (SQL Server): {e}")
+            return {}
+
     def actualizar_alimento_disponibilidad(self, alimento_id: str, disponible: bool) -> bool:
         """Actualiza la disponibilidad de un alimento."""
         try:
@@ -906,7 +1802,9 @@ class SqlServerDatabaseManager:
             else:
                 # Esquema script: id es INT
                 try:
-                    aid = int(alimento_id)
+                    aid = self._traducir_alimento_id(alimento_id)
+                    if not isinstance(aid, int):
+                        raise ValueError(alimento_id)
                     self._exec(cursor, """
                         UPDATE dbo.Alimentos 
                         SET disponible = ?, estado = ?
@@ -915,57 +1813,31 @@ class SqlServerDatabaseManager:
                 except ValueError:
                     print(f"Error: alimento_id '{alimento_id}' no es un número válido para el esquema script")
                     return False
-            cursor.commit()
+            self._confirmar()
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error actualizando disponibilidad de alimento (SQL Server): {e}")
             return False
 
     def guardar_tarea(self, tarea: TareaRecoleccion) -> bool:
         try:
-            cursor = self.connection.cursor()
-            
-            # Agregar columna hormigas_asignadas si no existe
-            try:
-                self._exec(cursor, """
-                    IF NOT EXISTS (
-                        SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS 
-                        WHERE TABLE_NAME = 'Tareas' AND COLUMN_NAME = 'hormigas_asignadas'
-                    )
-                    ALTER TABLE dbo.Tareas ADD hormigas_asignadas INT DEFAULT 0
-                """)
-            except Exception:
-                # La columna ya existe o error al agregar, continuar
-                pass
-            
             # Calcular cantidad de hormigas asignadas
             cantidad_hormigas = len(tarea.hormigas_asignadas) if tarea.hormigas_asignadas else 0
             
-            # Convertir alimento_id según el esquema
-            alimento_id_valor = tarea.alimento.id
-            if self.schema_type == "script":
-                # En esquema script, alimento_id es INT, necesitamos buscar el ID numérico
-                try:
-                    # Intentar convertir directamente si es numérico
-                    alimento_id_valor = int(tarea.alimento.id)
-                except (ValueError, TypeError):
-                    # Si no es numérico, buscar el alimento en BD para obtener su ID numérico
-                    alimento_bd = self.obtener_alimento_por_id(tarea.alimento.id)
-                    if alimento_bd and 'id' in alimento_bd:
-                        # El ID en BD puede ser numérico
-                        alimento_id_valor = alimento_bd['id']
-                    else:
-                        # Si no se encuentra, intentar usar el ID como está (puede fallar)
-                        print(f"Advertencia: No se pudo convertir alimento_id '{tarea.alimento.id}' a INT para esquema script")
-                        alimento_id_valor = tarea.alimento.id
+            # Convertir alimento_id según el esquema (sin consultar la BD)
+            alimento_id_valor = self._traducir_alimento_id(tarea.alimento.id)
+            if self.schema_type == "script" and not isinstance(alimento_id_valor, int):
+                print(f"Advertencia: No se pudo convertir alimento_id '{tarea.alimento.id}' a INT para esquema script")
             
             # Obtener el valor del estado como string
             estado_valor = tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado)
             
             # UPSERT manual - usar nombres de columnas correctos de SQL Server
             # Columnas: id, alimento_id, estado, inicio, fin, cantidad_recolectada, hormigas_asignadas
-            self._exec(cursor, """
+            # Sentencias fijas en cursores reservados: se preparan una vez por conexión
+            cursor = self._exec_preparada("""
                 UPDATE dbo.Tareas SET
                     alimento_id = ?,
                     estado = ?,
@@ -987,7 +1859,7 @@ class SqlServerDatabaseManager:
             if rows_updated > 0:
                 print(f"[SQL Server] Tarea {tarea.id} actualizada en BD. Estado: {estado_valor}, Fecha inicio: {tarea.fecha_inicio}, Fecha fin: {tarea.fecha_fin}")
             if rows_updated == 0:
-                self._exec(cursor, """
+                self._exec_preparada("""
                     INSERT INTO dbo.Tareas (id, alimento_id, estado, inicio, fin, cantidad_recolectada, hormigas_asignadas)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, (
@@ -1003,227 +1875,201 @@ class SqlServerDatabaseManager:
 
             # Asignaciones de hormigas
             # Primero eliminar asignaciones antiguas sin lote_id (para mantener compatibilidad con lotes)
-            self._exec(cursor, """
+            self._exec_preparada("""
                 DELETE FROM dbo.asignaciones_hormiga_tarea 
                 WHERE tarea_id = ? AND (lote_id IS NULL OR lote_id = '')
             """, (tarea.id,))
             
-            # Luego insertar las nuevas asignaciones
-            for hormiga in tarea.hormigas_asignadas:
-                self._exec(cursor, """
-                    IF NOT EXISTS (
-                        SELECT 1 FROM dbo.asignaciones_hormiga_tarea 
-                        WHERE tarea_id = ? AND hormiga_id = ? AND (lote_id = ? OR (lote_id IS NULL AND ? IS NULL))
-                    )
-                    INSERT INTO dbo.asignaciones_hormiga_tarea (tarea_id, hormiga_id, lote_id) 
-                    VALUES (?, ?, ?)
-                """, (
-                    tarea.id, hormiga.id, tarea.hormigas_lote_id, tarea.hormigas_lote_id,
-                    tarea.id, hormiga.id, tarea.hormigas_lote_id
-                ))
+            # Luego insertar las nuevas asignaciones (un solo envío para todas)
+            lote_id = tarea.hormigas_lote_id
+            sql_asignacion = """
+                INSERT INTO dbo.asignaciones_hormiga_tarea (tarea_id, hormiga_id, lote_id)
+                SELECT ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM dbo.asignaciones_hormiga_tarea 
+                    WHERE tarea_id = ? AND hormiga_id = ? AND (lote_id = ? OR (lote_id IS NULL AND ? IS NULL))
+                )
+            """
+            self._executemany(self._cursor_sentencia(sql_asignacion), sql_asignacion, [
+                (tarea.id, hormiga_id, lote_id, tarea.id, hormiga_id, lote_id, lote_id)
+                for hormiga_id in dict.fromkeys(h.id for h in tarea.hormigas_asignadas)
+            ])
             
             # Hacer commit de todos los cambios
-            cursor.commit()
+            self._confirmar()
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando tarea (SQL Server): {e}")
             return False
 
-    def obtener_tareas(self) -> List[TareaRecoleccion]:
+    def actualizar_cambios_tarea(self, tarea: TareaRecoleccion, cambios: Dict[str, Any]) -> bool:
+        """Escribe solo lo que cambió de una tarea ya guardada (SQL Server)."""
         try:
             cursor = self.connection.cursor()
-            # Primero intentar obtener todas las tareas sin JOIN para verificar que existen
-            self._exec(cursor, "SELECT COUNT(*) as total FROM dbo.Tareas")
-            count_row = cursor.fetchone()
-            total_tareas = count_row[0] if count_row else 0
-            print(f"[DEBUG] Total de tareas en SQL Server: {total_tareas}")
+            agregadas = cambios.get("hormigas_agregadas") or []
+            quitadas = cambios.get("hormigas_quitadas") or []
+            asignaciones = [
+                (f"{COLUMNAS_TAREA_SQLSERVER[campo]} = ?", _valor_campo_tarea(valor))
+                for campo, valor in cambios.get("campos", {}).items()
+            ]
+            if agregadas or quitadas:
+                asignaciones.append(("hormigas_asignadas = ?", len(tarea.hormigas_asignadas)))
+            estado_anterior = cambios.get("estado_anterior")
+            guarda = " AND estado = ?" if estado_anterior is not None else ""
+            params_guarda = (estado_anterior.value,) if estado_anterior is not None else ()
+            if asignaciones:
+                self._exec(
+                    cursor,
+                    f"UPDATE dbo.Tareas SET {', '.join(a for a, _ in asignaciones)} WHERE id = ?{guarda}",
+                    tuple(v for _, v in asignaciones) + (tarea.id,) + params_guarda
+                )
+                if cursor.rowcount == 0:
+                    return self.guardar_tarea(tarea)
+            for inicio in range(0, len(quitadas), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("hormiga_id", quitadas[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                self._exec(
+                    cursor,
+                    f"DELETE FROM dbo.asignaciones_hormiga_tarea WHERE tarea_id = ? AND (lote_id IS NULL OR lote_id = '') AND {condicion}",
+                    tuple([tarea.id] + params)
+                )
+            lote_id = tarea.hormigas_lote_id
+            self._executemany(cursor, """
+                INSERT INTO dbo.asignaciones_hormiga_tarea (tarea_id, hormiga_id, lote_id)
+                SELECT ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM dbo.asignaciones_hormiga_tarea 
+                    WHERE tarea_id = ? AND hormiga_id = ? AND (lote_id = ? OR (lote_id IS NULL AND ? IS NULL))
+                )
+            """, [(tarea.id, h, lote_id, tarea.id, h, lote_id, lote_id) for h in agregadas])
+            self._confirmar()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self._revertir()
+            print(f"Error guardando cambios de tarea (SQL Server): {e}")
+            return False
+
+    def completar_tareas(self, tareas: List[TareaRecoleccion]) -> bool:
+        """Persiste en bloque el cierre de varias tareas completadas (SQL Server)."""
+        if not tareas:
+            return True
+        self.iniciar_transaccion()
+        try:
+            cursor = self.connection.cursor()
+            existentes = set()
+            ids = [tarea.id for tarea in tareas]
+            for inicio in range(0, len(ids), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("id", ids[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                self._exec(cursor, f"SELECT id FROM dbo.Tareas WHERE {condicion}", tuple(params))
+                existentes.update(str(row[0]) for row in cursor.fetchall())
             
-            # Consulta adaptada según el esquema detectado - usar LEFT JOIN para no perder tareas
+            actualizar = [
+                (
+                    tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado),
+                    tarea.fecha_fin.isoformat() if tarea.fecha_fin else None,
+                    tarea.alimento_recolectado,
+                    tarea.id
+                )
+                for tarea in tareas if tarea.id in existentes
+            ]
+            if actualizar:
+                cursor.executemany("""
+                    UPDATE dbo.Tareas SET estado = ?, fin = ?, cantidad_recolectada = ?
+                    WHERE id = ?
+                """, actualizar)
+            for tarea in tareas:
+                if tarea.id not in existentes:
+                    self.guardar_tarea(tarea)
+            
+            alimento_ids = {tarea.alimento.id for tarea in tareas}
             if self.schema_type == "nuevo":
-                self._exec(cursor, """
-                    SELECT t.id AS tarea_id, t.alimento_id, t.estado, t.inicio, t.fin, t.cantidad_recolectada,
-                           a.nombre, a.cantidad_hormigas_necesarias, a.puntos_stock, a.tiempo_recoleccion, a.disponible
-                    FROM dbo.Tareas t
-                    LEFT JOIN dbo.Alimentos a ON CAST(t.alimento_id AS VARCHAR) = CAST(a.id AS VARCHAR)
-                """)
+                cursor.executemany(
+                    "UPDATE dbo.Alimentos SET disponible = 0 WHERE id = ?",
+                    [(alimento_id,) for alimento_id in alimento_ids]
+                )
             else:
-                # Esquema script: usar alias para mapear columnas - LEFT JOIN para no perder tareas
-                self._exec(cursor, """
-                    SELECT t.id AS tarea_id, t.alimento_id, t.estado, t.inicio, t.fin, t.cantidad_recolectada,
-                           a.nombre, 
-                           a.hormigas_requeridas AS cantidad_hormigas_necesarias,
-                           a.cantidad_unitaria AS puntos_stock,
-                           a.duracion_recoleccion AS tiempo_recoleccion,
-                           a.disponible
-                    FROM dbo.Tareas t
-                    LEFT JOIN dbo.Alimentos a ON CAST(t.alimento_id AS VARCHAR) = CAST(a.id AS VARCHAR)
-                """)
+                # Esquema script: id es INT
+                numericos = []
+                for alimento_id in alimento_ids:
+                    try:
+                        numericos.append((int(alimento_id),))
+                    except ValueError:
+                        print(f"Error: alimento_id '{alimento_id}' no es un número válido para el esquema script")
+                if numericos:
+                    cursor.executemany(
+                        "UPDATE dbo.Alimentos SET disponible = 0, estado = 'recolectado' WHERE id = ?",
+                        numericos
+                    )
+        except Exception as e:
+            self.last_error = str(e)
+            self._revertir()
+            print(f"Error completando lote de tareas (SQL Server): {e}")
+        return self.confirmar_transaccion()
+
+    def _select_tareas_sql(self) -> str:
+        """Consulta base Tareas⋈Alimentos adaptada al esquema detectado."""
+        # LEFT JOIN para no perder tareas cuyo alimento no exista
+        if self.schema_type == "nuevo":
+            return """
+                SELECT t.id AS tarea_id, t.alimento_id, t.estado, t.inicio, t.fin, t.cantidad_recolectada,
+                       a.nombre, a.cantidad_hormigas_necesarias, a.puntos_stock, a.tiempo_recoleccion, a.disponible
+                FROM dbo.Tareas t
+                LEFT JOIN dbo.Alimentos a ON CAST(t.alimento_id AS VARCHAR) = CAST(a.id AS VARCHAR)
+            """
+        # Esquema script: usar alias para mapear columnas
+        return """
+            SELECT t.id AS tarea_id, t.alimento_id, t.estado, t.inicio, t.fin, t.cantidad_recolectada,
+                   a.nombre, 
+                   a.hormigas_requeridas AS cantidad_hormigas_necesarias,
+                   a.cantidad_unitaria AS puntos_stock,
+                   a.duracion_recoleccion AS tiempo_recoleccion,
+                   a.disponible
+            FROM dbo.Tareas t
+            LEFT JOIN dbo.Alimentos a ON CAST(t.alimento_id AS VARCHAR) = CAST(a.id AS VARCHAR)
+        """
+
+    def obtener_tareas(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        estado: Union[str, EstadoTarea, Iterable[Union[str, EstadoTarea]], None] = None
+    ) -> List[TareaRecoleccion]:
+        """
+        Obtiene tareas (SQL Server), opcionalmente filtradas y paginadas.
+        
+        Tareas, lotes y asignaciones se cargan con un número fijo de consultas
+        y se combinan en memoria (ver `_hidratar_tareas`).
+        
+        Args:
+            limit: Máximo de tareas a devolver (None = sin límite)
+            offset: Tareas a saltar; al paginar el orden es por ID
+            estado: Estado o lista de estados a filtrar (None = todos)
+            
+        Returns:
+            Lista de tareas
+        """
+        try:
+            cursor = self.connection.cursor()
+            sql = self._select_tareas_sql()
+            params: List[Any] = []
+            
+            if estado is not None:
+                condicion, params = _condicion_in("t.estado", _valores_estado(estado))
+                sql += f" WHERE {condicion}"
+            
+            if limit is not None or offset:
+                sql += " ORDER BY t.id OFFSET ? ROWS"
+                params.append(offset)
+                if limit is not None:
+                    sql += " FETCH NEXT ? ROWS ONLY"
+                    params.append(limit)
+            
+            self._exec(cursor, sql, tuple(params))
             rows = self._fetchall_dicts(cursor)
             print(f"[DEBUG] Filas obtenidas del JOIN: {len(rows)}")
-
-            tareas: List[TareaRecoleccion] = []
-            for row in rows:
-                # Debug: mostrar primera fila para diagnóstico
-                if len(tareas) == 0:
-                    print(f"[DEBUG] Primera fila de tarea: {row}")
-                
-                # Obtener alimento_id - puede ser INT o NVARCHAR
-                alimento_id_raw = row.get('alimento_id')
-                alimento_id_str = str(alimento_id_raw) if alimento_id_raw is not None else None
-                
-                # Mapear columnas según esquema - si no hay alimento en el JOIN, usar valores por defecto
-                if self.schema_type == "nuevo":
-                    cantidad_hormigas = row.get('cantidad_hormigas_necesarias', 0)
-                    puntos = row.get('puntos_stock', 0)
-                    tiempo = row.get('tiempo_recoleccion', 0)
-                else:
-                    cantidad_hormigas = row.get('cantidad_hormigas_necesarias', row.get('hormigas_requeridas', 0))
-                    puntos = row.get('puntos_stock', row.get('cantidad_unitaria', 0))
-                    tiempo = row.get('tiempo_recoleccion', row.get('duracion_recoleccion', 0))
-                
-                # Si no hay alimento en el JOIN (LEFT JOIN), crear uno con valores por defecto
-                nombre_alimento = row.get('nombre')
-                if not nombre_alimento:
-                    # No hay alimento asociado, crear uno genérico
-                    alimento = Alimento(
-                        id=alimento_id_str or "UNKNOWN",
-                        nombre="Alimento no encontrado",
-                        cantidad_hormigas_necesarias=0,
-                        puntos_stock=0,
-                        tiempo_recoleccion=0,
-                        disponible=False
-                    )
-                else:
-                    alimento = Alimento(
-                        id=alimento_id_str or "UNKNOWN",
-                        nombre=nombre_alimento,
-                        cantidad_hormigas_necesarias=int(cantidad_hormigas) if cantidad_hormigas else 0,
-                        puntos_stock=int(puntos) if puntos else 0,
-                        tiempo_recoleccion=int(tiempo) if tiempo else 0,
-                        disponible=bool(row.get('disponible', False))
-                    )
-                
-                # Manejar fechas de forma segura - usar nombres de columnas correctos de SQL Server
-                fecha_inicio = None
-                fecha_fin = None
-                try:
-                    # La columna en SQL Server se llama 'inicio', no 'fecha_inicio'
-                    if row.get('inicio'):
-                        inicio_val = row['inicio']
-                        # Si es un objeto datetime de pyodbc, usarlo directamente
-                        if isinstance(inicio_val, datetime):
-                            fecha_inicio = inicio_val
-                        else:
-                            # Si es string, parsear
-                            fecha_inicio_str = str(inicio_val)
-                            if 'T' in fecha_inicio_str or '-' in fecha_inicio_str:
-                                fecha_inicio = datetime.fromisoformat(fecha_inicio_str.replace('Z', '+00:00'))
-                except Exception as e:
-                    print(f"[DEBUG] Error parseando fecha_inicio: {e}, valor: {row.get('inicio')}")
-                    pass
-                try:
-                    # La columna en SQL Server se llama 'fin', no 'fecha_fin'
-                    if row.get('fin'):
-                        fin_val = row['fin']
-                        # Si es un objeto datetime de pyodbc, usarlo directamente
-                        if isinstance(fin_val, datetime):
-                            fecha_fin = fin_val
-                        else:
-                            # Si es string, parsear
-                            fecha_fin_str = str(fin_val)
-                            if 'T' in fecha_fin_str or '-' in fecha_fin_str:
-                                fecha_fin = datetime.fromisoformat(fecha_fin_str.replace('Z', '+00:00'))
-                except Exception as e:
-                    print(f"[DEBUG] Error parseando fecha_fin: {e}, valor: {row.get('fin')}")
-                    pass
-                
-                # Obtener ID de tarea - usar 'tarea_id' del alias o 'id' como fallback
-                tarea_id = str(row.get('tarea_id', row.get('id', ''))).strip()
-                if not tarea_id:
-                    print(f"Advertencia: Tarea sin ID válido. Row: {row}")
-                    continue
-                
-                # La columna en SQL Server se llama 'cantidad_recolectada', no 'alimento_recolectado'
-                cantidad_recolectada = int(row.get('cantidad_recolectada', 0))
-                
-                tarea = TareaRecoleccion(
-                    id=tarea_id,
-                    alimento=alimento,
-                    estado=EstadoTarea(row.get('estado', 'pendiente')),
-                    fecha_inicio=fecha_inicio,
-                    fecha_fin=fecha_fin,
-                    alimento_recolectado=cantidad_recolectada
-                )
-                
-                # Obtener hormigas_asignadas directamente de la columna
-                try:
-                    self._exec(cursor, "SELECT hormigas_asignadas FROM dbo.Tareas WHERE id = ?", (tarea.id,))
-                    hormigas_row = cursor.fetchone()
-                    if hormigas_row and hormigas_row[0] is not None:
-                        cantidad_hormigas_bd = int(hormigas_row[0])
-                        # Si hay hormigas asignadas en BD pero no en memoria, crear hormigas genéricas
-                        if cantidad_hormigas_bd > 0 and len(tarea.hormigas_asignadas) == 0:
-                            # Cargar asignaciones para obtener los IDs de hormigas
-                            self._exec(cursor, """
-                                SELECT hormiga_id FROM dbo.asignaciones_hormiga_tarea 
-                                WHERE tarea_id = ?
-                            """, (tarea.id,))
-                            asignaciones = cursor.fetchall()
-                            for asign in asignaciones:
-                                hormiga_id = asign[0]
-                                # Crear hormiga genérica (sin necesidad de que esté en tabla hormigas)
-                                from ..models.hormiga import Hormiga
-                                from ..models.estado_hormiga import EstadoHormiga
-                                hormiga = Hormiga(
-                                    id=str(hormiga_id),
-                                    estado=EstadoHormiga.DISPONIBLE,
-                                    capacidad_carga=5
-                                )
-                                tarea.agregar_hormiga(hormiga)
-                except Exception as e:
-                    print(f"[DEBUG] Error cargando hormigas_asignadas: {e}")
-                
-                # Obtener lote_id de la tarea
-                try:
-                    self._exec(cursor, """
-                        SELECT TOP 1 lote_id FROM dbo.lotes_hormigas WHERE tarea_id = ?
-                    """, (tarea.id,))
-                    lote_row = cursor.fetchone()
-                    
-                    if lote_row:
-                        lote_id = lote_row[0]
-                        tarea.hormigas_lote_id = lote_id
-                        # Si aún no hay hormigas cargadas, intentar cargarlas desde el lote
-                        if len(tarea.hormigas_asignadas) == 0:
-                            # Obtener hormigas desde el lote (si existen en tabla hormigas)
-                            self._exec(cursor, """
-                                SELECT h.* FROM dbo.hormigas h
-                                JOIN dbo.asignaciones_hormiga_tarea aht ON h.id = aht.hormiga_id
-                                WHERE aht.lote_id = ?
-                            """, (lote_id,))
-                    else:
-                        # Fallback: obtener hormigas directamente por tarea_id
-                        self._exec(cursor, """
-                            SELECT h.* FROM dbo.hormigas h
-                            JOIN dbo.asignaciones_hormiga_tarea aht ON h.id = aht.hormiga_id
-                            WHERE aht.tarea_id = ? AND (aht.lote_id IS NULL OR aht.lote_id = '')
-                        """, (tarea.id,))
-                    
-                    hrows = self._fetchall_dicts(cursor)
-                    for hrow in hrows:
-                        tarea.agregar_hormiga(Hormiga(
-                            id=str(hrow.get('id', '')),
-                            capacidad_carga=int(hrow.get('capacidad_carga', 5)),
-                            estado=EstadoHormiga(hrow.get('estado', 'disponible')),
-                            tiempo_vida=int(hrow.get('tiempo_vida', 3600)),
-                            subsistema_origen=hrow.get('subsistema_origen')
-                        ))
-                except Exception as hormigas_error:
-                    # Si no hay tabla de hormigas o asignaciones, continuar sin hormigas
-                    print(f"Advertencia: No se pudieron cargar hormigas para tarea {tarea.id}: {hormigas_error}")
-                
-                tareas.append(tarea)
+            tareas = self._hidratar_tareas(cursor, rows)
             
             print(f"[DEBUG] Total de tareas procesadas: {len(tareas)}")
             if len(tareas) > 0:
@@ -1236,6 +2082,289 @@ class SqlServerDatabaseManager:
             traceback.print_exc()
             return []
 
+    def obtener_tareas_por_estado(
+        self,
+        estado: Union[str, EstadoTarea, Iterable[Union[str, EstadoTarea]]]
+    ) -> List[TareaRecoleccion]:
+        """Obtiene las tareas en uno o varios estados (SQL Server)."""
+        return self.obtener_tareas(estado=estado)
+
+    def obtener_ids_tareas_existentes(self, tarea_ids: List[str]) -> set:
+        """Indica cuáles de los IDs ya tienen una tarea guardada (SQL Server)."""
+        try:
+            cursor = self.connection.cursor()
+            ids = list(dict.fromkeys(tarea_ids))
+            existentes = set()
+            for inicio in range(0, len(ids), MAX_IDS_EN_CONSULTA):
+                condicion, params = _condicion_in("id", ids[inicio:inicio + MAX_IDS_EN_CONSULTA])
+                self._exec(cursor, f"SELECT id FROM dbo.Tareas WHERE {condicion}", tuple(params))
+                existentes.update(str(row[0]) for row in cursor.fetchall())
+            return existentes
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error comprobando tareas existentes (SQL Server): {e}")
+            raise
+
+    def obtener_tarea_por_id(self, tarea_id: str, ignorar_mayusculas: bool = False) -> Optional[TareaRecoleccion]:
+        """
+        Obtiene una tarea por su ID con una búsqueda por clave primaria (SQL Server).
+        
+        Args:
+            tarea_id: ID de la tarea
+            ignorar_mayusculas: Si True y no hay coincidencia exacta, busca
+                sin distinguir mayúsculas
+            
+        Returns:
+            Tarea encontrada o None
+        """
+        try:
+            cursor = self.connection.cursor()
+            tarea_id = str(tarea_id).strip()
+            self._exec(cursor, self._select_tareas_sql() + " WHERE t.id = ?", (tarea_id,))
+            rows = self._fetchall_dicts(cursor)
+            if not rows and ignorar_mayusculas:
+                self._exec(
+                    cursor,
+                    self._select_tareas_sql() + " WHERE LOWER(LTRIM(RTRIM(CAST(t.id AS NVARCHAR(100))))) = LOWER(?)",
+                    (tarea_id,)
+                )
+                rows = self._fetchall_dicts(cursor)[:1]
+            tareas = self._hidratar_tareas(cursor, rows)
+            return tareas[0] if tareas else None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[ERROR] Error obteniendo tarea por id (SQL Server): {e}")
+            return None
+
+    def _cargar_relaciones_tareas(self, cursor, tarea_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Carga en bloque las relaciones de las tareas (SQL Server).
+        
+        Cada consulta es independiente: si una tabla no existe o falla, su
+        mapa queda vacío y las tareas se hidratan sin esa información.
+        
+        Args:
+            cursor: Cursor abierto sobre la conexión
+            tarea_ids: Si se indica, solo se cargan las relaciones de esas tareas
+        
+        Returns:
+            Diccionario con los mapas `hormigas_asignadas`, `asignaciones`,
+            `lote_por_tarea`, `hormigas_por_lote` y `hormigas_sin_lote`
+        """
+        relaciones: Dict[str, Dict[str, Any]] = {
+            "hormigas_asignadas": {},
+            "asignaciones": {},
+            "lote_por_tarea": {},
+            "hormigas_por_lote": {},
+            "hormigas_sin_lote": {},
+        }
+        
+        def filtro(columna: str) -> Tuple[str, tuple]:
+            if tarea_ids is None:
+                return "", ()
+            condicion, params = _condicion_in(columna, tarea_ids)
+            return f" WHERE {condicion}", tuple(params)
+        
+        try:
+            where, params = filtro("id")
+            self._exec(cursor, "SELECT id, hormigas_asignadas FROM dbo.Tareas" + where, params)
+            for tarea_id, cantidad in cursor.fetchall():
+                if cantidad is not None:
+                    relaciones["hormigas_asignadas"][str(tarea_id).strip()] = int(cantidad)
+        except Exception as e:
+            print(f"[DEBUG] Error cargando hormigas_asignadas: {e}")
+        
+        try:
+            where, params = filtro("tarea_id")
+            self._exec(cursor, "SELECT tarea_id, hormiga_id FROM dbo.asignaciones_hormiga_tarea" + where, params)
+            for tarea_id, hormiga_id in cursor.fetchall():
+                relaciones["asignaciones"].setdefault(str(tarea_id).strip(), []).append(hormiga_id)
+        except Exception as e:
+            print(f"[DEBUG] Error cargando asignaciones: {e}")
+        
+        try:
+            where, params = filtro("tarea_id")
+            self._exec(cursor, "SELECT tarea_id, lote_id FROM dbo.lotes_hormigas" + where, params)
+            for tarea_id, lote_id in cursor.fetchall():
+                relaciones["lote_por_tarea"].setdefault(str(tarea_id).strip(), lote_id)
+            
+            where, params = "", ()
+            if tarea_ids is not None:
+                condicion_tareas, params_tareas = _condicion_in("aht.tarea_id", tarea_ids)
+                condicion_lotes, params_lotes = _condicion_in(
+                    "aht.lote_id", list(dict.fromkeys(relaciones["lote_por_tarea"].values()))
+                )
+                where = f" WHERE {condicion_tareas} OR {condicion_lotes}"
+                params = tuple(params_tareas + params_lotes)
+            self._exec(cursor, """
+                SELECT aht.tarea_id AS asignacion_tarea_id, aht.lote_id AS asignacion_lote_id, h.*
+                FROM dbo.hormigas h
+                JOIN dbo.asignaciones_hormiga_tarea aht ON h.id = aht.hormiga_id
+            """ + where, params)
+            for hrow in self._fetchall_dicts(cursor):
+                lote_id = hrow.get('asignacion_lote_id')
+                if lote_id:
+                    relaciones["hormigas_por_lote"].setdefault(lote_id, []).append(hrow)
+                else:
+                    tarea_id = str(hrow.get('asignacion_tarea_id', '')).strip()
+                    relaciones["hormigas_sin_lote"].setdefault(tarea_id, []).append(hrow)
+        except Exception as hormigas_error:
+            # Si no hay tabla de hormigas o lotes, continuar sin hormigas
+            print(f"Advertencia: No se pudieron cargar lotes/hormigas de tareas: {hormigas_error}")
+        
+        return relaciones
+
+    def _hidratar_tareas(self, cursor, rows: List[Dict[str, Any]]) -> List[TareaRecoleccion]:
+        """
+        Construye las tareas a partir de filas Tareas⋈Alimentos (SQL Server).
+        
+        Args:
+            cursor: Cursor abierto sobre la conexión
+            rows: Filas de la consulta Tareas⋈Alimentos
+            
+        Returns:
+            Lista de tareas hidratadas
+        """
+        if not rows:
+            return []
+        
+        # Con pocas tareas se filtran las relaciones por ID
+        tarea_ids = [str(row.get('tarea_id', row.get('id', ''))).strip() for row in rows]
+        relaciones = self._cargar_relaciones_tareas(
+            cursor, tarea_ids if len(tarea_ids) <= MAX_IDS_EN_CONSULTA else None
+        )
+        
+        tareas: List[TareaRecoleccion] = []
+        for row in rows:
+            # Debug: mostrar primera fila para diagnóstico
+            if len(tareas) == 0:
+                print(f"[DEBUG] Primera fila de tarea: {row}")
+            
+            # Obtener alimento_id - puede ser INT o NVARCHAR
+            alimento_id_raw = row.get('alimento_id')
+            alimento_id_str = str(alimento_id_raw) if alimento_id_raw is not None else None
+            
+            # Mapear columnas según esquema - si no hay alimento en el JOIN, usar valores por defecto
+            if self.schema_type == "nuevo":
+                cantidad_hormigas = row.get('cantidad_hormigas_necesarias', 0)
+                puntos = row.get('puntos_stock', 0)
+                tiempo = row.get('tiempo_recoleccion', 0)
+            else:
+                cantidad_hormigas = row.get('cantidad_hormigas_necesarias', row.get('hormigas_requeridas', 0))
+                puntos = row.get('puntos_stock', row.get('cantidad_unitaria', 0))
+                tiempo = row.get('tiempo_recoleccion', row.get('duracion_recoleccion', 0))
+            
+            # Si no hay alimento en el JOIN (LEFT JOIN), crear uno con valores por defecto
+            nombre_alimento = row.get('nombre')
+            if not nombre_alimento:
+                # No hay alimento asociado, crear uno genérico
+                alimento = Alimento(
+                    id=alimento_id_str or "UNKNOWN",
+                    nombre="Alimento no encontrado",
+                    cantidad_hormigas_necesarias=0,
+                    puntos_stock=0,
+                    tiempo_recoleccion=0,
+                    disponible=False
+                )
+            else:
+                alimento = Alimento(
+                    id=alimento_id_str or "UNKNOWN",
+                    nombre=nombre_alimento,
+                    cantidad_hormigas_necesarias=int(cantidad_hormigas) if cantidad_hormigas else 0,
+                    puntos_stock=int(puntos) if puntos else 0,
+                    tiempo_recoleccion=int(tiempo) if tiempo else 0,
+                    disponible=bool(row.get('disponible', False))
+                )
+            
+            # Manejar fechas de forma segura - usar nombres de columnas correctos de SQL Server
+            fecha_inicio = None
+            fecha_fin = None
+            try:
+                # La columna en SQL Server se llama 'inicio', no 'fecha_inicio'
+                if row.get('inicio'):
+                    inicio_val = row['inicio']
+                    # Si es un objeto datetime de pyodbc, usarlo directamente
+                    if isinstance(inicio_val, datetime):
+                        fecha_inicio = inicio_val
+                    else:
+                        # Si es string, parsear
+                        fecha_inicio_str = str(inicio_val)
+                        if 'T' in fecha_inicio_str or '-' in fecha_inicio_str:
+                            fecha_inicio = datetime.fromisoformat(fecha_inicio_str.replace('Z', '+00:00'))
+            except Exception as e:
+                print(f"[DEBUG] Error parseando fecha_inicio: {e}, valor: {row.get('inicio')}")
+                pass
+            try:
+                # La columna en SQL Server se llama 'fin', no 'fecha_fin'
+                if row.get('fin'):
+                    fin_val = row['fin']
+                    # Si es un objeto datetime de pyodbc, usarlo directamente
+                    if isinstance(fin_val, datetime):
+                        fecha_fin = fin_val
+                    else:
+                        # Si es string, parsear
+                        fecha_fin_str = str(fin_val)
+                        if 'T' in fecha_fin_str or '-' in fecha_fin_str:
+                            fecha_fin = datetime.fromisoformat(fecha_fin_str.replace('Z', '+00:00'))
+            except Exception as e:
+                print(f"[DEBUG] Error parseando fecha_fin: {e}, valor: {row.get('fin')}")
+                pass
+            
+            # Obtener ID de tarea - usar 'tarea_id' del alias o 'id' como fallback
+            tarea_id = str(row.get('tarea_id', row.get('id', ''))).strip()
+            if not tarea_id:
+                print(f"Advertencia: Tarea sin ID válido. Row: {row}")
+                continue
+            
+            # La columna en SQL Server se llama 'cantidad_recolectada', no 'alimento_recolectado'
+            cantidad_recolectada = int(row.get('cantidad_recolectada', 0))
+            
+            tarea = TareaRecoleccion(
+                id=tarea_id,
+                alimento=alimento,
+                estado=EstadoTarea(row.get('estado', 'pendiente')),
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                alimento_recolectado=cantidad_recolectada
+            )
+            
+            # Hormigas genéricas a partir de la columna hormigas_asignadas
+            cantidad_hormigas_bd = relaciones["hormigas_asignadas"].get(tarea.id, 0)
+            if cantidad_hormigas_bd > 0:
+                for hormiga_id in relaciones["asignaciones"].get(tarea.id, []):
+                    # Crear hormiga genérica (sin necesidad de que esté en tabla hormigas)
+                    tarea.agregar_hormiga(Hormiga(
+                        id=str(hormiga_id),
+                        estado=EstadoHormiga.DISPONIBLE,
+                        capacidad_carga=5
+                    ))
+            
+            # Lote de la tarea y, si aún no hay hormigas, las hormigas del lote
+            lote_id = relaciones["lote_por_tarea"].get(tarea.id)
+            if lote_id:
+                tarea.hormigas_lote_id = lote_id
+                hrows = relaciones["hormigas_por_lote"].get(lote_id, []) if len(tarea.hormigas_asignadas) == 0 else []
+            else:
+                # Fallback: hormigas asignadas directamente a la tarea (sin lote)
+                ids_cargados = {h.id for h in tarea.hormigas_asignadas}
+                hrows = [
+                    hrow for hrow in relaciones["hormigas_sin_lote"].get(tarea.id, [])
+                    if str(hrow.get('id', '')) not in ids_cargados
+                ]
+            
+            for hrow in hrows:
+                tarea.agregar_hormiga(Hormiga(
+                    id=str(hrow.get('id', '')),
+                    capacidad_carga=int(hrow.get('capacidad_carga', 5)),
+                    estado=EstadoHormiga(hrow.get('estado', 'disponible')),
+                    tiempo_vida=int(hrow.get('tiempo_vida', 3600)),
+                    subsistema_origen=hrow.get('subsistema_origen')
+                ))
+            
+            tareas.append(tarea)
+        
+        return tareas
+
     def guardar_evento(self, tipo_evento: str, descripcion: str, datos_adicionales: Dict[str, Any] = None):
         try:
             cursor = self.connection.cursor()
@@ -1247,9 +2376,40 @@ class SqlServerDatabaseManager:
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando evento (SQL Server): {e}")
             return False
 
+    def guardar_eventos(self, eventos: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> bool:
+        """Guarda varios eventos en una sola transacción (SQL Server)."""
+        if not eventos:
+            return True
+        conexion = self.connection
+        # Dentro de una unidad de trabajo el lote se confirma con ella
+        en_transaccion = self._en_transaccion()
+        try:
+            if not en_transaccion:
+                # La conexión trabaja en autocommit; se desactiva para agrupar el lote
+                conexion.autocommit = False
+            cursor = conexion.cursor()
+            cursor.executemany("""
+                INSERT INTO dbo.Eventos (tipo_evento, descripcion, datos_adicionales)
+                VALUES (?, ?, ?)
+            """, [
+                (tipo, descripcion, json.dumps(datos) if datos else None)
+                for tipo, descripcion, datos in eventos
+            ])
+            self._confirmar()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self._revertir()
+            print(f"Error guardando lote de eventos (SQL Server): {e}")
+            return False
+        finally:
+            if not en_transaccion:
+                conexion.autocommit = True
+
     def obtener_eventos(self, limite: int = 100) -> List[Dict[str, Any]]:
         try:
             cursor = self.connection.cursor()
@@ -1273,21 +2433,23 @@ class SqlServerDatabaseManager:
             return []
 
     def cerrar(self):
-        if self.connection:
-            self.connection.close()
+        with self._conexiones_lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conexion in conexiones:
+            conexion.close()
+        self._local = threading.local()
+        if conexiones:
             print("Conexión a SQL Server cerrada")
 
     # Helpers unificados
     def actualizar_estado_tarea(self, tarea_id: str, nuevo_estado: str) -> bool:
         try:
-            cursor = self.connection.cursor()
-            self._exec(
-                cursor,
+            cursor = self._exec_preparada(
                 "UPDATE dbo.Tareas SET estado = ? WHERE id = ?",
                 (nuevo_estado, tarea_id),
             )
             # Hacer commit explícito para asegurar que se persista
-            cursor.commit()
+            self._confirmar()
             rows_updated = cursor.rowcount > 0
             if rows_updated:
                 print(f"Estado de tarea {tarea_id} actualizado a '{nuevo_estado}' en BD")
@@ -1296,6 +2458,7 @@ class SqlServerDatabaseManager:
             return rows_updated
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error actualizando estado de tarea (SQL Server): {e}")
             import traceback
             traceback.print_exc()
@@ -1347,6 +2510,7 @@ class SqlServerDatabaseManager:
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando mensaje (SQL Server): {e}")
             return False
 
@@ -1401,6 +2565,7 @@ class SqlServerDatabaseManager:
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error creando lote de hormigas (SQL Server): {e}")
             return False
     
@@ -1429,6 +2594,7 @@ class SqlServerDatabaseManager:
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error aceptando lote (SQL Server): {e}")
             return False
     
@@ -1444,6 +2610,7 @@ class SqlServerDatabaseManager:
             return cursor.rowcount > 0
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error marcando lote en uso (SQL Server): {e}")
             return False
     
@@ -1484,25 +2651,25 @@ class SqlServerDatabaseManager:
                 return False
             
             tarea_id = row[0]
+            # Una hormiga repetida en la lista se guarda una sola vez
+            unicas = list({hormiga.id: hormiga for hormiga in hormigas}.values())
             
-            for hormiga in hormigas:
-                self._exec(cursor, """
-                    IF NOT EXISTS (SELECT 1 FROM dbo.hormigas WHERE id = ?)
-                    INSERT INTO dbo.hormigas (id, capacidad_carga, estado, tiempo_vida, subsistema_origen)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (hormiga.id, hormiga.id, hormiga.capacidad_carga, 
-                      hormiga.estado.value if hasattr(hormiga.estado, 'value') else str(hormiga.estado),
-                      hormiga.tiempo_vida, hormiga.subsistema_origen))
-                
-                self._exec(cursor, """
-                    IF NOT EXISTS (SELECT 1 FROM dbo.asignaciones_hormiga_tarea WHERE tarea_id = ? AND hormiga_id = ?)
-                    INSERT INTO dbo.asignaciones_hormiga_tarea (tarea_id, hormiga_id, lote_id)
-                    VALUES (?, ?, ?)
-                """, (tarea_id, hormiga.id, tarea_id, hormiga.id, lote_id))
+            self._executemany(cursor, """
+                INSERT INTO dbo.hormigas (id, capacidad_carga, estado, tiempo_vida, subsistema_origen)
+                SELECT ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM dbo.hormigas WHERE id = ?)
+            """, [_fila_hormiga(hormiga) + (hormiga.id,) for hormiga in unicas])
+            
+            self._executemany(cursor, """
+                INSERT INTO dbo.asignaciones_hormiga_tarea (tarea_id, hormiga_id, lote_id)
+                SELECT ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM dbo.asignaciones_hormiga_tarea WHERE tarea_id = ? AND hormiga_id = ?)
+            """, [(tarea_id, hormiga.id, lote_id, tarea_id, hormiga.id) for hormiga in unicas])
             
             return True
         except Exception as e:
             self.last_error = str(e)
+            self._revertir()
             print(f"Error guardando hormigas en lote (SQL Server): {e}")
             return False
     
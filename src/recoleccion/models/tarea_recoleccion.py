@@ -4,7 +4,7 @@ Modelo que representa una tarea de recolección específica.
 
 from datetime import datetime
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from .alimento import Alimento
 from .hormiga import Hormiga
@@ -41,6 +41,30 @@ class TareaRecoleccion:
         if self.alimento_recolectado < 0:
             raise ValueError("El alimento recolectado no puede ser negativo")
     
+    def __setattr__(self, nombre: str, valor: Any) -> None:
+        """Asigna el atributo y avisa a los observadores si cambió el estado."""
+        anterior = self.__dict__.get(nombre)
+        object.__setattr__(self, nombre, valor)
+        if nombre == "estado" and anterior is not valor:
+            for observador in list(self.__dict__.get("_observadores_estado", ())):
+                observador(self)
+    
+    def observar_estado(self, observador: Callable[["TareaRecoleccion"], None]) -> None:
+        """
+        Registra una función a la que se llama con la tarea cada vez que cambia su estado.
+        
+        Los observadores no son campos del modelo: no se comparan ni se serializan.
+        """
+        observadores = self.__dict__.setdefault("_observadores_estado", [])
+        if observador not in observadores:
+            observadores.append(observador)
+    
+    def dejar_de_observar_estado(self, observador: Callable[["TareaRecoleccion"], None]) -> None:
+        """Quita un observador registrado con `observar_estado`."""
+        observadores = self.__dict__.get("_observadores_estado", [])
+        if observador in observadores:
+            observadores.remove(observador)
+    
     def agregar_hormiga(self, hormiga: Hormiga) -> None:
         """
         Agrega una hormiga a la tarea.
@@ -110,6 +134,50 @@ class TareaRecoleccion:
         self.estado = EstadoTarea.COMPLETADA
         self.fecha_fin = datetime.now()
     
+    def instantanea(self) -> Dict[str, Any]:
+        """
+        Estado persistible de la tarea, para comparar con `cambios_desde`.
+        
+        Returns:
+            Campos guardados en BD y los IDs de las hormigas asignadas
+        """
+        return {
+            "alimento_id": self.alimento.id,
+            "hormigas_lote_id": self.hormigas_lote_id,
+            "estado": self.estado,
+            "fecha_inicio": self.fecha_inicio,
+            "fecha_fin": self.fecha_fin,
+            "alimento_recolectado": self.alimento_recolectado,
+            "hormigas": tuple(hormiga.id for hormiga in self.hormigas_asignadas),
+        }
+    
+    def cambios_desde(self, instantanea: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compara la tarea con una instantánea anterior.
+        
+        Args:
+            instantanea: Resultado de `instantanea()` en el último guardado
+            
+        Returns:
+            Diccionario con "campos" (campo -> valor actual de los que
+            cambiaron), "hormigas_agregadas" y "hormigas_quitadas" (IDs) y
+            "estado_anterior" (el de la instantánea, para detectar si otro
+            proceso cambió la fila entretanto)
+        """
+        actual = self.instantanea()
+        campos = {
+            campo: valor for campo, valor in actual.items()
+            if campo != "hormigas" and instantanea.get(campo) != valor
+        }
+        antes = set(instantanea.get("hormigas", ()))
+        ahora = set(actual["hormigas"])
+        return {
+            "campos": campos,
+            "hormigas_agregadas": [h for h in dict.fromkeys(actual["hormigas"]) if h not in antes],
+            "hormigas_quitadas": [h for h in dict.fromkeys(instantanea.get("hormigas", ())) if h not in ahora],
+            "estado_anterior": instantanea.get("estado"),
+        }
+    
     def pausar_tarea(self) -> None:
         """Pausa la tarea por falta de hormigas vivas."""
         if self.estado != EstadoTarea.EN_PROCESO:
@@ -0,0 +1,131 @@
+"""
+Agrupación de solicitudes de hormigas concurrentes en un solo mensaje a la reina.
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from ..models.hormiga import Hormiga
+
+
+SolicitudLote = Callable[[int], Awaitable[List[Hormiga]]]
+DevolucionSobrantes = Callable[[List[Hormiga]], Awaitable[object]]
+
+
+class AgrupadorSolicitudesHormigas:
+    """
+    Junta las solicitudes de hormigas que llegan dentro de una ventana corta.
+
+    La primera solicitud abre una ventana de `ventana` segundos; al cerrarse
+    (o al acumular `max_por_lote` solicitudes) se pide a la reina la suma de
+    todas en un único mensaje y las hormigas recibidas se reparten en orden
+    de llegada, saltando las solicitudes que ya no caben. Una solicitud que
+    no puede cubrirse completa recibe una lista vacía, igual que si la reina
+    no hubiera enviado hormigas; las hormigas que sobran se devuelven con
+    `devolver_sobrantes`. Un lote de una sola solicitud recibe la respuesta
+    de la reina sin modificar.
+    """
+
+    def __init__(
+        self,
+        solicitar_lote: SolicitudLote,
+        devolver_sobrantes: Optional[DevolucionSobrantes] = None,
+        ventana: Optional[float] = None,
+        max_por_lote: Optional[int] = None
+    ):
+        """
+        Inicializa el agrupador.
+
+        Args:
+            solicitar_lote: Corrutina que pide N hormigas en un solo mensaje
+            devolver_sobrantes: Corrutina que devuelve hormigas no repartidas
+            ventana: Segundos de espera para agrupar (por defecto
+                `HORMIGAS_VENTANA_AGRUPACION` o 0.005; 0 = sin agrupar)
+            max_por_lote: Solicitudes que fuerzan el envío inmediato (por
+                defecto `HORMIGAS_MAX_POR_LOTE` o 100)
+        """
+        self.solicitar_lote = solicitar_lote
+        self.devolver_sobrantes = devolver_sobrantes
+        self.ventana = ventana if ventana is not None else float(os.getenv("HORMIGAS_VENTANA_AGRUPACION", "0.005"))
+        self.max_por_lote = max_por_lote or int(os.getenv("HORMIGAS_MAX_POR_LOTE", "100"))
+        self._pendientes: List[Tuple[int, asyncio.Future]] = []
+        self._temporizador: Optional[asyncio.Task] = None
+        self.lotes_enviados = 0
+
+    async def solicitar(self, cantidad: int) -> List[Hormiga]:
+        """
+        Solicita hormigas, agrupando con otras solicitudes cercanas en el tiempo.
+
+        Args:
+            cantidad: Hormigas necesarias
+
+        Returns:
+            Las hormigas asignadas (en un lote agrupado, exactamente
+            `cantidad` o lista vacía si no alcanzaron)
+
+        Raises:
+            Exception: La que lance `solicitar_lote` para el lote completo
+        """
+        if self.ventana <= 0:
+            self.lotes_enviados += 1
+            return await self.solicitar_lote(cantidad)
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendientes.append((cantidad, futuro))
+        if len(self._pendientes) >= self.max_por_lote:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.create_task(self._cerrar_ventana())
+        return await futuro
+
+    async def _cerrar_ventana(self):
+        """Despacha las solicitudes acumuladas al terminar la ventana."""
+        await asyncio.sleep(self.ventana)
+        self._temporizador = None
+        self._despachar()
+
+    def _despachar(self) -> None:
+        """Envía las solicitudes pendientes como un lote."""
+        lote, self._pendientes = self._pendientes, []
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if lote:
+            asyncio.get_running_loop().create_task(self._resolver_lote(lote))
+
+    async def _resolver_lote(self, lote: List[Tuple[int, asyncio.Future]]):
+        """Pide las hormigas de un lote y las reparte entre sus solicitudes."""
+        self.lotes_enviados += 1
+        try:
+            hormigas = await self.solicitar_lote(sum(cantidad for cantidad, _ in lote))
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        if len(lote) == 1:
+            # Sin agrupación real la respuesta se entrega tal cual
+            _, futuro = lote[0]
+            if not futuro.done():
+                futuro.set_result(hormigas)
+            return
+
+        restantes = list(hormigas or [])
+        for cantidad, futuro in lote:
+            asignadas: List[Hormiga] = []
+            if len(restantes) >= cantidad:
+                asignadas, restantes = restantes[:cantidad], restantes[cantidad:]
+            if futuro.done():
+                # La solicitud se canceló mientras tanto: sus hormigas sobran
+                restantes.extend(asignadas)
+            else:
+                futuro.set_result(asignadas)
+
+        if restantes and self.devolver_sobrantes is not None:
+            try:
+                await self.devolver_sobrantes(restantes)
+            except Exception as e:
+                print(f"Error devolviendo {len(restantes)} hormigas sobrantes: {e}")
@@ -0,0 +1,178 @@
+"""
+Caché de lectura de alimentos con TTL y desalojo LRU.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..models.alimento import Alimento
+
+
+class CacheAlimentos:
+    """
+    Guarda los alimentos leídos de la BD para servir lecturas repetidas.
+
+    Cada alimento se guarda con un TTL en un `OrderedDict` de tamaño máximo
+    `capacidad`; al superarlo se desaloja el usado hace más tiempo. El listado
+    completo se guarda aparte con el mismo TTL. Las escrituras deben llamar a
+    `invalidar`. Se devuelven copias para que modificar un alimento en memoria
+    (p. ej. `marcar_como_recolectado`) no altere la caché.
+
+    Cada invalidación sube una generación. Una lectura de la BD toma la
+    generación antes de leer y la pasa a `guardar`: si el alimento se
+    invalidó mientras tanto, la fila leída puede ser anterior a la escritura
+    y no se guarda.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, capacidad: Optional[int] = None):
+        """
+        Inicializa la caché.
+
+        Args:
+            ttl: Segundos de validez de una entrada (por defecto
+                `ALIMENTOS_CACHE_TTL` o 30; 0 desactiva la caché)
+            capacidad: Máximo de alimentos guardados (por defecto
+                `ALIMENTOS_CACHE_CAPACIDAD` o 1000)
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("ALIMENTOS_CACHE_TTL", "30"))
+        self.capacidad = max(1, capacidad or int(os.getenv("ALIMENTOS_CACHE_CAPACIDAD", "1000")))
+        self._alimentos: "OrderedDict[str, Tuple[Alimento, float]]" = OrderedDict()
+        self._todos: Optional[Tuple[List[Alimento], float]] = None
+        self._generacion = 0
+        # alimento_id -> generación de su última invalidación
+        self._invalidados: Dict[str, int] = {}
+        # Generación del último vaciado completo (cuenta para todos los IDs)
+        self._vaciada_en = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    @property
+    def activa(self) -> bool:
+        """False si el TTL es 0 (caché desactivada)."""
+        return self.ttl > 0
+
+    def obtener(self, alimento_id: str) -> Optional[Alimento]:
+        """Devuelve una copia del alimento si está vigente, o None (y cuenta un fallo)."""
+        entrada = self._alimentos.get(alimento_id)
+        if entrada is not None and time.monotonic() < entrada[1]:
+            self._alimentos.move_to_end(alimento_id)
+            self.aciertos += 1
+            return replace(entrada[0])
+        if entrada is not None:
+            del self._alimentos[alimento_id]
+        self.fallos += 1
+        return None
+
+    def obtener_varios(self, alimento_ids: Iterable[str]) -> Tuple[Dict[str, Alimento], List[str]]:
+        """
+        Resuelve varios IDs desde la caché.
+
+        Returns:
+            Tupla (alimentos encontrados por ID, IDs que hay que leer de la BD)
+        """
+        encontrados: Dict[str, Alimento] = {}
+        faltantes: List[str] = []
+        for alimento_id in dict.fromkeys(alimento_ids):
+            alimento = self.obtener(alimento_id)
+            if alimento is None:
+                faltantes.append(alimento_id)
+            else:
+                encontrados[alimento_id] = alimento
+        return encontrados, faltantes
+
+    def generacion(self) -> int:
+        """Generación actual; tomarla antes de leer de la BD y pasarla a `guardar`."""
+        return self._generacion
+
+    def _invalidado_desde(self, alimento_id: str, generacion: int) -> bool:
+        """True si el alimento se invalidó después de la generación dada."""
+        return max(self._vaciada_en, self._invalidados.get(alimento_id, 0)) > generacion
+
+    def guardar(self, alimento: Alimento, generacion: Optional[int] = None) -> None:
+        """
+        Guarda (una copia de) un alimento leído de la BD.
+
+        Args:
+            alimento: Alimento leído
+            generacion: Generación tomada antes de la lectura; si el alimento
+                se invalidó después, no se guarda
+        """
+        if not self.activa:
+            return
+        if generacion is not None and self._invalidado_desde(alimento.id, generacion):
+            return
+        self._alimentos[alimento.id] = (replace(alimento), time.monotonic() + self.ttl)
+        self._alimentos.move_to_end(alimento.id)
+        while len(self._alimentos) > self.capacidad:
+            self._alimentos.popitem(last=False)
+            self.desalojos += 1
+
+    def obtener_todos(self) -> Optional[List[Alimento]]:
+        """Devuelve copias del listado completo si está vigente, o None."""
+        if self._todos is not None and time.monotonic() < self._todos[1]:
+            self.aciertos += 1
+            return [replace(alimento) for alimento in self._todos[0]]
+        self._todos = None
+        self.fallos += 1
+        return None
+
+    def guardar_todos(self, alimentos: List[Alimento], generacion: Optional[int] = None) -> None:
+        """
+        Guarda el listado completo y, de paso, cada alimento por separado.
+
+        Args:
+            alimentos: Listado leído
+            generacion: Generación tomada antes de la lectura; si hubo alguna
+                invalidación después, el listado no se guarda (y cada alimento
+                solo si no fue el invalidado)
+        """
+        if not self.activa:
+            return
+        if generacion is None or generacion == self._generacion:
+            self._todos = ([replace(alimento) for alimento in alimentos], time.monotonic() + self.ttl)
+        for alimento in alimentos[-self.capacidad:]:
+            self.guardar(alimento, generacion)
+
+    def invalidar(self, alimento_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Olvida alimentos modificados y el listado completo.
+
+        Args:
+            alimento_ids: IDs a olvidar (None = vaciar la caché)
+        """
+        self.invalidaciones += 1
+        self._generacion += 1
+        self._todos = None
+        if alimento_ids is None:
+            self._alimentos.clear()
+            self._vaciada_en = self._generacion
+            self._invalidados.clear()
+            return
+        for alimento_id in alimento_ids:
+            self._alimentos.pop(alimento_id, None)
+            self._invalidados[alimento_id] = self._generacion
+        if len(self._invalidados) > self.capacidad:
+            # Acotado: se olvidan las marcas por ID y cuentan como un vaciado
+            self._vaciada_en = self._generacion
+            self._invalidados.clear()
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Aciertos, fallos y ocupación de la caché para `/health`."""
+        consultas = self.aciertos + self.fallos
+        return {
+            "activa": self.activa,
+            "ttl_segundos": self.ttl,
+            "capacidad": self.capacidad,
+            "alimentos": len(self._alimentos),
+            "listado_completo": self._todos is not None,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else None,
+            "desalojos": self.desalojos,
+            "invalidaciones": self.invalidaciones
+        }
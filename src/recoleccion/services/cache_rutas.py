@@ -0,0 +1,45 @@
+"""
+Caché de rutas descubiertas en las APIs de otros subsistemas.
+"""
+
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+
+class CacheRutas:
+    """
+    Recuerda qué ruta (o alternativa) funciona para cada operación.
+
+    Las rutas se guardan con un TTL; pasado ese tiempo se vuelven a probar.
+    Quien usa la caché decide cuándo invalidar (típicamente ante un 404).
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        """
+        Inicializa la caché.
+
+        Args:
+            ttl: Segundos de validez de una ruta (por defecto `API_TTL_RUTAS` o 300)
+        """
+        self.ttl = ttl or float(os.getenv("API_TTL_RUTAS", "300"))
+        self._rutas: Dict[str, Tuple[str, float]] = {}
+
+    def obtener(self, operacion: str) -> Optional[str]:
+        """Devuelve la ruta vigente de una operación, o None si no hay o caducó."""
+        entrada = self._rutas.get(operacion)
+        if entrada is None:
+            return None
+        ruta, vence = entrada
+        if time.monotonic() >= vence:
+            del self._rutas[operacion]
+            return None
+        return ruta
+
+    def guardar(self, operacion: str, ruta: str) -> None:
+        """Guarda la ruta que funcionó para una operación."""
+        self._rutas[operacion] = (ruta, time.monotonic() + self.ttl)
+
+    def invalidar(self, operacion: str) -> None:
+        """Olvida la ruta de una operación para volver a descubrirla."""
+        self._rutas.pop(operacion, None)
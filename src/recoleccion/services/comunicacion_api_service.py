@@ -3,6 +3,8 @@ Implementación del servicio de comunicación que se conecta a la API REST
 del Subsistema de Comunicación y Hormiga Reina.
 """
 
+import asyncio
+import time
 import httpx
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -12,6 +14,9 @@ from ..models.mensaje import Mensaje
 from ..models.tipo_mensaje import TipoMensaje
 from ..models.estado_hormiga import EstadoHormiga
 from .comunicacion_service import ComunicacionService
+from .cache_rutas import CacheRutas
+from .interruptor_circuito import InterruptorCircuito
+from .transporte_http import transporte_http
 
 
 class ComunicacionAPIService(ComunicacionService):
@@ -24,21 +29,37 @@ class ComunicacionAPIService(ComunicacionService):
     - POST /ants/request: Solicitar hormigas
     - GET /ants/response/{message_id}: Consultar respuesta de hormigas
     - POST /ants/return: Devolver hormigas
+    
+    Si el despliegue no expone los endpoints de hormigas se recurre a los de
+    mensajes; la alternativa que funciona se recuerda (con TTL) para no
+    repetir la petición fallida en cada solicitud.
     """
     
+    # Marca en la caché de rutas: usar los endpoints de mensajes
+    RUTA_MENSAJES = "mensajes"
+    
     def __init__(self, base_url: str = "http://localhost:8002", timeout: int = 30):
         """
         Inicializa el servicio de API de comunicación.
         
         Args:
             base_url: URL base del subsistema de comunicación/reina (por defecto localhost:8002)
-            timeout: Timeout en segundos para las peticiones HTTP
+            timeout: Timeout de lectura en segundos para las peticiones HTTP
+                (el pool, keep-alive y timeout de conexión son los del
+                transporte compartido)
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        self.client = transporte_http.crear_cliente("comunicacion", timeout)
         self._disponible = True
         self.subsistema_id = "recoleccion"  # ID del subsistema de recolección
+        # Código HTTP de la última petición (None si no hubo respuesta)
+        self._ultimo_status: Optional[int] = None
+        # True si la última petición no llegó al servicio (circuito abierto,
+        # error de transporte o 5xx)
+        self._sin_conexion = False
+        self._rutas = CacheRutas()
+        self.circuito = InterruptorCircuito("comunicacion")
     
     async def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[dict]:
         """
@@ -53,16 +74,33 @@ class ComunicacionAPIService(ComunicacionService):
             Respuesta JSON como diccionario o None si hay error
         """
         url = f"{self.base_url}{endpoint}"
+        self._ultimo_status = None
+        self._sin_conexion = True
+        
+        # Con el circuito abierto se falla de inmediato, sin esperar timeouts
+        if not self.circuito.permite_llamada():
+            self._disponible = False
+            return None
         
+        if getattr(self.client, "is_closed", False) is True:
+            # El transporte cerró los clientes (apagado de la aplicación)
+            self.client = transporte_http.crear_cliente("comunicacion", self.timeout)
+        
+        inicio = time.perf_counter()
         try:
             response = await self.client.request(method, url, **kwargs)
+            self._ultimo_status = response.status_code
+            transporte_http.registrar_latencia("comunicacion", time.perf_counter() - inicio, response.status_code >= 500)
             
             # Verificar disponibilidad del servicio
             if response.status_code >= 500:
                 self._disponible = False
+                self.circuito.registrar_fallo()
                 return None
             
             self._disponible = True
+            self._sin_conexion = False
+            self.circuito.registrar_exito()
             
             if response.status_code == 404:
                 return None
@@ -73,11 +111,18 @@ class ComunicacionAPIService(ComunicacionService):
             # Para otros códigos, retornar None
             return None
             
+        except asyncio.CancelledError:
+            # Sin resultado: si era la llamada de prueba, el circuito admite otra
+            self.circuito.liberar_prueba()
+            raise
         except (httpx.TimeoutException, httpx.ConnectError, httpx.RequestError) as e:
+            transporte_http.registrar_latencia("comunicacion", time.perf_counter() - inicio, error=True)
             self._disponible = False
+            self.circuito.registrar_fallo()
             return None
         except Exception as e:
             self._disponible = False
+            self.circuito.registrar_fallo()
             return None
     
     def _mapear_hormiga_api_a_modelo(self, hormiga_data: dict) -> Hormiga:
@@ -195,17 +240,22 @@ class ComunicacionAPIService(ComunicacionService):
             "subsistema_origen": subsistema_destino
         }
         
-        response = await self._make_request(
-            "POST",
-            "/ants/request",  # O endpoint equivalente
-            json=payload
-        )
-        
-        if response:
-            mensaje_id = response.get("id") or response.get("message_id") or response.get("mensaje_id")
-            if mensaje_id:
-                mensaje.id = mensaje_id
-                return mensaje_id
+        if self._rutas.obtener("solicitar_hormigas") != self.RUTA_MENSAJES:
+            response = await self._make_request(
+                "POST",
+                "/ants/request",  # O endpoint equivalente
+                json=payload
+            )
+            
+            if response:
+                mensaje_id = response.get("id") or response.get("message_id") or response.get("mensaje_id")
+                if mensaje_id:
+                    mensaje.id = mensaje_id
+                    return mensaje_id
+            
+            if self._ultimo_status == 404:
+                # El endpoint no existe en este despliegue: usar mensajes hasta que caduque
+                self._rutas.guardar("solicitar_hormigas", self.RUTA_MENSAJES)
         
         # Si no hay endpoint específico, usar enviar_mensaje
         return await self.enviar_mensaje(mensaje)
@@ -220,18 +270,51 @@ class ComunicacionAPIService(ComunicacionService):
         Returns:
             Lista de hormigas asignadas o lista vacía si no hay respuesta
         """
-        # Intentar consultar endpoint específico
-        response = await self._make_request("GET", f"/ants/response/{mensaje_id}")
+        try:
+            return await self.consultar_respuesta_hormigas_pendiente(mensaje_id) or []
+        except ConnectionError:
+            return []
+    
+    async def consultar_respuesta_hormigas_pendiente(self, mensaje_id: str) -> Optional[List[Hormiga]]:
+        """
+        Consulta la respuesta de una solicitud de hormigas.
+        
+        Args:
+            mensaje_id: ID del mensaje de solicitud
+            
+        Returns:
+            Lista de hormigas asignadas (vacía si la reina respondió sin
+            hormigas), o None si la respuesta aún no llegó
+            
+        Raises:
+            ConnectionError: Si el servicio no respondió (circuito abierto o
+                fallo de transporte); no tiene sentido seguir sondeando
+        """
+        # Un 404 aquí también significa "aún sin respuesta", así que la ruta de
+        # mensajes solo se fija cuando es ella la que trae la respuesta
+        response = None
+        if self._rutas.obtener("respuesta_hormigas") != self.RUTA_MENSAJES:
+            response = await self._make_request("GET", f"/ants/response/{mensaje_id}")
+            if response is None and self._sin_conexion:
+                raise ConnectionError("Servicio de comunicación no disponible")
         
         if response is None:
             # Si no hay respuesta, consultar el mensaje directamente
             mensaje = await self.consultar_mensaje(mensaje_id)
+            if mensaje is None and self._sin_conexion:
+                raise ConnectionError("Servicio de comunicación no disponible")
             if mensaje and mensaje.procesado:
+                self._rutas.guardar("respuesta_hormigas", self.RUTA_MENSAJES)
                 # Extraer hormigas del contenido del mensaje
                 hormigas_data = mensaje.contenido.get("hormigas", [])
                 if isinstance(hormigas_data, list):
                     return [self._mapear_hormiga_api_a_modelo(h) for h in hormigas_data]
-            return []
+                return []
+            if mensaje is None and self._ultimo_status == 404:
+                self._rutas.invalidar("respuesta_hormigas")
+            return None
+        
+        self._rutas.guardar("respuesta_hormigas", "/ants/response")
         
         # Procesar respuesta
         hormigas_data = response.get("hormigas", [])
@@ -306,6 +389,12 @@ class ComunicacionAPIService(ComunicacionService):
         Returns:
             True si está disponible, False en caso contrario
         """
+        # Sin petición extra si el circuito ya sabe la respuesta (abierto, o
+        # con un éxito reciente)
+        conocida = self.circuito.disponibilidad_conocida()
+        if conocida is not None:
+            return conocida
+        
         # Intentar hacer una petición simple para verificar disponibilidad
         try:
             # Usar endpoint de salud si está disponible
@@ -323,7 +412,12 @@ class ComunicacionAPIService(ComunicacionService):
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit - cierra el cliente HTTP."""
-        await self.client.aclose()
+        await self.cerrar()
+    
+    async def cerrar(self):
+        """Cierra el cliente HTTP y sus conexiones keep-alive."""
+        if not self.client.is_closed:
+            await self.client.aclose()
 
 
 
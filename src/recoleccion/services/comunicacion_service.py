@@ -68,6 +68,22 @@ class ComunicacionService(ABC):
         """
         pass
     
+    async def consultar_respuesta_hormigas_pendiente(self, mensaje_id: str) -> Optional[List[Hormiga]]:
+        """
+        Consulta la respuesta de una solicitud distinguiendo si aún no llegó.
+        
+        Por defecto no hay forma de saberlo y la respuesta actual se toma como
+        definitiva; las implementaciones que puedan distinguirlo devuelven None
+        mientras la solicitud siga pendiente.
+        
+        Args:
+            mensaje_id: ID del mensaje de solicitud
+            
+        Returns:
+            Lista de hormigas asignadas, o None si la respuesta aún no llegó
+        """
+        return await self.consultar_respuesta_hormigas(mensaje_id)
+    
     @abstractmethod
     async def devolver_hormigas(self, hormigas: List[Hormiga], alimento_recolectado: int) -> str:
         """
@@ -0,0 +1,116 @@
+"""
+Correlación de solicitudes con sus respuestas asíncronas (p. ej. hormigas de la reina).
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# Consulta de una respuesta: None mientras no haya llegado
+ConsultaRespuesta = Callable[[str], Awaitable[Optional[Any]]]
+
+
+class CorreladorRespuestas:
+    """
+    Espera respuestas identificadas por `mensaje_id` mediante futures.
+
+    Cada espera se resuelve con lo que llegue primero: el sondeo con backoff
+    exponencial (empieza en `intervalo_inicial` y se duplica hasta
+    `intervalo_maximo`) o una llamada a `resolver` desde un endpoint de
+    callback. Así la latencia sigue al tiempo real de respuesta en lugar de
+    una espera fija.
+    """
+
+    def __init__(
+        self,
+        intervalo_inicial: float = 0.02,
+        intervalo_maximo: float = 1.0,
+        timeout: Optional[float] = None
+    ):
+        """
+        Inicializa el correlador.
+
+        Args:
+            intervalo_inicial: Segundos antes del segundo sondeo
+            intervalo_maximo: Tope del intervalo entre sondeos
+            timeout: Espera máxima por respuesta (por defecto
+                `HORMIGAS_TIMEOUT_RESPUESTA` o 10 segundos)
+        """
+        self.intervalo_inicial = intervalo_inicial
+        self.intervalo_maximo = intervalo_maximo
+        self.timeout = timeout or float(os.getenv("HORMIGAS_TIMEOUT_RESPUESTA", "10"))
+        self.pendientes: Dict[str, asyncio.Future] = {}
+
+    async def esperar(
+        self,
+        mensaje_id: str,
+        consultar: ConsultaRespuesta,
+        timeout: Optional[float] = None
+    ) -> Optional[Any]:
+        """
+        Espera la respuesta de un mensaje.
+
+        Args:
+            mensaje_id: ID de la solicitud
+            consultar: Corrutina que devuelve la respuesta o None si aún no llegó
+            timeout: Espera máxima (None = la del correlador)
+
+        Returns:
+            La respuesta, o None si venció el timeout o se canceló la espera
+
+        Raises:
+            Exception: La que lance `consultar`
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self.pendientes[mensaje_id] = futuro
+        sondeo = loop.create_task(self._sondear(mensaje_id, futuro, consultar))
+        try:
+            return await asyncio.wait_for(futuro, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            print(f"Sin respuesta para el mensaje {mensaje_id} tras {timeout or self.timeout}s")
+            return None
+        finally:
+            sondeo.cancel()
+            if self.pendientes.get(mensaje_id) is futuro:
+                del self.pendientes[mensaje_id]
+
+    async def _sondear(self, mensaje_id: str, futuro: asyncio.Future, consultar: ConsultaRespuesta):
+        """Consulta la respuesta con backoff exponencial hasta resolver el future."""
+        espera = self.intervalo_inicial
+        while not futuro.done():
+            try:
+                respuesta = await consultar(mensaje_id)
+            except Exception as e:
+                if not futuro.done():
+                    futuro.set_exception(e)
+                return
+            if respuesta is not None:
+                if not futuro.done():
+                    futuro.set_result(respuesta)
+                return
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, self.intervalo_maximo)
+
+    def resolver(self, mensaje_id: str, respuesta: Any) -> bool:
+        """
+        Entrega una respuesta recibida por callback.
+
+        Returns:
+            True si había una espera pendiente para ese mensaje
+        """
+        futuro = self.pendientes.get(mensaje_id)
+        if futuro is None or futuro.done():
+            return False
+        futuro.set_result(respuesta)
+        return True
+
+    def cancelar(self, mensaje_id: str) -> bool:
+        """
+        Abandona la espera de un mensaje; `esperar` devuelve None.
+
+        Returns:
+            True si había una espera pendiente para ese mensaje
+        """
+        return self.resolver(mensaje_id, None)
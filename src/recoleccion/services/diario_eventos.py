@@ -0,0 +1,202 @@
+"""
+Diario de eventos con escritura diferida y por lotes.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+# Modos de durabilidad
+MODO_SYNC = "sync"
+MODO_GRUPO = "group"
+MODO_SIN_ESPERA = "fire_and_forget"
+MODOS_DURABILIDAD = (MODO_SYNC, MODO_GRUPO, MODO_SIN_ESPERA)
+
+Evento = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class DiarioEventos:
+    """
+    Acumula eventos de auditoría en memoria y los escribe por lotes.
+
+    Modos de durabilidad:
+    - "sync": cada evento se escribe en su propia transacción antes de volver.
+    - "group": el llamador espera a que su evento esté confirmado, pero los
+      eventos que llegan mientras se escribe un lote se agrupan en el siguiente
+      (group commit).
+    - "fire_and_forget": se encola y se vuelve de inmediato; el lote se
+      escribe al alcanzar `tamano_lote` o tras `intervalo` segundos.
+
+    El buffer tiene una capacidad máxima; cuando está lleno, `registrar`
+    espera a que se vacíe (backpressure) en lugar de crecer sin límite.
+    """
+
+    def __init__(
+        self,
+        escribir_lote: Callable[[List[Evento]], Awaitable[bool]],
+        modo: str = MODO_GRUPO,
+        tamano_lote: int = 100,
+        intervalo: float = 0.5,
+        capacidad: int = 1000
+    ):
+        """
+        Inicializa el diario.
+
+        Args:
+            escribir_lote: Corrutina que persiste una lista de eventos en una
+                sola transacción y devuelve True si tuvo éxito
+            modo: Modo de durabilidad ("sync", "group" o "fire_and_forget")
+            tamano_lote: Máximo de eventos por transacción
+            intervalo: Segundos máximos que un evento espera en el buffer
+                en modo "fire_and_forget"
+            capacidad: Máximo de eventos pendientes antes de aplicar backpressure
+        """
+        if modo not in MODOS_DURABILIDAD:
+            raise ValueError(f"Modo de durabilidad desconocido: {modo}")
+        self.escribir_lote = escribir_lote
+        self.modo = modo
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo = intervalo
+        self.capacidad = max(self.tamano_lote, capacidad)
+
+        self._buffer: List[Tuple[Evento, Optional[asyncio.Future]]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._espacio: Optional[asyncio.Event] = None
+        self._tarea_vaciado: Optional[asyncio.Task] = None
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+
+        self.eventos_registrados = 0
+        self.eventos_escritos = 0
+        self.eventos_fallidos = 0
+        self.lotes_escritos = 0
+        self.esperas_backpressure = 0
+
+    def _preparar_loop(self) -> asyncio.AbstractEventLoop:
+        """Asocia las primitivas de sincronización al event loop actual."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Cambio de loop (p. ej. entre tests): los futuros del loop anterior ya no sirven
+            self._loop = loop
+            self._espacio = asyncio.Event()
+            self._espacio.set()
+            self._tarea_vaciado = None
+            self._temporizador = None
+            self._buffer = [(evento, None) for evento, _ in self._buffer]
+        return loop
+
+    async def registrar(self, tipo_evento: str, descripcion: str, datos_adicionales: Dict[str, Any] = None) -> bool:
+        """
+        Registra un evento según el modo de durabilidad.
+
+        Args:
+            tipo_evento: Tipo del evento
+            descripcion: Descripción legible
+            datos_adicionales: Datos serializables asociados
+
+        Returns:
+            True si el evento quedó escrito (o encolado en "fire_and_forget")
+        """
+        evento: Evento = (tipo_evento, descripcion, datos_adicionales)
+        self.eventos_registrados += 1
+
+        if self.modo == MODO_SYNC:
+            return await self._escribir([evento])
+
+        loop = self._preparar_loop()
+        while len(self._buffer) >= self.capacidad:
+            # Backpressure: esperar a que el vaciado libere espacio
+            self.esperas_backpressure += 1
+            self._espacio.clear()
+            self._programar_vaciado(inmediato=True)
+            await self._espacio.wait()
+
+        futuro = loop.create_future() if self.modo == MODO_GRUPO else None
+        self._buffer.append((evento, futuro))
+        self._programar_vaciado(inmediato=self.modo == MODO_GRUPO or len(self._buffer) >= self.tamano_lote)
+
+        if futuro is not None:
+            return await futuro
+        return True
+
+    def _programar_vaciado(self, inmediato: bool) -> None:
+        """Lanza el vaciado ahora o programa uno tras `intervalo` segundos."""
+        if self._tarea_vaciado is not None and not self._tarea_vaciado.done():
+            # El vaciado en curso recogerá también los eventos nuevos
+            return
+        if inmediato:
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+            self._tarea_vaciado = self._loop.create_task(self._vaciar_buffer())
+        elif self._temporizador is None:
+            self._temporizador = self._loop.call_later(self.intervalo, self._vaciado_por_tiempo)
+
+    def _vaciado_por_tiempo(self) -> None:
+        """Callback del temporizador de vaciado."""
+        self._temporizador = None
+        self._programar_vaciado(inmediato=True)
+
+    async def _vaciar_buffer(self) -> None:
+        """Escribe el buffer en lotes de hasta `tamano_lote` eventos."""
+        while self._buffer:
+            lote = self._buffer[:self.tamano_lote]
+            del self._buffer[:len(lote)]
+            if self._espacio is not None and len(self._buffer) < self.capacidad:
+                self._espacio.set()
+
+            exito = await self._escribir([evento for evento, _ in lote])
+            for _, futuro in lote:
+                if futuro is not None and not futuro.done():
+                    futuro.set_result(exito)
+
+    async def _escribir(self, eventos: List[Evento]) -> bool:
+        """Persiste un lote y actualiza las métricas."""
+        try:
+            exito = bool(await self.escribir_lote(eventos))
+        except Exception as e:
+            print(f"Error escribiendo lote de {len(eventos)} eventos: {e}")
+            exito = False
+        if exito:
+            self.eventos_escritos += len(eventos)
+            self.lotes_escritos += 1
+        else:
+            self.eventos_fallidos += len(eventos)
+        return exito
+
+    async def vaciar(self) -> None:
+        """Escribe de inmediato todos los eventos pendientes y espera a que terminen."""
+        if self.modo == MODO_SYNC:
+            return
+        self._preparar_loop()
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        while self._buffer or (self._tarea_vaciado is not None and not self._tarea_vaciado.done()):
+            if self._tarea_vaciado is None or self._tarea_vaciado.done():
+                self._tarea_vaciado = self._loop.create_task(self._vaciar_buffer())
+            await self._tarea_vaciado
+
+    def extraer_pendientes(self) -> List[Evento]:
+        """
+        Retira y devuelve los eventos pendientes sin escribirlos.
+
+        Pensado para el cierre síncrono del servicio, que los escribe por su cuenta.
+        """
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        pendientes, self._buffer = self._buffer, []
+        return [evento for evento, _ in pendientes]
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Devuelve contadores del diario."""
+        return {
+            "modo": self.modo,
+            "pendientes": len(self._buffer),
+            "capacidad": self.capacidad,
+            "eventos_registrados": self.eventos_registrados,
+            "eventos_escritos": self.eventos_escritos,
+            "eventos_fallidos": self.eventos_fallidos,
+            "lotes_escritos": self.lotes_escritos,
+            "esperas_backpressure": self.esperas_backpressure,
+        }
@@ -0,0 +1,219 @@
+"""
+Difusión en vivo de eventos del ciclo de vida de las tareas (Server-Sent Events).
+"""
+
+import asyncio
+import json
+import os
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Set
+
+from ..models.tarea_recoleccion import TareaRecoleccion
+from .timer_service import TimerService, timer_service
+
+
+EventoTarea = Dict[str, Any]
+
+# Tipo de evento periódico que se agrupa por tarea
+TIPO_PROGRESO = "progreso"
+
+# Eventos tras los que una tarea ya no tiene progreso
+TIPOS_TERMINALES = ("completada", "cancelada")
+
+
+class Suscripcion:
+    """
+    Cola acotada de eventos de un suscriptor.
+
+    Los eventos de ciclo de vida se encolan en orden; si el suscriptor no
+    consume y la cola se llena, se descarta el más antiguo. Los ticks de
+    progreso se agrupan por tarea: solo se conserva el último de cada una, y
+    se descarta si la tarea terminó en el mismo lote (se entregan después de
+    los eventos de ciclo de vida y llegarían tras el fin).
+    """
+
+    def __init__(self, capacidad: int, tareas: Optional[Iterable[str]] = None):
+        """
+        Inicializa la suscripción.
+
+        Args:
+            capacidad: Máximo de eventos pendientes (por tipo de cola)
+            tareas: IDs de tarea a los que se limita la suscripción (None = todas)
+        """
+        self.capacidad = max(1, capacidad)
+        self.tareas: Optional[Set[str]] = set(tareas) if tareas else None
+        self._eventos: Deque[EventoTarea] = deque()
+        self._progreso: "OrderedDict[str, EventoTarea]" = OrderedDict()
+        self._aviso = asyncio.Event()
+        self.descartados = 0
+
+    def publicar(self, evento: EventoTarea) -> None:
+        """Encola un evento sin bloquear, descartando o agrupando si hace falta."""
+        if self.tareas is not None and evento.get("tarea_id") not in self.tareas:
+            return
+        if evento["tipo"] == TIPO_PROGRESO:
+            tarea_id = evento["tarea_id"]
+            self._progreso.pop(tarea_id, None)
+            self._progreso[tarea_id] = evento
+            if len(self._progreso) > self.capacidad:
+                self._progreso.popitem(last=False)
+                self.descartados += 1
+        else:
+            if len(self._eventos) >= self.capacidad:
+                self._eventos.popleft()
+                self.descartados += 1
+            self._eventos.append(evento)
+        self._aviso.set()
+
+    async def siguiente(self, timeout: Optional[float] = None) -> List[EventoTarea]:
+        """
+        Espera eventos y devuelve todos los pendientes.
+
+        Args:
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            Eventos pendientes (lista vacía si venció el timeout)
+        """
+        if not self._eventos and not self._progreso:
+            self._aviso.clear()
+            try:
+                await asyncio.wait_for(self._aviso.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        terminadas = {e.get("tarea_id") for e in self._eventos if e["tipo"] in TIPOS_TERMINALES}
+        eventos = list(self._eventos) + [
+            e for tarea_id, e in self._progreso.items() if tarea_id not in terminadas
+        ]
+        self._eventos.clear()
+        self._progreso.clear()
+        return eventos
+
+
+class DifusorEventosTareas:
+    """
+    Reparte los eventos del `TimerService` entre los suscriptores conectados.
+
+    Se registra como callback del timer ("iniciada", "completada",
+    "cancelada") y, mientras haya suscriptores, publica cada
+    `intervalo_progreso` segundos el progreso de las tareas en proceso.
+    """
+
+    def __init__(
+        self,
+        timer: TimerService,
+        capacidad: Optional[int] = None,
+        intervalo_progreso: Optional[float] = None
+    ):
+        """
+        Inicializa el difusor y lo registra en el timer.
+
+        Args:
+            timer: Servicio de timer cuyos eventos se difunden
+            capacidad: Eventos pendientes por suscriptor (por defecto
+                `STREAM_CAPACIDAD` o 256)
+            intervalo_progreso: Segundos entre ticks de progreso (por defecto
+                `STREAM_INTERVALO_PROGRESO` o 1.0)
+        """
+        self.timer = timer
+        self.capacidad = capacidad or int(os.getenv("STREAM_CAPACIDAD", "256"))
+        self.intervalo_progreso = intervalo_progreso or float(os.getenv("STREAM_INTERVALO_PROGRESO", "1.0"))
+        self.suscripciones: Set[Suscripcion] = set()
+        self._tarea_progreso: Optional[asyncio.Task] = None
+        timer.add_callback(self.notificar, callback_lote=self.notificar_lote)
+
+    def suscribir(self, tareas: Optional[Iterable[str]] = None) -> Suscripcion:
+        """
+        Crea una suscripción y arranca los ticks de progreso si es la primera.
+
+        Args:
+            tareas: IDs de tarea a seguir (None = todas)
+        """
+        suscripcion = Suscripcion(self.capacidad, tareas)
+        self.suscripciones.add(suscripcion)
+        if self._tarea_progreso is None or self._tarea_progreso.done():
+            self._tarea_progreso = asyncio.get_running_loop().create_task(self._publicar_progreso())
+        return suscripcion
+
+    def desuscribir(self, suscripcion: Suscripcion) -> None:
+        """Elimina una suscripción; sin suscriptores se detienen los ticks de progreso."""
+        self.suscripciones.discard(suscripcion)
+        if not self.suscripciones and self._tarea_progreso is not None:
+            self._tarea_progreso.cancel()
+            self._tarea_progreso = None
+
+    def publicar(self, evento: EventoTarea) -> None:
+        """Entrega un evento a todas las suscripciones."""
+        for suscripcion in list(self.suscripciones):
+            suscripcion.publicar(evento)
+
+    async def notificar(self, tarea: TareaRecoleccion, evento: str):
+        """Callback del timer para una tarea."""
+        if self.suscripciones:
+            self.publicar(self._evento_ciclo_vida(tarea, evento))
+
+    async def notificar_lote(self, tareas: List[TareaRecoleccion], evento: str):
+        """Callback del timer para un lote de tareas."""
+        if self.suscripciones:
+            for tarea in tareas:
+                self.publicar(self._evento_ciclo_vida(tarea, evento))
+
+    def _evento_ciclo_vida(self, tarea: TareaRecoleccion, evento: str) -> EventoTarea:
+        """Construye el evento publicado para un cambio de estado."""
+        return {
+            "tipo": evento,
+            "tarea_id": tarea.id,
+            "estado": tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado),
+            "alimento_id": tarea.alimento.id if tarea.alimento else None,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def _publicar_progreso(self):
+        """Publica periódicamente el progreso de las tareas en proceso."""
+        try:
+            while self.suscripciones:
+                for tarea in self.timer.get_tareas_en_proceso():
+                    self.publicar({
+                        "tipo": TIPO_PROGRESO,
+                        "tarea_id": tarea.id,
+                        "progreso": self.timer.get_progreso(tarea.id),
+                        "tiempo_restante": self.timer.get_tiempo_restante(tarea.id)
+                    })
+                await asyncio.sleep(self.intervalo_progreso)
+        except asyncio.CancelledError:
+            pass
+
+    async def flujo_sse(
+        self,
+        tareas: Optional[Iterable[str]] = None,
+        keepalive: float = 15.0
+    ) -> AsyncIterator[str]:
+        """
+        Genera el flujo Server-Sent Events de una nueva suscripción.
+
+        La suscripción se crea al empezar a consumir el flujo, no antes: si el
+        cliente se desconecta antes de que arranque la respuesta no queda nada
+        suscrito. Emite un comentario cada `keepalive` segundos sin eventos
+        para mantener viva la conexión, y cancela la suscripción al cerrarse.
+
+        Args:
+            tareas: IDs de tarea a seguir (None = todas)
+            keepalive: Segundos máximos sin enviar nada
+        """
+        suscripcion = self.suscribir(tareas)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                eventos = await suscripcion.siguiente(timeout=keepalive)
+                if not eventos:
+                    yield ": keep-alive\n\n"
+                    continue
+                for evento in eventos:
+                    yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            self.desuscribir(suscripcion)
+
+
+# Instancia global del difusor, conectada al timer global
+difusor_eventos = DifusorEventosTareas(timer_service)
@@ -3,12 +3,17 @@ Implementación del servicio de entorno que se conecta a la API REST
 del Subsistema de Generación de Entorno.
 """
 
+import asyncio
+import time
 import httpx
 from typing import List, Optional
 from enum import Enum
 
 from ..models.alimento import Alimento
 from .entorno_service import EntornoService
+from .cache_rutas import CacheRutas
+from .interruptor_circuito import InterruptorCircuito
+from .transporte_http import transporte_http
 
 
 class EstadoRecurso(str, Enum):
@@ -36,20 +41,32 @@ class EntornoAPIService(EntornoService):
     - GET /resources: Listar recursos (con filtros opcionales)
     - GET /resources/{id}: Obtener recurso por ID
     - PUT /resources/{id}: Actualizar recurso
+    
+    El listado prueba varias rutas según el despliegue; la que responde se
+    recuerda (con TTL) para no repetir peticiones fallidas en cada consulta.
     """
     
+    # Rutas posibles del listado de recursos, en orden de preferencia
+    RUTAS_RECURSOS = ["/resources", "/api/resources", "/entorno/resources"]
+    
     def __init__(self, base_url: str = "http://localhost:8001", timeout: int = 30):
         """
         Inicializa el servicio de API del entorno.
         
         Args:
             base_url: URL base del subsistema de entorno (por defecto localhost:8001)
-            timeout: Timeout en segundos para las peticiones HTTP
+            timeout: Timeout de lectura en segundos para las peticiones HTTP
+                (el pool, keep-alive y timeout de conexión son los del
+                transporte compartido)
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        self.client = transporte_http.crear_cliente("entorno", timeout)
         self._disponible = True
+        # Código HTTP de la última petición (None si no hubo respuesta)
+        self._ultimo_status: Optional[int] = None
+        self._rutas = CacheRutas()
+        self.circuito = InterruptorCircuito("entorno")
     
     async def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[dict]:
         """
@@ -64,16 +81,31 @@ class EntornoAPIService(EntornoService):
             Respuesta JSON como diccionario o None si hay error
         """
         url = f"{self.base_url}{endpoint}"
+        self._ultimo_status = None
+        
+        # Con el circuito abierto se falla de inmediato, sin esperar timeouts
+        if not self.circuito.permite_llamada():
+            self._disponible = False
+            return None
+        
+        if getattr(self.client, "is_closed", False) is True:
+            # El transporte cerró los clientes (apagado de la aplicación)
+            self.client = transporte_http.crear_cliente("entorno", self.timeout)
         
+        inicio = time.perf_counter()
         try:
             response = await self.client.request(method, url, **kwargs)
+            self._ultimo_status = response.status_code
+            transporte_http.registrar_latencia("entorno", time.perf_counter() - inicio, response.status_code >= 500)
             
             # Verificar disponibilidad del servicio
             if response.status_code >= 500:
                 self._disponible = False
+                self.circuito.registrar_fallo()
                 return None
             
             self._disponible = True
+            self.circuito.registrar_exito()
             
             if response.status_code == 404:
                 return None
@@ -84,11 +116,18 @@ class EntornoAPIService(EntornoService):
             # Para otros códigos, retornar None
             return None
             
+        except asyncio.CancelledError:
+            # Sin resultado: si era la llamada de prueba, el circuito admite otra
+            self.circuito.liberar_prueba()
+            raise
         except (httpx.TimeoutException, httpx.ConnectError, httpx.RequestError) as e:
+            transporte_http.registrar_latencia("entorno", time.perf_counter() - inicio, error=True)
             self._disponible = False
+            self.circuito.registrar_fallo()
             return None
         except Exception as e:
             self._disponible = False
+            self.circuito.registrar_fallo()
             return None
     
     def _mapear_recurso_a_alimento(self, recurso: dict) -> Alimento:
@@ -154,14 +193,22 @@ class EntornoAPIService(EntornoService):
         if estado is None:
             params["estado"] = "disponible"
         
-        # Intentar múltiples rutas posibles para compatibilidad
-        endpoints_a_probar = ["/resources", "/api/resources", "/entorno/resources"]
+        # La ruta que funcionó se reutiliza; solo un 404 obliga a redescubrirla
         response = None
+        ruta = self._rutas.obtener("recursos")
+        if ruta is not None:
+            response = await self._make_request("GET", ruta, params=params)
+            if response is None and self._ultimo_status == 404:
+                self._rutas.invalidar("recursos")
+                ruta = None
         
-        for endpoint in endpoints_a_probar:
-            response = await self._make_request("GET", endpoint, params=params)
-            if response is not None:
-                break
+        if ruta is None:
+            # Intentar múltiples rutas posibles para compatibilidad
+            for endpoint in self.RUTAS_RECURSOS:
+                response = await self._make_request("GET", endpoint, params=params)
+                if response is not None:
+                    self._rutas.guardar("recursos", endpoint)
+                    break
         
         if response is None:
             return []
@@ -272,6 +319,12 @@ class EntornoAPIService(EntornoService):
         Returns:
             True si está disponible, False en caso contrario
         """
+        # Sin petición extra si el circuito ya sabe la respuesta (abierto, o
+        # con un éxito reciente)
+        conocida = self.circuito.disponibilidad_conocida()
+        if conocida is not None:
+            return conocida
+        
         # Intentar hacer una petición simple para verificar disponibilidad
         try:
             # Usar endpoint de salud si está disponible, o listar recursos
@@ -310,5 +363,10 @@ class EntornoAPIService(EntornoService):
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit - cierra el cliente HTTP."""
-        await self.client.aclose()
+        await self.cerrar()
+    
+    async def cerrar(self):
+        """Cierra el cliente HTTP y sus conexiones keep-alive."""
+        if not self.client.is_closed:
+            await self.client.aclose()
 
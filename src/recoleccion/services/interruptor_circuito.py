@@ -0,0 +1,146 @@
+"""
+Interruptor de circuito para las llamadas a APIs de otros subsistemas.
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class InterruptorCircuito:
+    """
+    Corta las llamadas a un servicio remoto mientras esté caído.
+
+    - Cerrado: las llamadas pasan; `umbral_fallos` fallos seguidos lo abren.
+    - Abierto: las llamadas fallan de inmediato durante `tiempo_apertura`.
+    - Semiabierto: pasado ese tiempo se deja pasar una única llamada de
+      prueba; si va bien se cierra y si falla vuelve a abrirse. Si la prueba
+      no llega a registrar resultado (p. ej. se cancela), se admite otra al
+      cabo de `tiempo_apertura` o en cuanto se llame a `liberar_prueba`.
+
+    Además recuerda el último resultado para responder a las comprobaciones
+    de disponibilidad sin hacer una petición extra.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        umbral_fallos: Optional[int] = None,
+        tiempo_apertura: Optional[float] = None,
+        ttl_disponibilidad: Optional[float] = None
+    ):
+        """
+        Inicializa el interruptor (cerrado).
+
+        Args:
+            nombre: Servicio protegido (para métricas y mensajes)
+            umbral_fallos: Fallos consecutivos que lo abren (por defecto
+                `CIRCUITO_UMBRAL_FALLOS` o 5)
+            tiempo_apertura: Segundos abierto antes de probar de nuevo (por
+                defecto `CIRCUITO_TIEMPO_APERTURA` o 30)
+            ttl_disponibilidad: Segundos durante los que un éxito reciente
+                basta para darlo por disponible (por defecto
+                `CIRCUITO_TTL_DISPONIBILIDAD` o 10)
+        """
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos or int(os.getenv("CIRCUITO_UMBRAL_FALLOS", "5"))
+        self.tiempo_apertura = tiempo_apertura or float(os.getenv("CIRCUITO_TIEMPO_APERTURA", "30"))
+        self.ttl_disponibilidad = ttl_disponibilidad or float(os.getenv("CIRCUITO_TTL_DISPONIBILIDAD", "10"))
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.llamadas_rechazadas = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._prueba_desde = 0.0
+        self._ultimo_exito: Optional[float] = None
+
+    def permite_llamada(self) -> bool:
+        """
+        Indica si una llamada puede hacerse ahora.
+
+        Returns:
+            False si el circuito está abierto (la llamada debe fallar sin intentarse)
+        """
+        if self.estado == CERRADO:
+            return True
+        if self.estado == ABIERTO and time.monotonic() - self._abierto_desde >= self.tiempo_apertura:
+            self.estado = SEMIABIERTO
+            self._prueba_en_curso = False
+        if (
+            self.estado == SEMIABIERTO
+            and self._prueba_en_curso
+            and time.monotonic() - self._prueba_desde >= self.tiempo_apertura
+        ):
+            # La prueba anterior nunca registró resultado: se da por perdida
+            self._prueba_en_curso = False
+        if self.estado == SEMIABIERTO and not self._prueba_en_curso:
+            self._prueba_en_curso = True
+            self._prueba_desde = time.monotonic()
+            return True
+        self.llamadas_rechazadas += 1
+        return False
+
+    def registrar_exito(self) -> None:
+        """Anota una llamada que obtuvo respuesta del servicio."""
+        if self.estado != CERRADO:
+            print(f"Circuito {self.nombre} cerrado: el servicio vuelve a responder")
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self._prueba_en_curso = False
+        self._ultimo_exito = time.monotonic()
+
+    def liberar_prueba(self) -> None:
+        """Anota que la llamada en curso terminó sin resultado (p. ej. cancelada)."""
+        self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        """Anota una llamada fallida (error de red, timeout o 5xx)."""
+        self.fallos_consecutivos += 1
+        self._ultimo_exito = None
+        if self.estado == SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+            if self.estado != ABIERTO:
+                print(f"Circuito {self.nombre} abierto tras {self.fallos_consecutivos} fallos")
+            self.estado = ABIERTO
+            self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+    def disponibilidad_conocida(self) -> Optional[bool]:
+        """
+        Disponibilidad que se puede afirmar sin llamar al servicio.
+
+        Returns:
+            False si está abierto, True si hubo un éxito hace menos de
+            `ttl_disponibilidad` segundos, None si hay que comprobarlo
+        """
+        if self.estado == ABIERTO and time.monotonic() - self._abierto_desde < self.tiempo_apertura:
+            return False
+        if (
+            self.estado == CERRADO
+            and self._ultimo_exito is not None
+            and time.monotonic() - self._ultimo_exito < self.ttl_disponibilidad
+        ):
+            return True
+        return None
+
+    @property
+    def disponible(self) -> bool:
+        """False mientras el circuito esté abierto."""
+        return self.estado != ABIERTO
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Estado del interruptor para `/health`."""
+        metricas: Dict[str, Any] = {
+            "estado": self.estado,
+            "disponible": self.disponible,
+            "fallos_consecutivos": self.fallos_consecutivos,
+            "llamadas_rechazadas": self.llamadas_rechazadas
+        }
+        if self.estado == ABIERTO:
+            restante = self.tiempo_apertura - (time.monotonic() - self._abierto_desde)
+            metricas["reintento_en_segundos"] = round(max(0.0, restante), 1)
+        return metricas
@@ -2,7 +2,15 @@
 Servicio de persistencia para el subsistema de recolección.
 """
 
-from typing import List, Optional, Dict, Any
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Dict, Any, Union, Callable, Deque, AsyncIterator, Tuple
 from datetime import datetime
 
 from ..models.alimento import Alimento
@@ -13,21 +21,411 @@ from ..models.tipo_mensaje import TipoMensaje
 from ..models.estado_tarea import EstadoTarea
 from ..models.estado_hormiga import EstadoHormiga
 from ..database.database_manager import db_manager
+from .diario_eventos import DiarioEventos, Evento
+from .proyeccion_estado import ProyeccionEstadoTareas, registro_de_tarea
+from .cache_alimentos import CacheAlimentos
 import json
 
 
+class UnidadDeTrabajo:
+    """
+    Estado de una unidad de trabajo abierta con `PersistenceService.unidad_de_trabajo`.
+    
+    Todas las llamadas a la BD hechas dentro del bloque se ejecutan en el mismo
+    hilo (`carril`) y, por tanto, en la misma conexión y transacción.
+    """
+    
+    def __init__(self, servicio: "PersistenceService", carril: Optional[ThreadPoolExecutor]):
+        """
+        Inicializa la unidad de trabajo.
+        
+        Args:
+            servicio: Servicio de persistencia que la abrió
+            carril: Executor de un solo hilo reservado para la transacción
+                (None si el gestor de BD no soporta transacciones)
+        """
+        self.servicio = servicio
+        self.carril = carril
+        self.eventos: List[Evento] = []
+        # Cambios en memoria que solo deben aplicarse si la transacción se confirma
+        self.al_confirmar: List[Callable[[], Any]] = []
+        # Alimentos escritos en la transacción: se invalidan otra vez al terminar
+        self.alimentos_modificados: set = set()
+        self.cancelada = False
+        self.confirmada: Optional[bool] = None
+    
+    def cancelar(self) -> None:
+        """Marca la unidad para revertirla al salir del bloque."""
+        self.cancelada = True
+
+
+# Unidad de trabajo activa en el contexto asíncrono actual
+_unidad_actual: ContextVar[Optional[UnidadDeTrabajo]] = ContextVar("unidad_de_trabajo", default=None)
+
+
+class MetricasPool:
+    """
+    Métricas del pool de hilos que ejecuta las llamadas a la base de datos.
+    
+    La espera en cola es el tiempo entre que una llamada se envía al pool y
+    un hilo empieza a ejecutarla; refleja la saturación del pool.
+    """
+    
+    def __init__(self, tamano: int, ventana: int = 1000):
+        """
+        Inicializa las métricas.
+        
+        Args:
+            tamano: Número de hilos del pool
+            ventana: Cantidad de esperas recientes usadas para el percentil
+        """
+        self.tamano = tamano
+        self._lock = threading.Lock()
+        self._esperas_recientes: Deque[float] = deque(maxlen=ventana)
+        self.en_cola = 0
+        self.en_ejecucion = 0
+        self.completadas = 0
+        self.errores = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.ejecucion_total = 0.0
+    
+    def encolada(self) -> None:
+        """Registra una llamada enviada al pool."""
+        with self._lock:
+            self.en_cola += 1
+    
+    def iniciada(self, espera: float) -> None:
+        """Registra que un hilo tomó una llamada tras `espera` segundos en cola."""
+        with self._lock:
+            self.en_cola -= 1
+            self.en_ejecucion += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+            self._esperas_recientes.append(espera)
+    
+    def finalizada(self, duracion: float, error: bool = False) -> None:
+        """Registra el fin de una llamada que tardó `duracion` segundos."""
+        with self._lock:
+            self.en_ejecucion -= 1
+            self.completadas += 1
+            self.ejecucion_total += duracion
+            if error:
+                self.errores += 1
+    
+    def como_dict(self) -> Dict[str, Any]:
+        """Devuelve una instantánea serializable de las métricas (tiempos en ms)."""
+        with self._lock:
+            esperas = sorted(self._esperas_recientes)
+            completadas = self.completadas
+            return {
+                "tamano_pool": self.tamano,
+                "en_cola": self.en_cola,
+                "en_ejecucion": self.en_ejecucion,
+                "llamadas_completadas": completadas,
+                "llamadas_con_error": self.errores,
+                "espera_cola_media_ms": round(self.espera_total / completadas * 1000, 3) if completadas else 0.0,
+                "espera_cola_p95_ms": round(esperas[int(len(esperas) * 0.95) - 1 if len(esperas) > 1 else 0] * 1000, 3) if esperas else 0.0,
+                "espera_cola_maxima_ms": round(self.espera_maxima * 1000, 3),
+                "ejecucion_media_ms": round(self.ejecucion_total / completadas * 1000, 3) if completadas else 0.0,
+            }
+
+
 class PersistenceService:
     """
     Servicio de persistencia para datos del subsistema de recolección.
+    
+    Los gestores de BD son síncronos (sqlite3/pyodbc); cada llamada se ejecuta
+    en un pool de hilos acotado (`DB_POOL_SIZE`, 4 por defecto) para no
+    bloquear el event loop. Cada hilo usa su propia conexión.
+    
+    `unidad_de_trabajo()` agrupa varias operaciones en una sola transacción:
+    sus llamadas se ejecutan en un hilo reservado ("carril") y se confirman
+    con un único commit al salir del bloque.
+    
+    `proyeccion_estado` mantiene un registro compacto por tarea que se
+    actualiza al persistir cada transición y sirve `/tareas/status` sin leer
+    la tabla completa en cada consulta.
+    
+    `cache_alimentos` sirve las lecturas de alimentos (TTL y LRU); las
+    escrituras de alimentos de este servicio la invalidan.
+    
+    Los eventos de auditoría pasan por un `DiarioEventos` que los escribe por
+    lotes; su modo de durabilidad se configura con `EVENTOS_DURABILIDAD`
+    ("sync", "group" o "fire_and_forget"; "group" por defecto).
     """
     
-    def __init__(self):
-        """Inicializa el servicio de persistencia."""
+    def __init__(self, tamano_pool: Optional[int] = None, modo_eventos: Optional[str] = None):
+        """
+        Inicializa el servicio de persistencia.
+        
+        Args:
+            tamano_pool: Hilos del pool de BD (por defecto `DB_POOL_SIZE` o 4)
+            modo_eventos: Modo de durabilidad del diario de eventos
+                (por defecto `EVENTOS_DURABILIDAD` o "group")
+        """
         self.db = db_manager
+        self.tamano_pool = max(1, tamano_pool or int(os.getenv("DB_POOL_SIZE", "4")))
+        self.metricas_pool = MetricasPool(self.tamano_pool)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._carriles_libres: List[ThreadPoolExecutor] = []
+        self._carriles_creados: List[ThreadPoolExecutor] = []
+        self._esperando_carril: Deque[asyncio.Future] = deque()
+        self.proyeccion_estado = ProyeccionEstadoTareas()
+        self.cache_alimentos = CacheAlimentos()
+        # Última instantánea confirmada en BD de cada tarea activa guardada por
+        # este servicio (con su hora), para escribir solo las diferencias en el
+        # siguiente guardado. Acotada (LRU) y con TTL: pasado ese tiempo otro
+        # proceso pudo cambiar la fila y se vuelve a guardar la tarea completa
+        self._tareas_persistidas: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.capacidad_instantaneas = max(1, int(os.getenv("TAREAS_INSTANTANEAS_CAPACIDAD", "1000")))
+        self.ttl_instantaneas = float(os.getenv("TAREAS_INSTANTANEAS_TTL", "30"))
+        self.diario_eventos = DiarioEventos(
+            self._escribir_lote_eventos,
+            modo=modo_eventos or os.getenv("EVENTOS_DURABILIDAD", "group"),
+            tamano_lote=int(os.getenv("EVENTOS_TAMANO_LOTE", "100")),
+            intervalo=float(os.getenv("EVENTOS_INTERVALO", "0.5")),
+            capacidad=int(os.getenv("EVENTOS_CAPACIDAD", "1000"))
+        )
+    
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        """Crea el pool de hilos la primera vez que se necesita."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.tamano_pool,
+                        thread_name_prefix="persistencia-bd"
+                    )
+        return self._executor
+    
+    async def _ejecutar(self, metodo: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecuta una llamada síncrona a la BD en el pool de hilos.
+        
+        Args:
+            metodo: Método del gestor de BD
+            *args: Argumentos posicionales del método
+            **kwargs: Argumentos con nombre del método
+            
+        Returns:
+            El resultado del método
+        """
+        unidad = _unidad_actual.get()
+        if unidad is not None and unidad.servicio is self and unidad.carril is not None:
+            # Dentro de una unidad de trabajo: mismo hilo, misma transacción
+            executor = unidad.carril
+        else:
+            executor = self._obtener_executor()
+        return await self._ejecutar_en(executor, metodo, *args, **kwargs)
+    
+    async def _ejecutar_en(self, executor: ThreadPoolExecutor, metodo: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta una llamada síncrona a la BD en `executor` registrando métricas."""
+        encolada = time.perf_counter()
+        self.metricas_pool.encolada()
+        
+        def llamada():
+            inicio = time.perf_counter()
+            self.metricas_pool.iniciada(inicio - encolada)
+            error = False
+            try:
+                return metodo(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.metricas_pool.finalizada(time.perf_counter() - inicio, error)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, llamada)
+    
+    async def _tomar_carril(self) -> ThreadPoolExecutor:
+        """Reserva un hilo para una unidad de trabajo (hasta `tamano_pool` a la vez)."""
+        while True:
+            with self._executor_lock:
+                if self._carriles_libres:
+                    return self._carriles_libres.pop()
+                if len(self._carriles_creados) < self.tamano_pool:
+                    carril = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistencia-uow")
+                    self._carriles_creados.append(carril)
+                    return carril
+            esperando = asyncio.get_running_loop().create_future()
+            self._esperando_carril.append(esperando)
+            try:
+                await esperando
+            except asyncio.CancelledError:
+                if esperando.done() and not esperando.cancelled():
+                    # Se canceló tras ser despertada: el carril libre pasa a la siguiente
+                    self._despertar_siguiente()
+                else:
+                    try:
+                        self._esperando_carril.remove(esperando)
+                    except ValueError:
+                        pass
+                raise
+    
+    def _devolver_carril(self, carril: ThreadPoolExecutor) -> None:
+        """Libera un carril y despierta a la siguiente unidad de trabajo en espera."""
+        with self._executor_lock:
+            self._carriles_libres.append(carril)
+        self._despertar_siguiente()
+    
+    def _despertar_siguiente(self) -> None:
+        """Despierta a la primera unidad de trabajo que sigue esperando un carril."""
+        while self._esperando_carril:
+            esperando = self._esperando_carril.popleft()
+            if not esperando.done() and not esperando.get_loop().is_closed():
+                esperando.set_result(None)
+                break
+    
+    @asynccontextmanager
+    async def unidad_de_trabajo(self) -> AsyncIterator[UnidadDeTrabajo]:
+        """
+        Agrupa varias operaciones de persistencia en una sola transacción.
+        
+        Las escrituras hechas dentro del bloque no se confirman una a una: al
+        salir se escriben los eventos acumulados y se hace un único commit. Si
+        el bloque lanza una excepción, algún paso falla en la BD o se llama a
+        `cancelar()`, se revierte todo. Los bloques anidados se unen a la
+        unidad exterior.
+        
+        Yields:
+            La unidad de trabajo; `confirmada` indica el resultado al salir
+        """
+        actual = _unidad_actual.get()
+        if actual is not None and actual.servicio is self:
+            yield actual
+            return
+        
+        if not hasattr(self.db, 'iniciar_transaccion'):
+            # Gestores sin transacciones: cada escritura se confirma por separado
+            unidad = UnidadDeTrabajo(self, None)
+            yield unidad
+            unidad.confirmada = not unidad.cancelada
+            return
+        
+        carril = await self._tomar_carril()
+        unidad = UnidadDeTrabajo(self, carril)
+        token = _unidad_actual.set(unidad)
+        cerrada = False
+        try:
+            await self._ejecutar(self.db.iniciar_transaccion)
+            try:
+                yield unidad
+            except BaseException:
+                unidad.confirmada = False
+                await self._ejecutar(self.db.revertir_transaccion)
+                cerrada = True
+                raise
+            if unidad.cancelada:
+                unidad.confirmada = False
+                await self._ejecutar(self.db.revertir_transaccion)
+                cerrada = True
+                return
+            if unidad.eventos:
+                # Los eventos de la operación viajan en la misma transacción
+                await self._ejecutar(self._guardar_lote_eventos, unidad.eventos)
+            unidad.confirmada = await self._ejecutar(self.db.confirmar_transaccion)
+            cerrada = True
+            if not unidad.confirmada:
+                print(f"Unidad de trabajo revertida: {getattr(self.db, 'last_error', None)}")
+            else:
+                for cambio in unidad.al_confirmar:
+                    cambio()
+        finally:
+            if not cerrada:
+                # Bloque abandonado a medias (p. ej. al cerrarse el event loop):
+                # se revierte en su hilo antes de que otra unidad reutilice el carril
+                carril.submit(self.db.revertir_transaccion)
+            self._devolver_carril(carril)
+            try:
+                _unidad_actual.reset(token)
+            except ValueError:
+                # Finalizado desde otro contexto: la variable ya no es la suya
+                pass
+            if unidad.alimentos_modificados:
+                # Confirmada o revertida, lo cacheado durante la transacción no vale
+                self.cache_alimentos.invalidar(unidad.alimentos_modificados)
+    
+    def _proyectar(self, cambio: Callable[[], Any]) -> None:
+        """Aplica un cambio a la proyección de estado, o al confirmar si hay una unidad de trabajo."""
+        unidad = _unidad_actual.get()
+        if unidad is not None and unidad.servicio is self and unidad.carril is not None:
+            unidad.al_confirmar.append(cambio)
+        else:
+            cambio()
+    
+    async def consultar_status_tareas(
+        self,
+        estado: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Consulta la proyección de estado de tareas (se carga de la BD la primera vez).
+        
+        Args:
+            estado: Valor de estado a filtrar (None = todos)
+            limit: Máximo de tareas a devolver (None = todas)
+            offset: Tareas a saltar (orden por ID)
+            
+        Returns:
+            Diccionario con "tareas", "total", "version" y "etag"
+        """
+        await self._asegurar_proyeccion()
+        return self.proyeccion_estado.consultar(estado=estado, limit=limit, offset=offset)
+    
+    async def consultar_cambios_tareas(self, desde: Optional[str] = None, limite: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Devuelve las tareas modificadas después de un cursor de la proyección de estado.
+        
+        La proyección y sus versiones son de este proceso: el feed solo es
+        coherente con un único proceso de la API. Con varios workers cada uno
+        tiene su propia época y un cursor que llega a otro worker provoca
+        una resincronización completa.
+        
+        Args:
+            desde: Cursor de una consulta anterior (None = todas las tareas)
+            limite: Máximo de tareas a devolver
+            
+        Returns:
+            Diccionario con "tareas", "cursor", "version", "hay_mas" y "reinicio"
+        """
+        await self._asegurar_proyeccion()
+        return self.proyeccion_estado.cambios_desde(desde, limite=limite)
+    
+    async def _asegurar_proyeccion(self) -> None:
+        """Carga la proyección de estado desde la BD la primera vez que se consulta."""
+        if not self.proyeccion_estado.cargada:
+            self.proyeccion_estado.cargar(await self._ejecutar(self.db.obtener_tareas))
+    
+    def obtener_metricas_pool(self) -> Dict[str, Any]:
+        """Devuelve el tamaño del pool de BD y las métricas de espera en cola."""
+        return self.metricas_pool.como_dict()
+    
+    def obtener_metricas_cache_alimentos(self) -> Dict[str, Any]:
+        """Devuelve aciertos, fallos y ocupación de la caché de alimentos."""
+        return self.cache_alimentos.obtener_metricas()
+    
+    def _puede_cachear(self) -> bool:
+        """False dentro de una unidad de trabajo: lo leído aún puede revertirse."""
+        unidad = _unidad_actual.get()
+        return self.cache_alimentos.activa and not (
+            unidad is not None and unidad.servicio is self and unidad.carril is not None
+        )
+    
+    def _invalidar_alimentos(self, alimento_ids: List[str]) -> None:
+        """Invalida alimentos escritos, también al terminar la unidad de trabajo actual."""
+        self.cache_alimentos.invalidar(alimento_ids)
+        unidad = _unidad_actual.get()
+        if unidad is not None and unidad.servicio is self and unidad.carril is not None:
+            unidad.alimentos_modificados.update(alimento_ids)
     
     async def guardar_alimento(self, alimento: Alimento) -> bool:
         """Guarda un alimento en la base de datos."""
-        success = self.db.guardar_alimento(alimento)
+        success = await self._ejecutar(self.db.guardar_alimento, alimento)
+        self._invalidar_alimentos([alimento.id])
         if success:
             await self._registrar_evento(
                 "alimento_guardado",
@@ -37,31 +435,95 @@ class PersistenceService:
         return success
     
     async def obtener_alimentos(self) -> List[Alimento]:
-        """Obtiene todos los alimentos de la base de datos."""
-        return self.db.obtener_alimentos()
+        """Obtiene todos los alimentos (de la caché si el listado está vigente)."""
+        cacheable = self._puede_cachear()
+        if cacheable:
+            alimentos = self.cache_alimentos.obtener_todos()
+            if alimentos is not None:
+                return alimentos
+        generacion = self.cache_alimentos.generacion()
+        alimentos = await self._ejecutar(self.db.obtener_alimentos)
+        if cacheable and isinstance(alimentos, list):
+            self.cache_alimentos.guardar_todos(alimentos, generacion)
+        return alimentos
+    
+    @staticmethod
+    def _alimento_de_fila(row: Dict[str, Any]) -> Alimento:
+        """Convierte una fila cruda de alimentos en un `Alimento`."""
+        return Alimento(
+            id=str(row['id']),
+            nombre=row['nombre'],
+            cantidad_hormigas_necesarias=row['cantidad_hormigas_necesarias'],
+            puntos_stock=row['puntos_stock'],
+            tiempo_recoleccion=row['tiempo_recoleccion'],
+            disponible=bool(row['disponible'])
+        )
     
     async def obtener_alimento_por_id(self, alimento_id: str) -> Optional[Alimento]:
-        """Obtiene un alimento por su ID desde la base de datos."""
+        """Obtiene un alimento por su ID (de la caché si está vigente)."""
+        cacheable = self._puede_cachear()
+        if cacheable:
+            alimento = self.cache_alimentos.obtener(alimento_id)
+            if alimento is not None:
+                return alimento
+        # Si se invalida durante la lectura, la fila puede ser anterior a la escritura
+        generacion = self.cache_alimentos.generacion()
         try:
-            row = self.db.obtener_alimento_por_id(alimento_id)
+            row = await self._ejecutar(self.db.obtener_alimento_por_id, alimento_id)
             if not row:
                 return None
-            return Alimento(
-                id=str(row['id']),
-                nombre=row['nombre'],
-                cantidad_hormigas_necesarias=row['cantidad_hormigas_necesarias'],
-                puntos_stock=row['puntos_stock'],
-                tiempo_recoleccion=row['tiempo_recoleccion'],
-                disponible=bool(row['disponible'])
-            )
+            alimento = self._alimento_de_fila(row)
+            if cacheable:
+                self.cache_alimentos.guardar(alimento, generacion)
+            return alimento
         except Exception as e:
             print(f"Error obteniendo alimento por id: {e}")
             return None
     
+    async def obtener_alimentos_por_ids(self, alimento_ids: List[str]) -> Dict[str, Alimento]:
+        """
+        Obtiene varios alimentos por ID con una sola ida al pool de BD.
+        
+        Solo se consultan en la BD los IDs que no están en la caché.
+        
+        Args:
+            alimento_ids: IDs a resolver (pueden repetirse)
+            
+        Returns:
+            Diccionario alimento_id -> Alimento; los IDs inexistentes no aparecen
+        """
+        cacheable = self._puede_cachear()
+        if cacheable:
+            encontrados, alimento_ids = self.cache_alimentos.obtener_varios(alimento_ids)
+            if not alimento_ids:
+                return encontrados
+        else:
+            encontrados = {}
+        generacion = self.cache_alimentos.generacion()
+        try:
+            if hasattr(self.db, 'obtener_alimentos_por_ids'):
+                filas = await self._ejecutar(self.db.obtener_alimentos_por_ids, list(alimento_ids))
+            else:
+                filas = {}
+                for alimento_id in dict.fromkeys(alimento_ids):
+                    row = await self._ejecutar(self.db.obtener_alimento_por_id, alimento_id)
+                    if row:
+                        filas[str(row['id'])] = row
+            for alimento_id, row in filas.items():
+                alimento = self._alimento_de_fila(row)
+                if cacheable:
+                    self.cache_alimentos.guardar(alimento, generacion)
+                encontrados[alimento_id] = alimento
+            return encontrados
+        except Exception as e:
+            print(f"Error obteniendo alimentos por ids: {e}")
+            return {}
+    
     async def actualizar_alimento_disponibilidad(self, alimento_id: str, disponible: bool) -> bool:
         """Actualiza la disponibilidad de un alimento en la base de datos."""
         try:
-            success = self.db.actualizar_alimento_disponibilidad(alimento_id, disponible)
+            success = await self._ejecutar(self.db.actualizar_alimento_disponibilidad, alimento_id, disponible)
+            self._invalidar_alimentos([alimento_id])
             if success:
                 await self._registrar_evento(
                     "alimento_actualizado",
@@ -74,9 +536,33 @@ class PersistenceService:
             return False
     
     async def guardar_tarea(self, tarea: TareaRecoleccion) -> bool:
-        """Guarda una tarea en la base de datos."""
-        success = self.db.guardar_tarea(tarea)
+        """
+        Guarda una tarea en la base de datos.
+        
+        Si la tarea se guardó desde este servicio hace menos de
+        `TAREAS_INSTANTANEAS_TTL` segundos y el gestor lo permite, solo se
+        escriben los campos y asignaciones que cambiaron desde entonces; si no
+        cambió nada no se toca la BD. Un cambio de alimento o de lote, o una
+        instantánea caducada, obliga a guardar la tarea completa.
+        """
+        instantanea = tarea.instantanea()
+        anterior = self._instantanea_vigente(tarea.id)
+        cambios = tarea.cambios_desde(anterior) if anterior is not None else None
+        if (
+            cambios is not None
+            and hasattr(self.db, 'actualizar_cambios_tarea')
+            and not {"alimento_id", "hormigas_lote_id"} & cambios["campos"].keys()
+        ):
+            if cambios["campos"] or cambios["hormigas_agregadas"] or cambios["hormigas_quitadas"]:
+                success = await self._ejecutar(self.db.actualizar_cambios_tarea, tarea, cambios)
+            else:
+                success = True
+        else:
+            success = await self._ejecutar(self.db.guardar_tarea, tarea)
         if success:
+            registro = registro_de_tarea(tarea)
+            self._proyectar(lambda: self.proyeccion_estado.aplicar(registro))
+            self._proyectar(lambda: self._registrar_instantanea(tarea.id, instantanea))
             await self._registrar_evento(
                 "tarea_guardada",
                 f"Tarea {tarea.id} guardada en base de datos",
@@ -89,25 +575,186 @@ class PersistenceService:
             )
         return success
     
-    async def obtener_tareas(self) -> List[TareaRecoleccion]:
-        """Obtiene todas las tareas de la base de datos."""
-        return self.db.obtener_tareas()
+    async def guardar_tareas_lote(self, tareas: List[TareaRecoleccion]) -> bool:
+        """
+        Guarda varias tareas nuevas y sus eventos en una sola transacción.
+        
+        Args:
+            tareas: Tareas a guardar
+            
+        Returns:
+            True si se guardaron todas; si alguna falla no se guarda ninguna
+        """
+        if not tareas:
+            return True
+        async with self.unidad_de_trabajo() as unidad:
+            for tarea in tareas:
+                if not await self.guardar_tarea(tarea):
+                    unidad.cancelar()
+                    return False
+        return unidad.confirmada
+    
+    async def completar_tareas_lote(self, tareas: List[TareaRecoleccion]) -> bool:
+        """
+        Persiste el cierre de un lote de tareas completadas en una transacción.
+        
+        Con gestores que implementan `completar_tareas` se usan UPDATE por
+        lotes y un único INSERT de eventos; con el resto, las llamadas
+        individuales de siempre dentro de la misma unidad de trabajo.
+        
+        Args:
+            tareas: Tareas completadas en memoria
+            
+        Returns:
+            True si el lote quedó persistido
+        """
+        if not tareas:
+            return True
+        async with self.unidad_de_trabajo() as unidad:
+            # Completar una tarea marca su alimento como no disponible
+            self._invalidar_alimentos([tarea.alimento.id for tarea in tareas])
+            if hasattr(self.db, 'completar_tareas'):
+                exito = await self._ejecutar(self.db.completar_tareas, tareas)
+            else:
+                exito = True
+                for tarea in tareas:
+                    exito = await self._ejecutar(self.db.guardar_tarea, tarea) and exito
+                    exito = await self._ejecutar(self.db.actualizar_estado_tarea, tarea.id, tarea.estado.value) and exito
+                    exito = await self._ejecutar(self.db.actualizar_alimento_disponibilidad, tarea.alimento.id, False) and exito
+            if not exito:
+                unidad.cancelar()
+            else:
+                registros = [registro_de_tarea(tarea) for tarea in tareas]
+                self._proyectar(lambda: [self.proyeccion_estado.aplicar(registro) for registro in registros])
+                cierres = [
+                    {
+                        "id": tarea.id,
+                        "estado": tarea.estado,
+                        "fecha_fin": tarea.fecha_fin,
+                        "alimento_recolectado": tarea.alimento_recolectado
+                    }
+                    for tarea in tareas
+                ]
+                self._proyectar(lambda: self._actualizar_instantaneas(cierres))
+                for tarea in tareas:
+                    await self._registrar_evento(
+                        "tarea_completada_automatica",
+                        f"Tarea {tarea.id} completada automáticamente por timer",
+                        {"tarea_id": tarea.id, "alimento_id": tarea.alimento.id, "cantidad": tarea.alimento_recolectado}
+                    )
+        return bool(exito and unidad.confirmada)
+    
+    def _instantanea_vigente(self, tarea_id: str) -> Optional[Dict[str, Any]]:
+        """Instantánea de la tarea si aún es fiable (dentro del TTL), o None."""
+        entrada = self._tareas_persistidas.get(tarea_id)
+        if entrada is None:
+            return None
+        instantanea, guardada = entrada
+        if time.monotonic() - guardada >= self.ttl_instantaneas:
+            del self._tareas_persistidas[tarea_id]
+            return None
+        return instantanea
+    
+    def _registrar_instantanea(self, tarea_id: str, instantanea: Dict[str, Any]) -> None:
+        """
+        Guarda la instantánea confirmada de una tarea.
+        
+        Las tareas terminadas (completadas o canceladas) se olvidan; si se
+        supera `capacidad_instantaneas` se descarta la usada hace más tiempo.
+        """
+        if instantanea.get("estado") in (EstadoTarea.COMPLETADA, EstadoTarea.CANCELADA):
+            self._tareas_persistidas.pop(tarea_id, None)
+            return
+        self._tareas_persistidas[tarea_id] = (instantanea, time.monotonic())
+        self._tareas_persistidas.move_to_end(tarea_id)
+        while len(self._tareas_persistidas) > self.capacidad_instantaneas:
+            self._tareas_persistidas.popitem(last=False)
+    
+    def _actualizar_instantaneas(self, cambios: List[Dict[str, Any]]) -> None:
+        """
+        Refleja en las instantáneas de tareas escrituras hechas por otra vía.
+        
+        Args:
+            cambios: Diccionarios con "id" y los campos escritos en BD; se
+                ignoran las tareas sin instantánea
+        """
+        for cambio in cambios:
+            entrada = self._tareas_persistidas.get(cambio.get("id"))
+            if entrada is not None:
+                instantanea = dict(entrada[0])
+                instantanea.update({campo: valor for campo, valor in cambio.items() if campo != "id"})
+                self._registrar_instantanea(cambio["id"], instantanea)
+    
+    async def obtener_tareas(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        estado: Union[EstadoTarea, List[EstadoTarea], None] = None
+    ) -> List[TareaRecoleccion]:
+        """
+        Obtiene tareas de la base de datos, opcionalmente filtradas y paginadas.
+        
+        Args:
+            limit: Máximo de tareas a devolver (None = todas)
+            offset: Tareas a saltar (al paginar se ordena por ID)
+            estado: Estado o lista de estados a filtrar (None = todos)
+        """
+        if limit is None and not offset and estado is None:
+            return await self._ejecutar(self.db.obtener_tareas)
+        return await self._ejecutar(self.db.obtener_tareas, limit=limit, offset=offset, estado=estado)
+    
+    async def obtener_tareas_por_estado(
+        self,
+        estado: Union[EstadoTarea, List[EstadoTarea]]
+    ) -> List[TareaRecoleccion]:
+        """Obtiene las tareas en uno o varios estados, filtrando en la BD."""
+        return await self._ejecutar(self.db.obtener_tareas_por_estado, estado)
+    
+    async def obtener_ids_tareas_existentes(self, tarea_ids: List[str]) -> set:
+        """
+        Indica cuáles de los IDs ya tienen una tarea en la BD con una sola consulta.
+        
+        Args:
+            tarea_ids: IDs a comprobar
+            
+        Returns:
+            Conjunto con los IDs existentes
+        """
+        if not tarea_ids:
+            return set()
+        if hasattr(self.db, 'obtener_ids_tareas_existentes'):
+            return await self._ejecutar(self.db.obtener_ids_tareas_existentes, list(tarea_ids))
+        existentes = set()
+        for tarea_id in dict.fromkeys(tarea_ids):
+            if await self._ejecutar(self.db.obtener_tarea_por_id, tarea_id):
+                existentes.add(tarea_id)
+        return existentes
+    
+    async def obtener_tarea_por_id(self, tarea_id: str, ignorar_mayusculas: bool = False) -> Optional[TareaRecoleccion]:
+        """
+        Obtiene una tarea por su ID con una única búsqueda indexada.
+        
+        Args:
+            tarea_id: ID de la tarea
+            ignorar_mayusculas: Si True, acepta coincidencias sin distinguir mayúsculas
+        """
+        return await self._ejecutar(self.db.obtener_tarea_por_id, tarea_id, ignorar_mayusculas=ignorar_mayusculas)
     
     async def obtener_tareas_activas(self) -> List[TareaRecoleccion]:
         """Obtiene solo las tareas activas."""
-        todas_las_tareas = await self.obtener_tareas()
-        return [t for t in todas_las_tareas if t.estado in [EstadoTarea.PENDIENTE, EstadoTarea.EN_PROCESO]]
+        return await self.obtener_tareas_por_estado([EstadoTarea.PENDIENTE, EstadoTarea.EN_PROCESO])
     
     async def obtener_tareas_completadas(self) -> List[TareaRecoleccion]:
         """Obtiene solo las tareas completadas."""
-        todas_las_tareas = await self.obtener_tareas()
-        return [t for t in todas_las_tareas if t.estado == EstadoTarea.COMPLETADA]
+        return await self.obtener_tareas_por_estado(EstadoTarea.COMPLETADA)
     
     async def actualizar_estado_tarea(self, tarea_id: str, nuevo_estado: EstadoTarea) -> bool:
         """Actualiza el estado de una tarea."""
         try:
-            success = self.db.actualizar_estado_tarea(tarea_id, nuevo_estado.value)
+            success = await self._ejecutar(self.db.actualizar_estado_tarea, tarea_id, nuevo_estado.value)
             if success:
+                self._proyectar(lambda: self.proyeccion_estado.actualizar_estado(tarea_id, nuevo_estado.value))
+                self._proyectar(lambda: self._actualizar_instantaneas([{"id": tarea_id, "estado": nuevo_estado}]))
                 await self._registrar_evento(
                     "tarea_actualizada",
                     f"Estado de tarea {tarea_id} actualizado a {nuevo_estado.value}",
@@ -121,7 +768,7 @@ class PersistenceService:
     async def guardar_mensaje(self, mensaje: Mensaje) -> bool:
         """Guarda un mensaje en la base de datos."""
         try:
-            success = self.db.guardar_mensaje(mensaje)
+            success = await self._ejecutar(self.db.guardar_mensaje, mensaje)
             if success:
                 await self._registrar_evento(
                     "mensaje_guardado",
@@ -141,7 +788,7 @@ class PersistenceService:
     async def obtener_mensajes(self, subsistema_origen: str = None) -> List[Mensaje]:
         """Obtiene mensajes de la base de datos."""
         try:
-            rows = self.db.obtener_mensajes(subsistema_origen=subsistema_origen)
+            rows = await self._ejecutar(self.db.obtener_mensajes, subsistema_origen=subsistema_origen)
             mensajes: List[Mensaje] = []
             for row in rows:
                 mensajes.append(Mensaje(
@@ -162,19 +809,20 @@ class PersistenceService:
     async def obtener_estadisticas(self) -> Dict[str, Any]:
         """Obtiene estadísticas del subsistema."""
         try:
-            return self.db.obtener_estadisticas()
+            return await self._ejecutar(self.db.obtener_estadisticas)
         except Exception as e:
             print(f"Error obteniendo estadísticas: {e}")
             return {}
     
     async def obtener_eventos_recientes(self, limite: int = 50) -> List[Dict[str, Any]]:
-        """Obtiene los eventos más recientes."""
-        return self.db.obtener_eventos(limite)
+        """Obtiene los eventos más recientes (incluidos los pendientes del diario)."""
+        await self.diario_eventos.vaciar()
+        return await self._ejecutar(self.db.obtener_eventos, limite)
     
     async def guardar_evento(self, tipo_evento: str, descripcion: str, datos_adicionales: Dict[str, Any] = None) -> bool:
         """Guarda un evento en la base de datos."""
         try:
-            return self.db.guardar_evento(tipo_evento, descripcion, datos_adicionales)
+            return await self._ejecutar(self.db.guardar_evento, tipo_evento, descripcion, datos_adicionales)
         except Exception as e:
             print(f"Error guardando evento: {e}")
             return False
@@ -192,6 +840,8 @@ class PersistenceService:
                     "database": os.getenv("SQLSERVER_DATABASE", "unknown"),
                     "odbc_driver": os.getenv("SQLSERVER_ODBC_DRIVER", "unknown")
                 })
+                if hasattr(self.db, 'obtener_metricas_cache'):
+                    info["cache"] = self.db.obtener_metricas_cache()
             # Adjuntar último error de BD si existe (para depurar)
             last_error = getattr(self.db, 'last_error', None)
             if last_error:
@@ -204,8 +854,33 @@ class PersistenceService:
         return getattr(self.db, 'last_error', None)
     
     async def _registrar_evento(self, tipo_evento: str, descripcion: str, datos_adicionales: Dict[str, Any] = None):
-        """Registra un evento en la base de datos."""
-        self.db.guardar_evento(tipo_evento, descripcion, datos_adicionales)
+        """
+        Registra un evento a través del diario de eventos (escritura por lotes).
+        
+        Dentro de una unidad de trabajo el evento se acumula y se escribe en su
+        transacción, de modo que solo queda registrado si la operación se confirma.
+        """
+        unidad = _unidad_actual.get()
+        if unidad is not None and unidad.servicio is self and unidad.carril is not None:
+            unidad.eventos.append((tipo_evento, descripcion, datos_adicionales))
+            return
+        await self.diario_eventos.registrar(tipo_evento, descripcion, datos_adicionales)
+    
+    def _guardar_lote_eventos(self, eventos: List[Evento]) -> bool:
+        """Escribe un lote de eventos con el gestor de BD (en un hilo del pool)."""
+        if hasattr(self.db, 'guardar_eventos'):
+            return self.db.guardar_eventos(eventos)
+        # Gestores sin escritura por lotes: un INSERT por evento
+        return all([self.db.guardar_evento(tipo, descripcion, datos) for tipo, descripcion, datos in eventos])
+    
+    async def _escribir_lote_eventos(self, eventos: List[Evento]) -> bool:
+        """Escribe un lote de eventos en una transacción sin bloquear el event loop."""
+        # Siempre en el pool general: el diario no participa de unidades de trabajo ajenas
+        return await self._ejecutar_en(self._obtener_executor(), self._guardar_lote_eventos, eventos)
+    
+    async def vaciar_eventos(self):
+        """Escribe de inmediato los eventos pendientes del diario."""
+        await self.diario_eventos.vaciar()
     
     async def crear_lote_hormigas(
         self, 
@@ -221,7 +896,7 @@ class PersistenceService:
             Tupla (exitoso, mensaje_error)
         """
         try:
-            success = self.db.crear_lote_hormigas(lote_id, tarea_id, cantidad_enviada, cantidad_requerida)
+            success = await self._ejecutar(self.db.crear_lote_hormigas, lote_id, tarea_id, cantidad_enviada, cantidad_requerida)
             if success:
                 await self._registrar_evento(
                     "lote_creado",
@@ -243,7 +918,7 @@ class PersistenceService:
     async def aceptar_lote_hormigas(self, lote_id: str) -> tuple[bool, Optional[str]]:
         """Acepta un lote de hormigas."""
         try:
-            success = self.db.aceptar_lote_hormigas(lote_id)
+            success = await self._ejecutar(self.db.aceptar_lote_hormigas, lote_id)
             if success:
                 await self._registrar_evento(
                     "lote_aceptado",
@@ -260,7 +935,7 @@ class PersistenceService:
     async def marcar_lote_en_uso(self, lote_id: str) -> bool:
         """Marca un lote como en uso."""
         try:
-            success = self.db.marcar_lote_en_uso(lote_id)
+            success = await self._ejecutar(self.db.marcar_lote_en_uso, lote_id)
             if success:
                 await self._registrar_evento(
                     "lote_en_uso",
@@ -274,12 +949,12 @@ class PersistenceService:
     
     async def verificar_lote_disponible(self, lote_id: str, cantidad_requerida: int) -> tuple[bool, Optional[str]]:
         """Verifica que un lote esté disponible y tenga cantidad suficiente."""
-        return self.db.verificar_lote_disponible(lote_id, cantidad_requerida)
+        return await self._ejecutar(self.db.verificar_lote_disponible, lote_id, cantidad_requerida)
     
     async def guardar_hormigas_en_lote(self, lote_id: str, hormigas: List[Hormiga]) -> bool:
         """Guarda las hormigas asignadas en un lote."""
         try:
-            success = self.db.guardar_hormigas_en_lote(lote_id, hormigas)
+            success = await self._ejecutar(self.db.guardar_hormigas_en_lote, lote_id, hormigas)
             if success:
                 await self._registrar_evento(
                     "hormigas_guardadas_en_lote",
@@ -293,10 +968,21 @@ class PersistenceService:
     
     async def obtener_hormigas_por_lote(self, lote_id: str) -> List[Hormiga]:
         """Obtiene las hormigas asignadas a un lote."""
-        return self.db.obtener_hormigas_por_lote(lote_id)
+        return await self._ejecutar(self.db.obtener_hormigas_por_lote, lote_id)
 
     def cerrar(self):
-        """Cierra la conexión a la base de datos."""
+        """Escribe los eventos pendientes, detiene el pool y cierra las conexiones."""
+        pendientes = self.diario_eventos.extraer_pendientes()
+        if pendientes:
+            self._guardar_lote_eventos(pendientes)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._executor_lock:
+            carriles, self._carriles_creados = self._carriles_creados, []
+            self._carriles_libres = []
+        for carril in carriles:
+            carril.shutdown(wait=True)
         self.db.cerrar()
 
 
@@ -0,0 +1,227 @@
+"""
+Proyección de estado de tareas para consultas de status y feed de cambios.
+"""
+
+import bisect
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..models.tarea_recoleccion import TareaRecoleccion
+
+
+RegistroEstado = Dict[str, Any]
+
+
+def registro_de_tarea(tarea: TareaRecoleccion) -> RegistroEstado:
+    """
+    Construye el registro compacto de estado de una tarea.
+
+    Args:
+        tarea: Tarea a proyectar
+
+    Returns:
+        Diccionario con el formato que expone `/tareas/status`
+    """
+    return {
+        "tarea_id": tarea.id,
+        "estado": tarea.estado.value if hasattr(tarea.estado, 'value') else str(tarea.estado),
+        "alimento": {
+            "id": tarea.alimento.id if tarea.alimento else None,
+            "nombre": tarea.alimento.nombre if tarea.alimento else None
+        },
+        "hormigas_lote_id": getattr(tarea, 'hormigas_lote_id', None),
+        "inicio": tarea.fecha_inicio.isoformat() if tarea.fecha_inicio else None,
+        "fin": tarea.fecha_fin.isoformat() if tarea.fecha_fin else None,
+        "alimento_recolectado": tarea.alimento_recolectado
+    }
+
+
+class ProyeccionEstadoTareas:
+    """
+    Registro compacto por tarea, mantenido en cada transición de estado.
+
+    Cada cambio incrementa una versión global y queda anotado en el registro
+    afectado; el ETag de una consulta depende solo de las tareas que devuelve,
+    de modo que un cliente que sondea recibe 304 mientras su página no cambie.
+    Los IDs se mantienen ordenados, en total y por estado, para paginar y
+    filtrar sin recorrer todas las tareas en cada consulta.
+
+    Las versiones por tarea se guardan en orden de cambio, así que
+    `cambios_desde` recorre solo las tareas modificadas tras un cursor. El
+    cursor incluye una época propia de la instancia: un cursor de un proceso
+    anterior provoca una resincronización completa en lugar de perder cambios.
+    Las versiones viven en memoria y solo ven los cambios hechos por este
+    proceso, así que el feed está pensado para un único proceso de la API:
+    con varios workers cada cursor solo es válido en el worker que lo emitió.
+
+    Se conserva un registro por cada tarea, también las terminadas: el
+    registro es pequeño y `/tareas/status` se sirve solo desde aquí.
+    """
+
+    def __init__(self):
+        """Inicializa una proyección vacía (sin cargar)."""
+        self._registros: Dict[str, RegistroEstado] = {}
+        # tarea_id -> versión de su último cambio, en orden de versión creciente
+        self._versiones: "OrderedDict[str, int]" = OrderedDict()
+        self._ids_ordenados: List[str] = []
+        self._ids_por_estado: Dict[str, List[str]] = {}
+        self.version = 0
+        self.epoca = format(time.time_ns() // 1_000_000, "x")
+        self.cargada = False
+
+    def cargar(self, tareas: Iterable[TareaRecoleccion]) -> None:
+        """
+        Carga el estado inicial desde la BD.
+
+        Las tareas ya proyectadas se conservan: pueden haber cambiado mientras
+        se leía la BD y su registro es más reciente.
+
+        Args:
+            tareas: Tareas leídas de la BD
+        """
+        for tarea in tareas:
+            if tarea.id not in self._registros:
+                self.aplicar(registro_de_tarea(tarea))
+        self.cargada = True
+
+    def actualizar(self, tarea: TareaRecoleccion) -> bool:
+        """
+        Proyecta el estado actual de una tarea.
+
+        Returns:
+            True si el registro cambió
+        """
+        return self.aplicar(registro_de_tarea(tarea))
+
+    def aplicar(self, registro: RegistroEstado) -> bool:
+        """
+        Guarda un registro ya construido si difiere del actual.
+
+        Args:
+            registro: Registro generado con `registro_de_tarea`
+
+        Returns:
+            True si el registro cambió
+        """
+        tarea_id = registro["tarea_id"]
+        actual = self._registros.get(tarea_id)
+        if actual == registro:
+            return False
+        estado = registro["estado"]
+        if actual is None:
+            bisect.insort(self._ids_ordenados, tarea_id)
+        if actual is None or actual["estado"] != estado:
+            if actual is not None:
+                self._quitar_id(self._ids_por_estado[actual["estado"]], tarea_id)
+            bisect.insort(self._ids_por_estado.setdefault(estado, []), tarea_id)
+        self.version += 1
+        self._registros[tarea_id] = registro
+        self._versiones[tarea_id] = self.version
+        self._versiones.move_to_end(tarea_id)
+        return True
+
+    @staticmethod
+    def _quitar_id(ids: List[str], tarea_id: str) -> None:
+        """Quita un ID de una lista ordenada."""
+        posicion = bisect.bisect_left(ids, tarea_id)
+        if posicion < len(ids) and ids[posicion] == tarea_id:
+            del ids[posicion]
+
+    def actualizar_estado(self, tarea_id: str, estado: str) -> bool:
+        """
+        Cambia solo el estado de una tarea ya proyectada.
+
+        Returns:
+            True si el registro cambió
+        """
+        actual = self._registros.get(tarea_id)
+        if actual is None:
+            return False
+        return self.aplicar({**actual, "estado": estado})
+
+    def consultar(
+        self,
+        estado: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Devuelve una página de registros, opcionalmente filtrada por estado.
+
+        Args:
+            estado: Valor de estado a filtrar (None = todos)
+            limit: Máximo de registros (None = todos)
+            offset: Registros a saltar (orden por ID de tarea)
+
+        Returns:
+            Diccionario con "tareas", "total", "version" y "etag"
+        """
+        if estado is None:
+            ids = self._ids_ordenados
+        else:
+            ids = self._ids_por_estado.get(estado, [])
+        pagina = ids[offset:] if limit is None else ids[offset:offset + limit]
+
+        huella = hashlib.sha1(f"{estado}|{limit}|{offset}|{len(ids)}".encode())
+        for tarea_id in pagina:
+            huella.update(f"|{tarea_id}:{self._versiones[tarea_id]}".encode())
+
+        return {
+            "tareas": [self._registros[tarea_id] for tarea_id in pagina],
+            "total": len(ids),
+            "version": self.version,
+            "etag": f'"{huella.hexdigest()}"'
+        }
+
+    def cursor(self, version: Optional[int] = None) -> str:
+        """Cursor opaco ("<época>-<versión>") para la versión dada o la actual."""
+        return f"{self.epoca}-{self.version if version is None else version}"
+
+    def _leer_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Devuelve la versión de un cursor de esta instancia, o None si no es válido."""
+        if not cursor:
+            return None
+        epoca, _, version = cursor.partition("-")
+        if epoca != self.epoca or not version.isdigit() or int(version) > self.version:
+            return None
+        return int(version)
+
+    def cambios_desde(self, cursor: Optional[str] = None, limite: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Devuelve las tareas modificadas después de un cursor, en orden de cambio.
+
+        Args:
+            cursor: Cursor devuelto por una llamada anterior (None = desde el inicio)
+            limite: Máximo de tareas a devolver; si quedan más, `hay_mas` es True
+                y el cursor apunta al último cambio entregado
+
+        Returns:
+            Diccionario con "tareas", "cursor", "version", "hay_mas" y
+            "reinicio" (True si el cursor no era válido y se envía todo)
+        """
+        desde = self._leer_cursor(cursor)
+        reinicio = cursor is not None and desde is None
+
+        cambiadas: List[str] = []
+        for tarea_id in reversed(self._versiones):
+            if desde is not None and self._versiones[tarea_id] <= desde:
+                break
+            cambiadas.append(tarea_id)
+        cambiadas.reverse()
+
+        hay_mas = limite is not None and len(cambiadas) > limite
+        if hay_mas:
+            cambiadas = cambiadas[:limite]
+            nuevo_cursor = self.cursor(self._versiones[cambiadas[-1]])
+        else:
+            nuevo_cursor = self.cursor()
+
+        return {
+            "tareas": [self._registros[tarea_id] for tarea_id in cambiadas],
+            "cursor": nuevo_cursor,
+            "version": self.version,
+            "hay_mas": hay_mas,
+            "reinicio": reinicio
+        }
@@ -4,8 +4,9 @@ Implementa la lógica de negocio para la recolección siguiendo TDD.
 """
 
 import asyncio
-from typing import List, Optional
-from datetime import datetime
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
 
 from ..models.alimento import Alimento
 from ..models.hormiga import Hormiga
@@ -17,6 +18,9 @@ from ..models.tipo_mensaje import TipoMensaje
 from .entorno_service import EntornoService
 from .comunicacion_service import ComunicacionService
 from .timer_service import timer_service
+from .correlador_respuestas import CorreladorRespuestas
+from .agrupador_hormigas import AgrupadorSolicitudesHormigas
+from .tarea_registry import TareaRegistry, TareasView, ACTIVAS, COMPLETADAS
 
 
 class RecoleccionService:
@@ -37,11 +41,47 @@ class RecoleccionService:
         """
         self.entorno_service = entorno_service
         self.comunicacion_service = comunicacion_service
-        self.tareas_activas: List[TareaRecoleccion] = []
-        self.tareas_completadas: List[TareaRecoleccion] = []
+        self.registro_tareas = TareaRegistry()
+        # Esperas de respuestas de la reina, por mensaje_id
+        self.correlador_hormigas = CorreladorRespuestas()
+        # Solicitudes de hormigas simultáneas viajan juntas en un solo mensaje
+        self.agrupador_hormigas = AgrupadorSolicitudesHormigas(
+            self._solicitar_lote_hormigas, self._devolver_hormigas_sobrantes
+        )
         
         # Configurar callbacks del timer service
-        timer_service.add_callback(self._on_tarea_completada)
+        timer_service.add_callback(self._on_tarea_completada, callback_lote=self._on_tareas_completadas)
+    
+    @property
+    def tareas_activas(self) -> TareasView:
+        """Vista tipo lista de las tareas activas (respaldada por el registro)."""
+        return TareasView(self.registro_tareas, ACTIVAS)
+    
+    @tareas_activas.setter
+    def tareas_activas(self, tareas: List[TareaRecoleccion]) -> None:
+        self.registro_tareas.reemplazar_grupo(ACTIVAS, tareas)
+    
+    @property
+    def tareas_completadas(self) -> TareasView:
+        """Vista tipo lista de las tareas completadas (respaldada por el registro)."""
+        return TareasView(self.registro_tareas, COMPLETADAS)
+    
+    @tareas_completadas.setter
+    def tareas_completadas(self, tareas: List[TareaRecoleccion]) -> None:
+        self.registro_tareas.reemplazar_grupo(COMPLETADAS, tareas)
+    
+    def obtener_tarea(self, tarea_id: str, ignorar_mayusculas: bool = True) -> Optional[TareaRecoleccion]:
+        """
+        Busca una tarea en memoria por su ID en O(1).
+        
+        Args:
+            tarea_id: ID de la tarea
+            ignorar_mayusculas: Si True, tolera diferencias de mayúsculas y espacios
+            
+        Returns:
+            Tarea encontrada o None
+        """
+        return self.registro_tareas.obtener(tarea_id, ignorar_mayusculas=ignorar_mayusculas)
     
     async def _on_tarea_completada(self, tarea: TareaRecoleccion, evento: str):
         """
@@ -53,10 +93,7 @@ class RecoleccionService:
         """
         if evento == "completada":
             # Mover tarea de activas a completadas
-            if tarea in self.tareas_activas:
-                self.tareas_activas.remove(tarea)
-            if tarea not in self.tareas_completadas:
-                self.tareas_completadas.append(tarea)
+            self.registro_tareas.registrar(tarea, COMPLETADAS)
             
             # Marcar el alimento como no disponible (recolectado) en memoria
             tarea.alimento.marcar_como_recolectado()
@@ -64,24 +101,25 @@ class RecoleccionService:
             # Persistir tarea completada en BD y actualizar estado del alimento
             try:
                 from ..services.persistence_service import persistence_service
-                await persistence_service.guardar_tarea(tarea)
-                await persistence_service.actualizar_estado_tarea(tarea.id, tarea.estado)
-                # IMPORTANTE: Actualizar el estado del alimento en la tabla Alimentos
-                await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, False)
-                # Guardar evento de completado
-                await persistence_service.guardar_evento(
-                    "tarea_completada_automatica",
-                    f"Tarea {tarea.id} completada automáticamente por timer",
-                    {"tarea_id": tarea.id, "alimento_id": tarea.alimento.id, "cantidad": tarea.alimento_recolectado}
-                )
+                async with persistence_service.unidad_de_trabajo():
+                    await persistence_service.guardar_tarea(tarea)
+                    await persistence_service.actualizar_estado_tarea(tarea.id, tarea.estado)
+                    # IMPORTANTE: Actualizar el estado del alimento en la tabla Alimentos
+                    await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, False)
+                    # Guardar evento de completado
+                    await persistence_service.guardar_evento(
+                        "tarea_completada_automatica",
+                        f"Tarea {tarea.id} completada automáticamente por timer",
+                        {"tarea_id": tarea.id, "alimento_id": tarea.alimento.id, "cantidad": tarea.alimento_recolectado}
+                    )
                 print(f"Tarea {tarea.id} completada automáticamente. Alimento {tarea.alimento.id} marcado como recolectado en BD.")
             except Exception as e:
                 print(f"Advertencia: No se pudo persistir tarea completada automáticamente en BD: {e}")
         
         elif evento == "cancelada":
             # Mover tarea de activas (si está ahí)
-            if tarea in self.tareas_activas:
-                self.tareas_activas.remove(tarea)
+            if self.registro_tareas.grupo_de(tarea.id) == ACTIVAS:
+                self.registro_tareas.eliminar(tarea.id)
             
             # Asegurar que el estado sea CANCELADA
             from ..models.estado_tarea import EstadoTarea
@@ -93,24 +131,54 @@ class RecoleccionService:
             # Persistir tarea cancelada en BD y actualizar estado del alimento a disponible
             try:
                 from ..services.persistence_service import persistence_service
-                # IMPORTANTE: Persistir primero la tarea completa
-                await persistence_service.guardar_tarea(tarea)
-                # Luego actualizar explícitamente el estado a CANCELADA
-                await persistence_service.actualizar_estado_tarea(tarea.id, EstadoTarea.CANCELADA)
-                # IMPORTANTE: Actualizar el estado del alimento a DISPONIBLE en la tabla Alimentos
-                await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, True)
-                # Guardar evento de cancelación
-                await persistence_service.guardar_evento(
-                    "tarea_cancelada",
-                    f"Tarea {tarea.id} cancelada y reseteada",
-                    {"tarea_id": tarea.id, "alimento_id": tarea.alimento.id}
-                )
+                async with persistence_service.unidad_de_trabajo():
+                    # IMPORTANTE: Persistir primero la tarea completa
+                    await persistence_service.guardar_tarea(tarea)
+                    # Luego actualizar explícitamente el estado a CANCELADA
+                    await persistence_service.actualizar_estado_tarea(tarea.id, EstadoTarea.CANCELADA)
+                    # IMPORTANTE: Actualizar el estado del alimento a DISPONIBLE en la tabla Alimentos
+                    await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, True)
+                    # Guardar evento de cancelación
+                    await persistence_service.guardar_evento(
+                        "tarea_cancelada",
+                        f"Tarea {tarea.id} cancelada y reseteada",
+                        {"tarea_id": tarea.id, "alimento_id": tarea.alimento.id}
+                    )
                 print(f"Tarea {tarea.id} cancelada. Estado CANCELADA persistido en BD. Alimento {tarea.alimento.id} vuelto a disponible.")
             except Exception as e:
                 print(f"ERROR: No se pudo persistir tarea cancelada en BD: {e}")
                 import traceback
                 traceback.print_exc()
     
+    async def _on_tareas_completadas(self, tareas: List[TareaRecoleccion], evento: str):
+        """
+        Callback por lotes del timer service para las tareas vencidas en un mismo tick.
+        
+        Actualiza el registro en memoria tarea por tarea y persiste el lote
+        completo con una sola transacción.
+        
+        Args:
+            tareas: Tareas que cambiaron de estado
+            evento: Tipo de evento (solo "completada" se procesa por lotes)
+        """
+        if evento != "completada":
+            for tarea in tareas:
+                await self._on_tarea_completada(tarea, evento)
+            return
+        
+        for tarea in tareas:
+            self.registro_tareas.registrar(tarea, COMPLETADAS)
+            tarea.alimento.marcar_como_recolectado()
+        
+        try:
+            from ..services.persistence_service import persistence_service
+            if await persistence_service.completar_tareas_lote(tareas):
+                print(f"Lote de {len(tareas)} tareas completado automáticamente y persistido en BD.")
+            else:
+                print(f"Advertencia: No se pudo persistir el lote de {len(tareas)} tareas completadas en BD")
+        except Exception as e:
+            print(f"Advertencia: No se pudo persistir lote de tareas completadas automáticamente en BD: {e}")
+    
     async def consultar_alimentos_disponibles(
         self,
         zona_id: Optional[int] = None,
@@ -156,7 +224,7 @@ class RecoleccionService:
             raise ValueError(f"El alimento '{alimento.nombre}' (ID: {alimento.id}) no está disponible. Estado: agotado")
         
         tarea = TareaRecoleccion(id=tarea_id, alimento=alimento)
-        self.tareas_activas.append(tarea)
+        self.registro_tareas.registrar(tarea, ACTIVAS)
         
         # Persistir en base de datos
         try:
@@ -173,16 +241,73 @@ class RecoleccionService:
         
         return tarea
     
+    async def crear_tareas_recoleccion(self, pares: List[Tuple[str, Alimento]]) -> List[TareaRecoleccion]:
+        """
+        Crea varias tareas de recolección y las persiste en una sola transacción.
+        
+        Args:
+            pares: Pares (tarea_id, alimento) ya validados
+            
+        Returns:
+            Tareas creadas
+            
+        Raises:
+            ValueError: Si algún alimento no está disponible (no se crea ninguna)
+            RuntimeError: Si la transacción no se confirmó; las tareas se
+                quitan de memoria y no se crea ninguna
+        """
+        for tarea_id, alimento in pares:
+            if not alimento.disponible:
+                raise ValueError(f"El alimento '{alimento.nombre}' (ID: {alimento.id}) no está disponible. Estado: agotado")
+        
+        tareas = [TareaRecoleccion(id=tarea_id, alimento=alimento) for tarea_id, alimento in pares]
+        for tarea in tareas:
+            self.registro_tareas.registrar(tarea, ACTIVAS)
+        
+        try:
+            from ..services.persistence_service import persistence_service
+            guardado = await persistence_service.guardar_tareas_lote(tareas)
+        except Exception as e:
+            print(f"Error al persistir el lote de tareas: {e}")
+            import traceback
+            traceback.print_exc()
+            guardado = False
+        
+        if not guardado:
+            # Sin filas en la BD las tareas no deben quedar en memoria
+            for tarea in tareas:
+                self.registro_tareas.eliminar(tarea.id)
+            raise RuntimeError(f"No se pudo guardar el lote de {len(tareas)} tareas en BD")
+        
+        print(f"{len(tareas)} tareas guardadas correctamente en BD")
+        return tareas
+    
     async def solicitar_hormigas(self, cantidad: int) -> List[Hormiga]:
         """
         Solicita hormigas al subsistema de Hormiga Reina.
         
+        Las solicitudes que llegan casi a la vez (p. ej. desde el modo
+        concurrente de `/procesar`) se agrupan en un solo mensaje y las
+        hormigas recibidas se reparten entre ellas.
+        
         Args:
             cantidad: Cantidad de hormigas solicitadas
             
         Returns:
             Lista de hormigas asignadas
         """
+        return await self.agrupador_hormigas.solicitar(cantidad)
+    
+    async def _solicitar_lote_hormigas(self, cantidad: int) -> List[Hormiga]:
+        """
+        Envía un único mensaje de solicitud de hormigas y espera la respuesta.
+        
+        Args:
+            cantidad: Cantidad total de hormigas solicitadas
+            
+        Returns:
+            Lista de hormigas recibidas
+        """
         if not await self.comunicacion_service.is_disponible():
             raise Exception("Servicio de comunicación no disponible")
         
@@ -191,12 +316,19 @@ class RecoleccionService:
             cantidad, "recoleccion"
         )
         
-        # Esperar respuesta (en un escenario real, esto sería asíncrono)
-        await asyncio.sleep(0.1)  # Simulación de latencia
-        
-        # Consultar respuesta
-        hormigas = await self.comunicacion_service.consultar_respuesta_hormigas(mensaje_id)
-        return hormigas
+        # Esperar la respuesta: sondeo con backoff o callback de la reina,
+        # lo que llegue primero
+        # La variante "pendiente" se busca en la clase de la implementación:
+        # los dobles sin ella (p. ej. Mock) se sondean con la consulta simple
+        consultar = self.comunicacion_service.consultar_respuesta_hormigas
+        if getattr(type(self.comunicacion_service), "consultar_respuesta_hormigas_pendiente", None):
+            consultar = self.comunicacion_service.consultar_respuesta_hormigas_pendiente
+        hormigas = await self.correlador_hormigas.esperar(mensaje_id, consultar)
+        return hormigas or []
+    
+    async def _devolver_hormigas_sobrantes(self, hormigas: List[Hormiga]) -> None:
+        """Devuelve a la reina las hormigas de un lote que no se repartieron."""
+        await self.comunicacion_service.devolver_hormigas(hormigas, 0)
     
     async def asignar_hormigas_a_tarea(
         self, 
@@ -240,35 +372,39 @@ class RecoleccionService:
         
         # Persistir en la base de datos
         try:
-            # Verificar que el lote no esté en uso (solo si el lote ya existe)
-            es_valido, error_msg = await persistence_service.verificar_lote_disponible(lote_id, cantidad_requerida)
-            if not es_valido and error_msg and "no encontrado" not in error_msg.lower():
-                # Si el lote existe pero está en uso, es un error real
-                print(f"Advertencia: Lote {lote_id} puede estar en uso: {error_msg}")
+            # Una sola transacción: el lote, sus hormigas y la tarea se confirman juntos
+            async with persistence_service.unidad_de_trabajo() as unidad:
+                # Verificar que el lote no esté en uso (solo si el lote ya existe)
+                es_valido, error_msg = await persistence_service.verificar_lote_disponible(lote_id, cantidad_requerida)
+                if not es_valido and error_msg and "no encontrado" not in error_msg.lower():
+                    # Si el lote existe pero está en uso, es un error real
+                    print(f"Advertencia: Lote {lote_id} puede estar en uso: {error_msg}")
             
-            # Crear el lote en la base de datos
-            exito, error = await persistence_service.crear_lote_hormigas(
-                lote_id, tarea.id, cantidad_enviada, cantidad_requerida
-            )
-            if not exito:
-                print(f"Error creando lote {lote_id}: {error}")
-            else:
-                # Aceptar el lote
-                aceptado = await persistence_service.aceptar_lote_hormigas(lote_id)
-                if not aceptado:
-                    print(f"Advertencia: No se pudo aceptar el lote {lote_id}")
+                # Crear el lote en la base de datos
+                exito, error = await persistence_service.crear_lote_hormigas(
+                    lote_id, tarea.id, cantidad_enviada, cantidad_requerida
+                )
+                if not exito:
+                    print(f"Error creando lote {lote_id}: {error}")
+                else:
+                    # Aceptar el lote
+                    aceptado = await persistence_service.aceptar_lote_hormigas(lote_id)
+                    if not aceptado:
+                        print(f"Advertencia: No se pudo aceptar el lote {lote_id}")
                 
-                # Guardar hormigas en el lote en la base de datos
-                guardado_hormigas = await persistence_service.guardar_hormigas_en_lote(lote_id, hormigas)
-                if not guardado_hormigas:
-                    print(f"Advertencia: No se pudieron guardar las hormigas en el lote {lote_id}")
+                    # Guardar hormigas en el lote en la base de datos
+                    guardado_hormigas = await persistence_service.guardar_hormigas_en_lote(lote_id, hormigas)
+                    if not guardado_hormigas:
+                        print(f"Advertencia: No se pudieron guardar las hormigas en el lote {lote_id}")
                 
-                # Persistir tarea (IMPORTANTE: debe guardarse después de asignar hormigas)
-                guardado_tarea = await persistence_service.guardar_tarea(tarea)
-                if not guardado_tarea:
-                    print(f"Error: No se pudo guardar la tarea {tarea.id} en la base de datos")
-                else:
-                    print(f"Tarea {tarea.id} guardada correctamente en BD con {len(tarea.hormigas_asignadas)} hormigas")
+                    # Persistir tarea (IMPORTANTE: debe guardarse después de asignar hormigas)
+                    guardado_tarea = await persistence_service.guardar_tarea(tarea)
+                    if not guardado_tarea:
+                        print(f"Error: No se pudo guardar la tarea {tarea.id} en la base de datos")
+                    else:
+                        print(f"Tarea {tarea.id} guardada correctamente en BD con {len(tarea.hormigas_asignadas)} hormigas")
+            if unidad.confirmada is False:
+                print(f"Error: se revirtió la persistencia del lote {lote_id} para la tarea {tarea.id}")
         except Exception as e:
             # Mostrar el error en lugar de silenciarlo
             print(f"Error al persistir en BD (asignar_hormigas_a_tarea): {e}")
@@ -277,13 +413,20 @@ class RecoleccionService:
         
         return True, None
     
-    async def iniciar_tarea_recoleccion(self, tarea: TareaRecoleccion, hormigas_lote_id: Optional[str] = None) -> None:
+    async def iniciar_tarea_recoleccion(
+        self,
+        tarea: TareaRecoleccion,
+        hormigas_lote_id: Optional[str] = None,
+        iniciar_timer: bool = True
+    ) -> None:
         """
         Inicia una tarea de recolección con timer en tiempo real.
         
         Args:
             tarea: Tarea a iniciar
             hormigas_lote_id: ID opcional del lote de hormigas que se usa para iniciar la tarea.
+            iniciar_timer: Si es False no se arranca el timer; quien llama lo
+                hace tras confirmar la transacción en la que se inicia la tarea
             
         Raises:
             ValueError: Si la tarea no puede ser iniciada
@@ -319,13 +462,15 @@ class RecoleccionService:
         # Iniciar la tarea en memoria primero
         tarea.iniciar_tarea()
         
-        # Agregar a tareas activas si no está
-        if tarea not in self.tareas_activas:
-            self.tareas_activas.append(tarea)
+        # Agregar a tareas activas si no está (o reindexar su nuevo estado)
+        if self.registro_tareas.grupo_de(tarea.id) != ACTIVAS:
+            self.registro_tareas.registrar(tarea, ACTIVAS)
+        else:
+            self.registro_tareas.actualizar(tarea)
         
         # Usar timer service para manejo en tiempo real (opcional)
         try:
-            success = await timer_service.iniciar_tarea_timer(tarea)
+            success = await timer_service.iniciar_tarea_timer(tarea) if iniciar_timer else True
             if not success:
                 # Si el timer falla, la tarea ya está iniciada en memoria
                 pass
@@ -346,6 +491,35 @@ class RecoleccionService:
         except Exception as e:
             print(f"Advertencia: No se pudo actualizar la tarea en BD: {e}")
     
+    async def recuperar_tareas_en_proceso(self) -> Dict[str, int]:
+        """
+        Rearma los timers de las tareas que estaban en proceso al arrancar.
+        
+        Carga las tareas EN_PROCESO con una sola consulta (indexada por estado)
+        y las devuelve al planificador del timer con su tiempo restante; las ya
+        vencidas se completan juntas en su primer lote.
+        
+        Returns:
+            Diccionario con las tareas recuperadas y cuántas estaban vencidas
+        """
+        from ..services.persistence_service import persistence_service
+        
+        tareas = await persistence_service.obtener_tareas_por_estado(EstadoTarea.EN_PROCESO)
+        ahora = datetime.now()
+        recuperadas = 0
+        vencidas = 0
+        for tarea in tareas:
+            # Preferir la instancia en memoria si ya existe
+            tarea = self.registro_tareas.obtener(tarea.id) or tarea
+            if self.registro_tareas.grupo_de(tarea.id) != ACTIVAS:
+                self.registro_tareas.registrar(tarea, ACTIVAS)
+            if not await timer_service.reanudar_tarea_timer(tarea):
+                continue
+            recuperadas += 1
+            if tarea.fecha_inicio + timedelta(seconds=tarea.alimento.tiempo_recoleccion) <= ahora:
+                vencidas += 1
+        return {"recuperadas": recuperadas, "vencidas": vencidas}
+    
     async def verificar_y_completar_tarea_por_tiempo(self, tarea: TareaRecoleccion) -> bool:
         """
         Verifica si una tarea debe completarse automáticamente por tiempo transcurrido.
@@ -413,17 +587,15 @@ class RecoleccionService:
         tarea.alimento.marcar_como_recolectado()
         
         # Mover tarea a completadas
-        if tarea in self.tareas_activas:
-            self.tareas_activas.remove(tarea)
-        if tarea not in self.tareas_completadas:
-            self.tareas_completadas.append(tarea)
+        self.registro_tareas.registrar(tarea, COMPLETADAS)
         
         # Persistir tarea completada y actualizar disponibilidad del alimento en BD
         try:
             from ..services.persistence_service import persistence_service
-            # Guardar tarea completa (incluye estado, fechas y hormigas asignadas)
-            await persistence_service.guardar_tarea(tarea)
-            await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, False)
+            async with persistence_service.unidad_de_trabajo():
+                # Guardar tarea completa (incluye estado, fechas y hormigas asignadas)
+                await persistence_service.guardar_tarea(tarea)
+                await persistence_service.actualizar_alimento_disponibilidad(tarea.alimento.id, False)
         except Exception as e:
             print(f"Advertencia: No se pudo persistir tarea completada o actualizar alimento en BD: {e}")
     
@@ -443,6 +615,25 @@ class RecoleccionService:
         
         return await self.comunicacion_service.devolver_hormigas(hormigas, alimento_recolectado)
     
+    async def _alimentos_para_procesar(self) -> List[Alimento]:
+        """Alimentos a procesar: desde la BD y, si no hay, desde el servicio de entorno."""
+        alimentos = []
+        try:
+            from ..services.persistence_service import persistence_service
+            alimentos = await persistence_service.obtener_alimentos()
+        except Exception:
+            alimentos = []
+        if not alimentos:
+            # Fallback a servicio de entorno (si estuviera configurado)
+            try:
+                if await self.entorno_service.is_disponible():
+                    alimentos = await self.consultar_alimentos_disponibles()
+                else:
+                    alimentos = []
+            except Exception:
+                alimentos = []
+        return alimentos
+    
     async def procesar_recoleccion(self) -> List[TareaRecoleccion]:
         """
         Procesa el ciclo de recolección **hasta dejar las tareas en ejecución**.
@@ -465,21 +656,7 @@ class RecoleccionService:
         
         try:
             # 1. Consultar alimentos desde BD primero; si falla o no hay, usar servicio de entorno
-            alimentos = []
-            try:
-                from ..services.persistence_service import persistence_service
-                alimentos = await persistence_service.obtener_alimentos()
-            except Exception:
-                alimentos = []
-            if not alimentos:
-                # Fallback a servicio de entorno (si estuviera configurado)
-                try:
-                    if await self.entorno_service.is_disponible():
-                        alimentos = await self.consultar_alimentos_disponibles()
-                    else:
-                        alimentos = []
-                except Exception:
-                    alimentos = []
+            alimentos = await self._alimentos_para_procesar()
             
             for alimento in alimentos:
                 # Solo procesar alimentos marcados como disponibles
@@ -531,13 +708,120 @@ class RecoleccionService:
         
         return tareas_procesadas
     
+    async def procesar_recoleccion_concurrente(self, concurrencia: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Variante concurrente de `procesar_recoleccion` para muchos alimentos.
+        
+        El flujo es el mismo (crear tarea, solicitar hormigas, asignar e
+        iniciar), pero por etapas:
+        - Todas las tareas se crean y persisten en una sola transacción
+        - Las solicitudes de hormigas se hacen en paralelo, con a lo sumo
+          `concurrencia` en vuelo a la vez
+        - La cancelación o la asignación e inicio de cada tarea se persisten
+          en su propia transacción; el timer se arranca solo si se confirma
+        
+        La última etapa no se agrupa en una sola escritura a propósito: una
+        transacción por alimento aísla los fallos, a costa de un commit por
+        tarea. Un fallo en un alimento no detiene el resto: su transacción se
+        revierte, la tarea vuelve en memoria a su estado anterior, las
+        hormigas que se le habían obtenido se devuelven a la reina y queda
+        anotado en el informe.
+        
+        Args:
+            concurrencia: Máximo de solicitudes de hormigas simultáneas
+                (por defecto `PROCESAR_CONCURRENCIA` o 20)
+            
+        Returns:
+            Informe por alimento con "alimento_id", "tarea_id", "resultado"
+            ("iniciada", "cancelada" o "error") y "error"
+        """
+        from ..services.persistence_service import persistence_service
+        
+        limite = max(1, concurrencia or int(os.getenv("PROCESAR_CONCURRENCIA", "20")))
+        alimentos = [alimento for alimento in await self._alimentos_para_procesar() if alimento.disponible]
+        if not alimentos:
+            return []
+        
+        # 1. Crear todas las tareas
+        sello = datetime.now().strftime('%Y%m%d_%H%M%S')
+        tareas = await self.crear_tareas_recoleccion(
+            [(f"tarea_{sello}_{alimento.id}", alimento) for alimento in alimentos]
+        )
+        informe = [
+            {"alimento_id": tarea.alimento.id, "tarea_id": tarea.id, "resultado": None, "error": None}
+            for tarea in tareas
+        ]
+        
+        # 2. Solicitar hormigas con concurrencia acotada
+        semaforo = asyncio.Semaphore(limite)
+        
+        async def solicitar(tarea: TareaRecoleccion) -> List[Hormiga]:
+            async with semaforo:
+                return await self.solicitar_hormigas(tarea.alimento.cantidad_hormigas_necesarias)
+        
+        respuestas = await asyncio.gather(*(solicitar(tarea) for tarea in tareas), return_exceptions=True)
+        
+        # 3. Cancelar o asignar e iniciar cada tarea en su propia transacción
+        for tarea, hormigas, registro in zip(tareas, respuestas, informe):
+            anterior = (tarea.estado, tarea.fecha_inicio, list(tarea.hormigas_asignadas), tarea.hormigas_lote_id)
+            resultado, error = "iniciada", None
+            if isinstance(hormigas, Exception) or not hormigas:
+                resultado = "cancelada"
+                error = str(hormigas) if isinstance(hormigas, Exception) else "No se obtuvieron hormigas"
+            try:
+                async with persistence_service.unidad_de_trabajo() as unidad:
+                    try:
+                        if resultado == "cancelada":
+                            tarea.estado = EstadoTarea.CANCELADA
+                            if not await persistence_service.actualizar_estado_tarea(tarea.id, tarea.estado):
+                                raise RuntimeError("No se pudo persistir la cancelación")
+                        else:
+                            exito, error_asignacion = await self.asignar_hormigas_a_tarea(tarea, hormigas)
+                            if not exito:
+                                raise ValueError(error_asignacion)
+                            await self.iniciar_tarea_recoleccion(tarea, iniciar_timer=False)
+                            await persistence_service.guardar_evento(
+                                "tarea_iniciada_por_procesar",
+                                f"Tarea {tarea.id} creada e iniciada por /procesar",
+                                {"tarea_id": tarea.id, "alimento_id": tarea.alimento.id}
+                            )
+                    except Exception as e:
+                        unidad.cancelar()
+                        resultado, error = "error", str(e)
+                if resultado != "error" and not unidad.confirmada:
+                    resultado, error = "error", "No se pudo confirmar la transacción"
+            except Exception as e:
+                resultado, error = "error", str(e)
+            
+            if resultado == "error":
+                # La BD quedó como antes: deshacer también los cambios en memoria
+                tarea.estado, tarea.fecha_inicio, tarea.hormigas_asignadas, tarea.hormigas_lote_id = anterior
+                self.registro_tareas.actualizar(tarea)
+                if isinstance(hormigas, list) and hormigas:
+                    try:
+                        await self._devolver_hormigas_sobrantes(hormigas)
+                    except Exception as e:
+                        print(f"Error devolviendo {len(hormigas)} hormigas de la tarea {tarea.id}: {e}")
+            elif resultado == "iniciada":
+                try:
+                    await timer_service.iniciar_tarea_timer(tarea)
+                except Exception as e:
+                    print(f"Advertencia: Error con timer service: {e}")
+            registro["resultado"] = resultado
+            registro["error"] = error
+        
+        return informe
+    
     async def verificar_hormigas_muertas(self) -> None:
         """
         Verifica si hay hormigas muertas en las tareas activas y las pausa si es necesario.
         """
-        for tarea in self.tareas_activas:
-            if tarea.estado == EstadoTarea.EN_PROCESO and not tarea.todas_las_hormigas_vivas():
+        for tarea in self.registro_tareas.por_estado(EstadoTarea.EN_PROCESO):
+            if self.registro_tareas.grupo_de(tarea.id) != ACTIVAS:
+                continue
+            if not tarea.todas_las_hormigas_vivas():
                 tarea.pausar_tarea()
+                self.registro_tareas.actualizar(tarea)
                 print(f"Tarea {tarea.id} pausada por hormigas muertas")
     
     def obtener_estadisticas(self) -> dict:
@@ -0,0 +1,269 @@
+"""
+Registro en memoria de tareas de recolección indexado por ID.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from ..models.tarea_recoleccion import TareaRecoleccion
+from ..models.estado_tarea import EstadoTarea
+
+
+ACTIVAS = "activas"
+COMPLETADAS = "completadas"
+
+
+def _normalizar_id(tarea_id: str) -> str:
+    """Normaliza un ID de tarea para búsquedas tolerantes (trim + minúsculas)."""
+    return str(tarea_id).strip().lower()
+
+
+class TareaRegistry:
+    """
+    Registro de tareas en memoria con búsqueda O(1).
+
+    Cada tarea pertenece a un único grupo ("activas" o "completadas") y se
+    indexa por ID, por estado y por ID de alimento. Los grupos conservan el
+    orden de inserción para poder exponerse como listas de compatibilidad.
+
+    El índice por estado se actualiza al registrar o mover una tarea, al
+    llamar a `actualizar` y, como el estado puede cambiar directamente sobre
+    el modelo, cada vez que cambia: el registro observa el estado de las
+    tareas que contiene (`TareaRecoleccion.observar_estado`).
+    """
+
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        self._tareas: Dict[str, TareaRecoleccion] = {}
+        self._grupos: Dict[str, Dict[str, TareaRecoleccion]] = {ACTIVAS: {}, COMPLETADAS: {}}
+        self._grupo_de: Dict[str, str] = {}
+        self._por_id_normalizado: Dict[str, str] = {}
+        self._por_estado: Dict[EstadoTarea, Dict[str, TareaRecoleccion]] = {}
+        self._estado_indexado: Dict[str, EstadoTarea] = {}
+        self._por_alimento: Dict[str, Dict[str, TareaRecoleccion]] = {}
+
+    def registrar(self, tarea: TareaRecoleccion, grupo: str = ACTIVAS) -> None:
+        """
+        Registra una tarea en un grupo, moviéndola si ya estaba en otro.
+
+        Args:
+            tarea: Tarea a registrar
+            grupo: Grupo destino ("activas" o "completadas")
+        """
+        if grupo not in self._grupos:
+            raise ValueError(f"Grupo de tareas desconocido: {grupo}")
+
+        anterior = self._tareas.get(tarea.id)
+        if anterior is not None and anterior is not tarea:
+            # Otra instancia con el mismo ID: la nueva reemplaza a la anterior
+            self.eliminar(anterior.id)
+
+        grupo_actual = self._grupo_de.get(tarea.id)
+        if grupo_actual is not None and grupo_actual != grupo:
+            self._grupos[grupo_actual].pop(tarea.id, None)
+
+        self._tareas[tarea.id] = tarea
+        self._grupos[grupo][tarea.id] = tarea
+        self._grupo_de[tarea.id] = grupo
+        self._por_id_normalizado[_normalizar_id(tarea.id)] = tarea.id
+        self._por_alimento.setdefault(tarea.alimento.id, {})[tarea.id] = tarea
+        tarea.observar_estado(self.actualizar)
+        self.actualizar(tarea)
+
+    def actualizar(self, tarea: TareaRecoleccion) -> None:
+        """
+        Reindexa una tarea tras un cambio de estado.
+
+        Args:
+            tarea: Tarea cuyo estado cambió
+        """
+        if tarea.id not in self._tareas:
+            return
+        estado_previo = self._estado_indexado.get(tarea.id)
+        if estado_previo == tarea.estado:
+            return
+        if estado_previo is not None:
+            bucket = self._por_estado.get(estado_previo)
+            if bucket is not None:
+                bucket.pop(tarea.id, None)
+        self._por_estado.setdefault(tarea.estado, {})[tarea.id] = tarea
+        self._estado_indexado[tarea.id] = tarea.estado
+
+    def eliminar(self, tarea_id: str) -> Optional[TareaRecoleccion]:
+        """
+        Elimina una tarea del registro.
+
+        Args:
+            tarea_id: ID de la tarea
+
+        Returns:
+            La tarea eliminada o None si no estaba registrada
+        """
+        tarea = self._tareas.pop(tarea_id, None)
+        if tarea is None:
+            return None
+        tarea.dejar_de_observar_estado(self.actualizar)
+        grupo = self._grupo_de.pop(tarea_id, None)
+        if grupo is not None:
+            self._grupos[grupo].pop(tarea_id, None)
+        normalizado = _normalizar_id(tarea_id)
+        if self._por_id_normalizado.get(normalizado) == tarea_id:
+            del self._por_id_normalizado[normalizado]
+        estado = self._estado_indexado.pop(tarea_id, None)
+        if estado is not None:
+            self._por_estado.get(estado, {}).pop(tarea_id, None)
+        por_alimento = self._por_alimento.get(tarea.alimento.id)
+        if por_alimento is not None:
+            por_alimento.pop(tarea_id, None)
+            if not por_alimento:
+                del self._por_alimento[tarea.alimento.id]
+        return tarea
+
+    def obtener(self, tarea_id: str, ignorar_mayusculas: bool = True) -> Optional[TareaRecoleccion]:
+        """
+        Busca una tarea por ID.
+
+        Args:
+            tarea_id: ID de la tarea
+            ignorar_mayusculas: Si True, intenta también una coincidencia sin
+                distinguir mayúsculas ni espacios
+
+        Returns:
+            Tarea encontrada o None
+        """
+        tarea = self._tareas.get(tarea_id)
+        if tarea is None:
+            tarea = self._tareas.get(str(tarea_id).strip())
+        if tarea is None and ignorar_mayusculas:
+            real_id = self._por_id_normalizado.get(_normalizar_id(tarea_id))
+            if real_id is not None:
+                tarea = self._tareas.get(real_id)
+        return tarea
+
+    def por_estado(self, estado: EstadoTarea) -> List[TareaRecoleccion]:
+        """
+        Devuelve las tareas registradas con un estado dado.
+
+        Args:
+            estado: Estado a filtrar
+
+        Returns:
+            Lista de tareas en ese estado
+        """
+        return list(self._por_estado.get(estado, {}).values())
+
+    def por_alimento(self, alimento_id: str) -> List[TareaRecoleccion]:
+        """
+        Devuelve las tareas registradas para un alimento.
+
+        Args:
+            alimento_id: ID del alimento
+
+        Returns:
+            Lista de tareas de ese alimento
+        """
+        return list(self._por_alimento.get(alimento_id, {}).values())
+
+    def grupo(self, nombre: str) -> Dict[str, TareaRecoleccion]:
+        """Devuelve el diccionario ordenado (por inserción) de un grupo."""
+        return self._grupos[nombre]
+
+    def grupo_de(self, tarea_id: str) -> Optional[str]:
+        """Devuelve el grupo al que pertenece una tarea, o None."""
+        return self._grupo_de.get(tarea_id)
+
+    def reemplazar_grupo(self, nombre: str, tareas: Iterable[TareaRecoleccion]) -> None:
+        """
+        Sustituye el contenido completo de un grupo.
+
+        Args:
+            nombre: Grupo a reemplazar
+            tareas: Nuevas tareas del grupo
+        """
+        nuevas = list(tareas)
+        for tarea_id in list(self._grupos[nombre].keys()):
+            self.eliminar(tarea_id)
+        for tarea in nuevas:
+            self.registrar(tarea, nombre)
+
+    def __contains__(self, tarea_id: object) -> bool:
+        return tarea_id in self._tareas
+
+    def __len__(self) -> int:
+        return len(self._tareas)
+
+
+class TareasView:
+    """
+    Vista tipo lista sobre un grupo del registro.
+
+    Mantiene la interfaz de las antiguas listas `tareas_activas` y
+    `tareas_completadas` (append, remove, in, len, índices, iteración y
+    concatenación) delegando en el registro, de modo que las operaciones de
+    pertenencia y eliminación son O(1).
+    """
+
+    def __init__(self, registro: TareaRegistry, grupo: str):
+        """
+        Inicializa la vista.
+
+        Args:
+            registro: Registro de tareas subyacente
+            grupo: Nombre del grupo expuesto
+        """
+        self._registro = registro
+        self._grupo = grupo
+
+    @property
+    def _tareas(self) -> Dict[str, TareaRecoleccion]:
+        return self._registro.grupo(self._grupo)
+
+    def append(self, tarea: TareaRecoleccion) -> None:
+        """Agrega (o mueve) una tarea a este grupo."""
+        self._registro.registrar(tarea, self._grupo)
+
+    def extend(self, tareas: Iterable[TareaRecoleccion]) -> None:
+        """Agrega varias tareas a este grupo."""
+        for tarea in tareas:
+            self.append(tarea)
+
+    def remove(self, tarea: TareaRecoleccion) -> None:
+        """Quita una tarea de este grupo (ValueError si no está)."""
+        if tarea not in self:
+            raise ValueError(f"La tarea {getattr(tarea, 'id', tarea)} no está en {self._grupo}")
+        self._registro.eliminar(tarea.id)
+
+    def clear(self) -> None:
+        """Vacía el grupo."""
+        self._registro.reemplazar_grupo(self._grupo, [])
+
+    def __contains__(self, tarea: object) -> bool:
+        tarea_id = getattr(tarea, "id", None)
+        return tarea_id is not None and tarea_id in self._tareas
+
+    def __iter__(self) -> Iterator[TareaRecoleccion]:
+        return iter(list(self._tareas.values()))
+
+    def __len__(self) -> int:
+        return len(self._tareas)
+
+    def __bool__(self) -> bool:
+        return bool(self._tareas)
+
+    def __getitem__(self, indice: Union[int, slice]) -> Union[TareaRecoleccion, List[TareaRecoleccion]]:
+        return list(self._tareas.values())[indice]
+
+    def __add__(self, otra: Iterable[TareaRecoleccion]) -> List[TareaRecoleccion]:
+        return list(self) + list(otra)
+
+    def __radd__(self, otra: Iterable[TareaRecoleccion]) -> List[TareaRecoleccion]:
+        return list(otra) + list(self)
+
+    def __eq__(self, otra: object) -> bool:
+        if isinstance(otra, TareasView):
+            return list(self) == list(otra)
+        if isinstance(otra, list):
+            return list(self) == otra
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
@@ -3,8 +3,10 @@ Servicio de tiempo real para gestión de estados de tareas.
 """
 
 import asyncio
+import heapq
+import itertools
 from datetime import datetime, timedelta
-from typing import Dict, List, Callable, Optional
+from typing import Any, Dict, List, Callable, Optional
 from ..models.tarea_recoleccion import TareaRecoleccion, EstadoTarea
 from ..models.hormiga import EstadoHormiga
 import logging
@@ -15,18 +17,52 @@ logger = logging.getLogger(__name__)
 class TimerService:
     """
     Servicio para manejar el tiempo real de las tareas de recolección.
+    
+    Los vencimientos se guardan en un heap ordenado por instante de fin
+    (`fecha_inicio + tiempo_recoleccion`, medido con el reloj monotónico del
+    event loop). Un único planificador duerme hasta el vencimiento más próximo
+    y completa por lotes las tareas vencidas, en lugar de mantener una
+    `asyncio.Task` dormida por cada tarea.
+    
+    La cancelación marca la entrada del heap como descartada (O(1)); las
+    entradas descartadas se eliminan al llegar a la cima o al compactar.
     """
     
-    def __init__(self):
-        """Inicializa el servicio de tiempo."""
+    def __init__(self, tamano_lote: int = 500):
+        """
+        Inicializa el servicio de tiempo.
+        
+        Args:
+            tamano_lote: Máximo de tareas vencidas que se completan a la vez
+        """
         self.tareas_en_proceso: Dict[str, TareaRecoleccion] = {}
-        self.timer_tasks: Dict[str, asyncio.Task] = {}
+        # Entrada del heap de cada tarea programada: [vencimiento, secuencia, tarea_id]
+        self.timer_tasks: Dict[str, List[Any]] = {}
         self.callbacks: List[Callable] = []
+        # Versión por lotes de cada callback que la ofrece (callback -> callback_lote)
+        self.callbacks_lote: Dict[Callable, Callable] = {}
+        self.tamano_lote = max(1, tamano_lote)
         self._running = False
+        self._heap: List[List[Any]] = []
+        self._secuencia = itertools.count()
+        self._descartadas = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._planificador: Optional[asyncio.Task] = None
+        self._despertar: Optional[asyncio.Event] = None
     
-    def add_callback(self, callback: Callable):
-        """Agrega un callback para notificar cambios de estado."""
+    def add_callback(self, callback: Callable, callback_lote: Optional[Callable] = None):
+        """
+        Agrega un callback para notificar cambios de estado.
+        
+        Args:
+            callback: Corrutina `callback(tarea, evento)`
+            callback_lote: Corrutina opcional `callback_lote(tareas, evento)` que
+                recibe de una vez todas las tareas completadas en un mismo tick
+                en lugar de una llamada a `callback` por tarea
+        """
         self.callbacks.append(callback)
+        if callback_lote is not None:
+            self.callbacks_lote[callback] = callback_lote
     
     async def _notify_callbacks(self, tarea: TareaRecoleccion, evento: str):
         """Notifica a todos los callbacks registrados."""
@@ -36,6 +72,18 @@ class TimerService:
             except Exception as e:
                 logger.error(f"Error en callback: {e}")
     
+    async def _notify_callbacks_lote(self, tareas: List[TareaRecoleccion], evento: str):
+        """Notifica un lote de tareas: una llamada por callback con versión por lotes."""
+        for callback in list(self.callbacks):
+            callback_lote = self.callbacks_lote.get(callback)
+            try:
+                if callback_lote is not None:
+                    await callback_lote(tareas, evento)
+                else:
+                    await asyncio.gather(*(callback(tarea, evento) for tarea in tareas))
+            except Exception as e:
+                logger.error(f"Error en callback: {e}")
+    
     async def iniciar_tarea_timer(self, tarea: TareaRecoleccion) -> bool:
         """
         Inicia el timer para una tarea de recolección.
@@ -67,11 +115,8 @@ class TimerService:
         # Registrar tarea
         self.tareas_en_proceso[tarea.id] = tarea
         
-        # Crear timer task
-        timer_task = asyncio.create_task(
-            self._procesar_tarea_timer(tarea)
-        )
-        self.timer_tasks[tarea.id] = timer_task
+        # Programar el vencimiento en el heap
+        self._programar(tarea)
         
         # Notificar inicio
         await self._notify_callbacks(tarea, "iniciada")
@@ -79,44 +124,162 @@ class TimerService:
         logger.info(f"Timer iniciado para tarea {tarea.id} - Duración: {tarea.alimento.tiempo_recoleccion}s")
         return True
     
-    async def _procesar_tarea_timer(self, tarea: TareaRecoleccion):
+    async def reanudar_tarea_timer(self, tarea: TareaRecoleccion) -> bool:
         """
-        Procesa el timer de una tarea.
+        Vuelve a programar una tarea que ya estaba en proceso (p. ej. tras un reinicio).
+        
+        El vencimiento se calcula desde `fecha_inicio`, no desde ahora; si ya
+        pasó, la tarea se completa en el siguiente lote del planificador.
+        No se notifica "iniciada". Una tarea completada o cancelada no se
+        reanuda: volvería a completarse (callbacks, stock y eventos dos veces).
         
         Args:
-            tarea: Tarea a procesar
+            tarea: Tarea en proceso cargada de la BD
+            
+        Returns:
+            True si se programó, False si ya estaba en proceso en el timer o
+            la tarea ya terminó
+        """
+        if tarea.id in self.tareas_en_proceso:
+            return False
+        if tarea.estado in (EstadoTarea.COMPLETADA, EstadoTarea.CANCELADA):
+            return False
+        
+        tarea.estado = EstadoTarea.EN_PROCESO
+        if tarea.fecha_inicio is None:
+            tarea.fecha_inicio = datetime.now()
+        for hormiga in tarea.hormigas_asignadas:
+            hormiga.cambiar_estado(EstadoHormiga.RECOLECTANDO)
+        
+        self.tareas_en_proceso[tarea.id] = tarea
+        transcurrido = (datetime.now() - tarea.fecha_inicio).total_seconds()
+        self._programar(tarea, max(0.0, tarea.alimento.tiempo_recoleccion - transcurrido))
+        return True
+    
+    def _programar(self, tarea: TareaRecoleccion, espera: Optional[float] = None):
+        """
+        Agrega el vencimiento de una tarea al heap y despierta al planificador si es el más próximo.
+        
+        Args:
+            tarea: Tarea a programar
+            espera: Segundos hasta el vencimiento (por defecto, `tiempo_recoleccion`)
+        """
+        if espera is None:
+            espera = tarea.alimento.tiempo_recoleccion
+        loop = self._asegurar_planificador()
+        entrada = [loop.time() + espera, next(self._secuencia), tarea.id]
+        heapq.heappush(self._heap, entrada)
+        self.timer_tasks[tarea.id] = entrada
+        if self._heap[0] is entrada:
+            self._despertar.set()
+    
+    def _asegurar_planificador(self) -> asyncio.AbstractEventLoop:
+        """Arranca el planificador en el event loop actual si no está corriendo."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Cambio de loop (p. ej. entre tests): el planificador anterior ya no sirve
+            self._loop = loop
+            self._despertar = asyncio.Event()
+            self._planificador = None
+        if self._planificador is None or self._planificador.done():
+            self._planificador = loop.create_task(self._ejecutar_planificador())
+        return loop
+    
+    async def _ejecutar_planificador(self):
+        """
+        Duerme hasta el próximo vencimiento y completa por lotes las tareas vencidas.
+        
+        Un error al procesar un lote (p. ej. en un callback) se registra y el
+        planificador sigue con los siguientes vencimientos.
         """
         try:
-            # Esperar el tiempo de recolección
-            await asyncio.sleep(tarea.alimento.tiempo_recoleccion)
-            
-            # Completar la tarea
-            await self._completar_tarea(tarea)
-            
+            while True:
+                self._descartar_cima()
+                if not self._heap:
+                    return
+                
+                espera = self._heap[0][0] - self._loop.time()
+                if espera > 0:
+                    self._despertar.clear()
+                    try:
+                        await asyncio.wait_for(self._despertar.wait(), espera)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                try:
+                    lote = self._extraer_vencidas()
+                    if lote:
+                        await self._completar_lote(lote)
+                except Exception as e:
+                    logger.error(f"Error en planificador de timers: {e}")
+                    # Ceder el loop antes de seguir con el resto de vencimientos
+                    await asyncio.sleep(0)
         except asyncio.CancelledError:
-            logger.info(f"Timer cancelado para tarea {tarea.id}")
-        except Exception as e:
-            logger.error(f"Error en timer de tarea {tarea.id}: {e}")
-        finally:
-            # Limpiar
-            self.tareas_en_proceso.pop(tarea.id, None)
-            self.timer_tasks.pop(tarea.id, None)
+            logger.info("Planificador de timers detenido")
     
-    async def _completar_tarea(self, tarea: TareaRecoleccion):
+    def _descartar_cima(self):
+        """Elimina las entradas canceladas que quedaron en la cima del heap."""
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+            self._descartadas -= 1
+    
+    def _extraer_vencidas(self) -> List[TareaRecoleccion]:
+        """Saca del heap hasta `tamano_lote` tareas cuyo vencimiento ya pasó."""
+        ahora = self._loop.time()
+        lote: List[TareaRecoleccion] = []
+        while self._heap and self._heap[0][0] <= ahora and len(lote) < self.tamano_lote:
+            _, _, tarea_id = heapq.heappop(self._heap)
+            if tarea_id is None:
+                self._descartadas -= 1
+                continue
+            self.timer_tasks.pop(tarea_id, None)
+            tarea = self.tareas_en_proceso.get(tarea_id)
+            if tarea is not None:
+                lote.append(tarea)
+        return lote
+    
+    async def _completar_lote(self, tareas: List[TareaRecoleccion]):
         """
-        Completa una tarea automáticamente.
+        Completa las tareas vencidas en un mismo tick y las notifica como lote.
         
         Args:
-            tarea: Tarea a completar
+            tareas: Tareas a completar
         """
-        # Cambiar estado a COMPLETADA
+        try:
+            for tarea in tareas:
+                self._marcar_completada(tarea)
+            await self._notify_callbacks_lote(tareas, "completada")
+        except Exception as e:
+            logger.error(f"Error completando lote de {len(tareas)} tareas: {e}")
+        finally:
+            # Limpiar
+            for tarea in tareas:
+                self.tareas_en_proceso.pop(tarea.id, None)
+        
+        logger.info(f"Lote de {len(tareas)} tareas completado")
+    
+    def _marcar_completada(self, tarea: TareaRecoleccion):
+        """Pasa una tarea a COMPLETADA y sus hormigas a TRANSPORTANDO."""
         tarea.estado = EstadoTarea.COMPLETADA
         tarea.fecha_fin = datetime.now()
+        if tarea.fecha_inicio is not None:
+            # Una tarea reanudada ya vencida termina en su instante previsto, no al procesarla
+            tarea.fecha_fin = min(tarea.fecha_fin, tarea.fecha_inicio + timedelta(seconds=tarea.alimento.tiempo_recoleccion))
         tarea.alimento_recolectado = tarea.alimento.puntos_stock
         
-        # Cambiar estado de hormigas a TRANSPORTANDO
         for hormiga in tarea.hormigas_asignadas:
             hormiga.cambiar_estado(EstadoHormiga.TRANSPORTANDO)
+    
+    async def _completar_tarea(self, tarea: TareaRecoleccion):
+        """
+        Completa una tarea automáticamente.
+        
+        Args:
+            tarea: Tarea a completar
+        """
+        # Cambiar estado a COMPLETADA y hormigas a TRANSPORTANDO
+        self._marcar_completada(tarea)
         
         # Notificar finalización
         await self._notify_callbacks(tarea, "completada")
@@ -136,9 +299,12 @@ class TimerService:
         if tarea_id not in self.timer_tasks:
             return False
         
-        # Cancelar timer
-        timer_task = self.timer_tasks[tarea_id]
-        timer_task.cancel()
+        # Cancelar timer: la entrada queda descartada en el heap
+        entrada = self.timer_tasks.pop(tarea_id)
+        entrada[2] = None
+        self._descartadas += 1
+        if self._descartadas > 64 and self._descartadas * 2 > len(self._heap):
+            self._compactar()
         
         # Obtener tarea
         tarea = self.tareas_en_proceso.get(tarea_id)
@@ -162,11 +328,16 @@ class TimerService:
         
         # Limpiar
         self.tareas_en_proceso.pop(tarea_id, None)
-        self.timer_tasks.pop(tarea_id, None)
         
         logger.info(f"Tarea {tarea_id} cancelada y reseteada")
         return True
     
+    def _compactar(self):
+        """Reconstruye el heap sin las entradas canceladas."""
+        self._heap = [entrada for entrada in self._heap if entrada[2] is not None]
+        heapq.heapify(self._heap)
+        self._descartadas = 0
+    
     def get_tareas_en_proceso(self) -> List[TareaRecoleccion]:
         """Obtiene todas las tareas que están en proceso."""
         return list(self.tareas_en_proceso.values())
@@ -211,11 +382,15 @@ class TimerService:
     
     async def cleanup(self):
         """Limpia todos los timers activos."""
-        for task in self.timer_tasks.values():
-            task.cancel()
+        planificador = self._planificador
+        if planificador is not None and not planificador.done() and planificador.get_loop() is asyncio.get_running_loop():
+            planificador.cancel()
+        self._planificador = None
         
         self.tareas_en_proceso.clear()
         self.timer_tasks.clear()
+        self._heap.clear()
+        self._descartadas = 0
         
         logger.info("Timer service cleanup completado")
 
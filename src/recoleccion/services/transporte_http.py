@@ -0,0 +1,180 @@
+"""
+Transporte HTTP compartido por los clientes de las APIs de otros subsistemas.
+"""
+
+import bisect
+import importlib.util
+import os
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+# Límites superiores (ms) de los tramos del histograma de latencias
+TRAMOS_LATENCIA_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class HistogramaLatencia:
+    """Histograma de latencias por tramos fijos, con conteo de errores."""
+
+    def __init__(self, tramos_ms: Optional[List[float]] = None):
+        """
+        Inicializa el histograma.
+
+        Args:
+            tramos_ms: Límites superiores de los tramos (por defecto
+                `TRAMOS_LATENCIA_MS`); se añade un tramo final sin límite
+        """
+        self.tramos_ms = list(tramos_ms or TRAMOS_LATENCIA_MS)
+        self.conteos = [0] * (len(self.tramos_ms) + 1)
+        self.total = 0
+        self.errores = 0
+        self.suma_ms = 0.0
+        self.max_ms = 0.0
+
+    def registrar(self, segundos: float, error: bool = False) -> None:
+        """Anota la duración de una petición."""
+        ms = segundos * 1000
+        self.conteos[bisect.bisect_left(self.tramos_ms, ms)] += 1
+        self.total += 1
+        self.suma_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if error:
+            self.errores += 1
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Límite superior (ms) del tramo que contiene el percentil `p` (0-100)."""
+        if not self.total:
+            return None
+        objetivo = self.total * p / 100
+        acumulado = 0
+        for limite, conteo in zip(self.tramos_ms, self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return float(limite)
+        return round(self.max_ms, 2)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Conteos por tramo ("<=N" ms) y resumen para `/health`."""
+        tramos = {f"<={limite}": conteo for limite, conteo in zip(self.tramos_ms, self.conteos)}
+        tramos[f">{self.tramos_ms[-1]}"] = self.conteos[-1]
+        return {
+            "peticiones": self.total,
+            "errores": self.errores,
+            "media_ms": round(self.suma_ms / self.total, 2) if self.total else None,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentil(50),
+            "p95_ms": self.percentil(95),
+            "p99_ms": self.percentil(99),
+            "tramos_ms": tramos
+        }
+
+
+class TransporteHTTP:
+    """
+    Configuración, ciclo de vida y métricas de los clientes HTTP salientes.
+
+    Cada servicio de API pide aquí su `httpx.AsyncClient`, de modo que todos
+    comparten los mismos límites de pool, keep-alive y timeouts (separados
+    para conexión y lectura). Los clientes creados se cierran juntos con
+    `cerrar()` al detener la aplicación. HTTP/2 es opcional y requiere el
+    paquete `h2` (`pip install httpx[http2]`); sin él se usa HTTP/1.1.
+    """
+
+    def __init__(
+        self,
+        max_conexiones: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout_conexion: Optional[float] = None,
+        timeout_lectura: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        """
+        Inicializa el transporte.
+
+        Args:
+            max_conexiones: Conexiones simultáneas por cliente (por defecto
+                `HTTP_MAX_CONEXIONES` o 100)
+            max_keepalive: Conexiones ociosas que se mantienen abiertas (por
+                defecto `HTTP_MAX_KEEPALIVE` o 20)
+            keepalive_expiry: Segundos antes de cerrar una conexión ociosa
+                (por defecto `HTTP_KEEPALIVE_EXPIRY` o 30)
+            timeout_conexion: Timeout de conexión en segundos (por defecto
+                `HTTP_TIMEOUT_CONEXION` o 5)
+            timeout_lectura: Timeout de lectura/escritura en segundos (por
+                defecto `HTTP_TIMEOUT_LECTURA` o el que indique cada cliente)
+            http2: Negociar HTTP/2 (por defecto `HTTP_HTTP2` o false)
+        """
+        self.max_conexiones = max_conexiones or int(os.getenv("HTTP_MAX_CONEXIONES", "100"))
+        self.max_keepalive = max_keepalive or int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.timeout_conexion = timeout_conexion or float(os.getenv("HTTP_TIMEOUT_CONEXION", "5"))
+        self.timeout_lectura = timeout_lectura or (
+            float(os.getenv("HTTP_TIMEOUT_LECTURA")) if os.getenv("HTTP_TIMEOUT_LECTURA") else None
+        )
+        if http2 is None:
+            http2 = os.getenv("HTTP_HTTP2", "false").lower() == "true"
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("Advertencia: HTTP_HTTP2 activo pero falta el paquete 'h2'; se usa HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._clientes: "weakref.WeakSet[httpx.AsyncClient]" = weakref.WeakSet()
+        self.histogramas: Dict[str, HistogramaLatencia] = {}
+
+    def crear_cliente(self, nombre: str, timeout: Optional[float] = None) -> httpx.AsyncClient:
+        """
+        Crea un cliente con la configuración compartida y lo registra para cerrarlo.
+
+        Args:
+            nombre: Servicio que lo usa (para las métricas de latencia)
+            timeout: Timeout de lectura del servicio si no se fijó
+                `HTTP_TIMEOUT_LECTURA`
+
+        Returns:
+            El cliente HTTP
+        """
+        lectura = self.timeout_lectura or timeout or 30
+        cliente = httpx.AsyncClient(
+            timeout=httpx.Timeout(lectura, connect=self.timeout_conexion),
+            limits=httpx.Limits(
+                max_connections=self.max_conexiones,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            http2=self.http2
+        )
+        self._clientes.add(cliente)
+        self.histogramas.setdefault(nombre, HistogramaLatencia())
+        return cliente
+
+    def registrar_latencia(self, nombre: str, segundos: float, error: bool = False) -> None:
+        """Anota la duración de una petición de un servicio."""
+        self.histogramas.setdefault(nombre, HistogramaLatencia()).registrar(segundos, error)
+
+    async def cerrar(self) -> None:
+        """Cierra todos los clientes creados (sus conexiones keep-alive incluidas)."""
+        for cliente in list(self._clientes):
+            if not cliente.is_closed:
+                try:
+                    await cliente.aclose()
+                except Exception as e:
+                    print(f"Error cerrando cliente HTTP: {e}")
+        self._clientes = weakref.WeakSet()
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Configuración del transporte y latencias por servicio para `/health`."""
+        return {
+            "max_conexiones": self.max_conexiones,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "timeout_conexion": self.timeout_conexion,
+            "http2": self.http2,
+            "clientes_abiertos": sum(1 for cliente in self._clientes if not cliente.is_closed),
+            "latencias": {nombre: h.como_dict() for nombre, h in self.histogramas.items()}
+        }
+
+
+# Instancia global compartida por los servicios de API
+transporte_http = TransporteHTTP()
@@ -0,0 +1,89 @@
+"""
+Pruebas unitarias para el agrupador de solicitudes de hormigas.
+"""
+
+import asyncio
+
+import pytest
+
+from src.recoleccion.services.agrupador_hormigas import AgrupadorSolicitudesHormigas
+from src.recoleccion.services.mock_comunicacion_service import MockComunicacionService
+from src.recoleccion.services.mock_entorno_service import MockEntornoService
+from src.recoleccion.services.recoleccion_service import RecoleccionService
+from src.recoleccion.models.hormiga import Hormiga
+
+
+def _hormigas(cantidad: int):
+    return [Hormiga(id=f"H{i}") for i in range(cantidad)]
+
+
+class TestAgrupadorSolicitudesHormigas:
+    """Pruebas para AgrupadorSolicitudesHormigas."""
+
+    @pytest.mark.asyncio
+    async def test_solicitudes_simultaneas_van_en_un_solo_mensaje(self):
+        """Varias solicitudes dentro de la ventana se piden juntas y se reparten."""
+        pedidos = []
+
+        async def solicitar_lote(cantidad):
+            pedidos.append(cantidad)
+            return _hormigas(cantidad)
+
+        agrupador = AgrupadorSolicitudesHormigas(solicitar_lote, ventana=0.01)
+        resultados = await asyncio.gather(*(agrupador.solicitar(c) for c in [1, 2, 3]))
+
+        assert pedidos == [6]
+        assert [len(r) for r in resultados] == [1, 2, 3]
+        assert len({h.id for r in resultados for h in r}) == 6
+
+    @pytest.mark.asyncio
+    async def test_faltantes_reciben_lista_vacia_y_sobrantes_se_devuelven(self):
+        """Si la reina envía menos, se cubre lo que se pueda en orden de llegada y lo que sobra se devuelve."""
+        devueltas = []
+
+        async def solicitar_lote(cantidad):
+            return _hormigas(4)
+
+        async def devolver(hormigas):
+            devueltas.extend(hormigas)
+
+        agrupador = AgrupadorSolicitudesHormigas(solicitar_lote, devolver, ventana=0.01)
+        resultados = await asyncio.gather(*(agrupador.solicitar(c) for c in [3, 3, 1]))
+        assert [len(r) for r in resultados] == [3, 0, 1]
+        assert devueltas == []
+
+        resultados = await asyncio.gather(*(agrupador.solicitar(c) for c in [2, 3]))
+        assert [len(r) for r in resultados] == [2, 0]
+        assert [h.id for h in devueltas] == ["H2", "H3"]
+
+    @pytest.mark.asyncio
+    async def test_max_por_lote_y_errores(self):
+        """Al llenarse el lote se envía sin esperar; un error llega a todas las solicitudes."""
+        pedidos = []
+
+        async def solicitar_lote(cantidad):
+            pedidos.append(cantidad)
+            if len(pedidos) == 2:
+                raise RuntimeError("reina no disponible")
+            return _hormigas(cantidad)
+
+        agrupador = AgrupadorSolicitudesHormigas(solicitar_lote, ventana=10, max_por_lote=2)
+        primeras = await asyncio.wait_for(asyncio.gather(agrupador.solicitar(1), agrupador.solicitar(1)), 1)
+        assert [len(r) for r in primeras] == [1, 1]
+
+        resultados = await asyncio.wait_for(
+            asyncio.gather(agrupador.solicitar(1), agrupador.solicitar(1), return_exceptions=True), 1
+        )
+        assert all(isinstance(r, RuntimeError) for r in resultados)
+        assert agrupador.lotes_enviados == 2
+
+    @pytest.mark.asyncio
+    async def test_recoleccion_service_agrupa_solicitudes_concurrentes(self):
+        """Muchas tareas pidiendo hormigas a la vez generan un único mensaje a la reina."""
+        comunicacion = MockComunicacionService()
+        servicio = RecoleccionService(MockEntornoService(), comunicacion)
+
+        resultados = await asyncio.gather(*(servicio.solicitar_hormigas(2) for _ in range(10)))
+
+        assert all(len(r) == 2 for r in resultados)
+        assert comunicacion.contador_mensajes == 1
@@ -463,3 +463,41 @@ class TestRecoleccionController:
             assert response.status_code == 200
             data = response.json()
             assert data["hormigas_lote_id"] == "LOTE_001"
+
+    def test_status_no_reprograma_tarea_ya_terminada_en_memoria(
+        self, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo, hormiga_ejemplo
+    ):
+        """Si la BD aún dice en_proceso pero en memoria ya terminó, no se vuelve a programar."""
+        from src.recoleccion.services.recoleccion_service import RecoleccionService
+        from datetime import datetime, timedelta
+        
+        # Arrange
+        inicio = datetime.now() - timedelta(seconds=600)
+        en_memoria = TareaRecoleccion(id="tarea_001", alimento=alimento_ejemplo)
+        en_memoria.hormigas_asignadas = [hormiga_ejemplo] * 3
+        en_memoria.fecha_inicio = inicio
+        en_memoria.estado = EstadoTarea.COMPLETADA
+        recoleccion_service = RecoleccionService(mock_entorno_service, mock_comunicacion_service)
+        recoleccion_service.tareas_completadas.append(en_memoria)
+        
+        en_bd = TareaRecoleccion(id="tarea_001", alimento=alimento_ejemplo)
+        en_bd.hormigas_asignadas = [hormiga_ejemplo] * 3
+        en_bd.fecha_inicio = inicio
+        en_bd.estado = EstadoTarea.EN_PROCESO
+        
+        app = create_app(mock_entorno_service, mock_comunicacion_service)
+        app.state.recoleccion_service = recoleccion_service
+        
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence, \
+             patch('src.recoleccion.services.timer_service.timer_service.reanudar_tarea_timer', new_callable=AsyncMock) as reanudar:
+            mock_persistence.obtener_info_bd = AsyncMock(return_value={})
+            mock_persistence.obtener_tarea_por_id = AsyncMock(return_value=en_bd)
+            
+            # Act
+            response = TestClient(app).get("/tareas/tarea_001/status")
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["programada_para_completar"] is False
+        reanudar.assert_not_awaited()
+        assert en_memoria.estado == EstadoTarea.COMPLETADA
@@ -13,6 +13,7 @@ from src.recoleccion.models.alimento import Alimento
 from src.recoleccion.models.hormiga import Hormiga
 from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion
 from src.recoleccion.models.estado_tarea import EstadoTarea
+from src.recoleccion.services.proyeccion_estado import ProyeccionEstadoTareas
 
 
 class TestAPICoberturaExtendida:
@@ -381,6 +382,7 @@ class TestAPICoberturaExtendida:
         
         with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
             mock_persistence.obtener_tareas = AsyncMock(return_value=[tarea])
+            mock_persistence.obtener_tarea_por_id = AsyncMock(return_value=tarea)
             
             app = create_app(mock_entorno_service, mock_comunicacion_service)
             
@@ -416,6 +418,9 @@ class TestAPICoberturaExtendida:
                 "database": "Hormiguero"
             })
             mock_persistence.obtener_tareas = AsyncMock(return_value=[tarea])
+            proyeccion = ProyeccionEstadoTareas()
+            proyeccion.cargar([tarea])
+            mock_persistence.consultar_status_tareas = AsyncMock(side_effect=proyeccion.consultar)
             
             app = create_app(mock_entorno_service, mock_comunicacion_service)
             app.state.recoleccion_service = MagicMock()
@@ -429,6 +434,146 @@ class TestAPICoberturaExtendida:
                 data = response.json()
                 assert "tareas" in data
     
+    def test_obtener_status_etag_y_paginacion(self, client, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo):
+        """El status filtra y pagina, y responde 304 mientras la página no cambie."""
+        tareas = [TareaRecoleccion(id=f"T{i}", alimento=alimento_ejemplo) for i in range(1, 4)]
+        tareas[2].estado = EstadoTarea.EN_PROCESO
+        proyeccion = ProyeccionEstadoTareas()
+        proyeccion.cargar(tareas)
+        
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
+            mock_persistence.obtener_info_bd = AsyncMock(return_value={"engine": "sqlite"})
+            mock_persistence.consultar_status_tareas = AsyncMock(side_effect=proyeccion.consultar)
+            app = create_app(mock_entorno_service, mock_comunicacion_service)
+            
+            with TestClient(app) as test_client:
+                response = test_client.get("/tareas/status", params={"estado": "pendiente", "limit": 1})
+                assert response.status_code == 200
+                data = response.json()
+                assert [t["tarea_id"] for t in data["tareas"]] == ["T1"]
+                assert data["total_tareas"] == 2
+                etag = response.headers["ETag"]
+                
+                response = test_client.get(
+                    "/tareas/status", params={"estado": "pendiente", "limit": 1}, headers={"If-None-Match": etag}
+                )
+                assert response.status_code == 304
+                
+                # Un cambio fuera de la página no invalida el ETag; uno dentro sí
+                tareas[2].estado = EstadoTarea.COMPLETADA
+                proyeccion.actualizar(tareas[2])
+                response = test_client.get(
+                    "/tareas/status", params={"estado": "pendiente", "limit": 1}, headers={"If-None-Match": etag}
+                )
+                assert response.status_code == 304
+                proyeccion.actualizar_estado("T1", "en_proceso")
+                response = test_client.get(
+                    "/tareas/status", params={"estado": "pendiente", "limit": 1}, headers={"If-None-Match": etag}
+                )
+                assert response.status_code == 200
+                assert [t["tarea_id"] for t in response.json()["tareas"]] == ["T2"]
+    
+    def test_obtener_cambios_tareas(self, client, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo):
+        """El feed de cambios devuelve solo las tareas modificadas tras el cursor."""
+        tareas = [TareaRecoleccion(id=f"T{i}", alimento=alimento_ejemplo) for i in range(1, 4)]
+        proyeccion = ProyeccionEstadoTareas()
+        proyeccion.cargar(tareas)
+        
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
+            mock_persistence.consultar_cambios_tareas = AsyncMock(
+                side_effect=lambda desde=None, limite=None: proyeccion.cambios_desde(desde, limite=limite)
+            )
+            app = create_app(mock_entorno_service, mock_comunicacion_service)
+            
+            with TestClient(app) as test_client:
+                data = test_client.get("/tareas/cambios").json()
+                assert len(data["tareas"]) == 3
+                
+                proyeccion.actualizar_estado("T2", "en_proceso")
+                response = test_client.get("/tareas/cambios", params={"desde": data["cursor"]})
+                assert response.status_code == 200
+                assert [t["tarea_id"] for t in response.json()["tareas"]] == ["T2"]
+    
+    def test_crear_tareas_lote(self, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo):
+        """El lote resuelve los alimentos en una consulta y devuelve el resultado por elemento."""
+        agotado = Alimento(
+            id="A2", nombre="Hoja", cantidad_hormigas_necesarias=1,
+            puntos_stock=5, tiempo_recoleccion=30, disponible=False
+        )
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
+            mock_persistence.obtener_alimentos_por_ids = AsyncMock(return_value={"A1": alimento_ejemplo, "A2": agotado})
+            mock_persistence.obtener_ids_tareas_existentes = AsyncMock(return_value=set())
+            mock_persistence.guardar_tareas_lote = AsyncMock(return_value=True)
+            app = create_app(mock_entorno_service, mock_comunicacion_service)
+            
+            response = TestClient(app).post("/tareas/lote", json={"tareas": [
+                {"tarea_id": "TL1", "alimento_id": "A1"},
+                {"tarea_id": "TL2", "alimento_id": "A1"},
+                {"tarea_id": "TL1", "alimento_id": "A1"},
+                {"tarea_id": "TL3", "alimento_id": "A9"},
+                {"tarea_id": "TL4", "alimento_id": "A2"}
+            ]})
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert (data["total"], data["creadas"], data["errores"]) == (5, 2, 3)
+            assert [r["creada"] for r in data["resultados"]] == [True, True, False, False, False]
+            mock_persistence.obtener_alimentos_por_ids.assert_awaited_once()
+            mock_entorno_service.is_disponible.assert_not_called()
+            guardadas = mock_persistence.guardar_tareas_lote.await_args.args[0]
+            assert [t.id for t in guardadas] == ["TL1", "TL2"]
+    
+    def test_crear_tareas_lote_no_sobrescribe_tareas_de_la_bd(self, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo):
+        """Una tarea que solo existe en la BD (tras un reinicio) se informa como existente."""
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
+            mock_persistence.obtener_alimentos_por_ids = AsyncMock(return_value={"A1": alimento_ejemplo})
+            mock_persistence.obtener_ids_tareas_existentes = AsyncMock(return_value={"TL1"})
+            mock_persistence.guardar_tareas_lote = AsyncMock(return_value=True)
+            app = create_app(mock_entorno_service, mock_comunicacion_service)
+            
+            response = TestClient(app).post("/tareas/lote", json={"tareas": [
+                {"tarea_id": "TL1", "alimento_id": "A1"},
+                {"tarea_id": "TL2", "alimento_id": "A1"}
+            ]})
+            
+            assert response.status_code == 200
+            resultados = response.json()["resultados"]
+            assert [r["creada"] for r in resultados] == [False, True]
+            assert resultados[0]["error"] == "La tarea 'TL1' ya existe"
+            mock_persistence.obtener_ids_tareas_existentes.assert_awaited_once_with(["TL1", "TL2"])
+            guardadas = mock_persistence.guardar_tareas_lote.await_args.args[0]
+            assert [t.id for t in guardadas] == ["TL2"]
+    
+    def test_crear_tareas_lote_revertido_no_crea_ninguna(self, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo):
+        """Si la transacción del lote se revierte, ningún elemento figura como creado ni queda en memoria."""
+        from src.recoleccion.services.recoleccion_service import RecoleccionService
+        
+        recoleccion_service = RecoleccionService(mock_entorno_service, mock_comunicacion_service)
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence, \
+             patch('src.recoleccion.api.recoleccion_controller.RecoleccionService', return_value=recoleccion_service):
+            mock_persistence.obtener_alimentos_por_ids = AsyncMock(return_value={"A1": alimento_ejemplo})
+            mock_persistence.obtener_ids_tareas_existentes = AsyncMock(return_value=set())
+            mock_persistence.guardar_tareas_lote = AsyncMock(return_value=False)
+            app = create_app(mock_entorno_service, mock_comunicacion_service)
+            
+            response = TestClient(app).post("/tareas/lote", json={"tareas": [
+                {"tarea_id": "TL1", "alimento_id": "A1"},
+                {"tarea_id": "TL2", "alimento_id": "A9"}
+            ]})
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert (data["total"], data["creadas"], data["errores"]) == (2, 0, 2)
+            assert [r["creada"] for r in data["resultados"]] == [False, False]
+            assert "No se pudo guardar el lote" in data["resultados"][0]["error"]
+            assert data["resultados"][1]["error"] == "Alimento no encontrado"
+            assert recoleccion_service.registro_tareas.obtener("TL1") is None
+    
+    def test_crear_tareas_lote_demasiado_grande(self, client):
+        """Un lote por encima del máximo se rechaza sin tocar la BD."""
+        response = client.post("/tareas/lote", json={"tareas": [{"alimento_id": "A1"}] * 1001})
+        assert response.status_code == 400
+    
     def test_obtener_status_tarea_case_insensitive(self, client, mock_entorno_service, mock_comunicacion_service, alimento_ejemplo):
         """Cubre líneas 892-893, 899-900: búsqueda case-insensitive."""
         from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion
@@ -438,6 +583,7 @@ class TestAPICoberturaExtendida:
         with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
             mock_persistence.obtener_info_bd = AsyncMock(return_value={"engine": "SQL Server"})
             mock_persistence.obtener_tareas = AsyncMock(return_value=[tarea])
+            mock_persistence.obtener_tarea_por_id = AsyncMock(return_value=tarea)
             
             app = create_app(mock_entorno_service, mock_comunicacion_service)
             app.state.recoleccion_service = MagicMock()
@@ -464,6 +610,7 @@ class TestAPICoberturaExtendida:
         
         with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
             mock_persistence.obtener_tareas = AsyncMock(return_value=[tarea])
+            mock_persistence.obtener_tarea_por_id = AsyncMock(return_value=tarea)
             
             app = create_app(mock_entorno_service, mock_comunicacion_service)
             app.state.recoleccion_service = MagicMock()
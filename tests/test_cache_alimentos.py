@@ -0,0 +1,88 @@
+"""
+Tests de la caché de alimentos (TTL, LRU y métricas).
+"""
+
+from src.recoleccion.services import cache_alimentos as modulo
+from src.recoleccion.services.cache_alimentos import CacheAlimentos
+from src.recoleccion.models.alimento import Alimento
+
+
+def _alimento(alimento_id: str) -> Alimento:
+    return Alimento(id=alimento_id, nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+
+
+def test_acierto_devuelve_copia():
+    cache = CacheAlimentos(ttl=30, capacidad=10)
+    cache.guardar(_alimento("A1"))
+
+    alimento = cache.obtener("A1")
+    alimento.marcar_como_recolectado()
+
+    assert cache.obtener("A1").disponible is True
+    assert cache.obtener("A2") is None
+    metricas = cache.obtener_metricas()
+    assert (metricas["aciertos"], metricas["fallos"]) == (2, 1)
+
+
+def test_caduca_con_el_ttl(monkeypatch):
+    ahora = [100.0]
+    monkeypatch.setattr(modulo.time, "monotonic", lambda: ahora[0])
+    cache = CacheAlimentos(ttl=5, capacidad=10)
+    cache.guardar_todos([_alimento("A1"), _alimento("A2")])
+
+    assert [a.id for a in cache.obtener_todos()] == ["A1", "A2"]
+    ahora[0] += 5
+    assert cache.obtener_todos() is None
+    assert cache.obtener("A1") is None
+
+
+def test_desaloja_el_menos_usado():
+    cache = CacheAlimentos(ttl=30, capacidad=2)
+    cache.guardar(_alimento("A1"))
+    cache.guardar(_alimento("A2"))
+    cache.obtener("A1")
+    cache.guardar(_alimento("A3"))
+
+    encontrados, faltantes = cache.obtener_varios(["A1", "A2", "A3"])
+    assert sorted(encontrados) == ["A1", "A3"]
+    assert faltantes == ["A2"]
+    assert cache.obtener_metricas()["desalojos"] == 1
+
+
+def test_invalidar_olvida_el_alimento_y_el_listado():
+    cache = CacheAlimentos(ttl=30, capacidad=10)
+    cache.guardar_todos([_alimento("A1"), _alimento("A2")])
+
+    cache.invalidar(["A1"])
+
+    assert cache.obtener_todos() is None
+    assert cache.obtener("A1") is None
+    assert cache.obtener("A2") is not None
+
+
+def test_ttl_cero_desactiva_la_cache():
+    cache = CacheAlimentos(ttl=0, capacidad=10)
+    cache.guardar(_alimento("A1"))
+
+    assert cache.activa is False
+    assert cache.obtener("A1") is None
+
+
+def test_no_guarda_lecturas_anteriores_a_una_invalidacion():
+    cache = CacheAlimentos(ttl=30, capacidad=10)
+    generacion = cache.generacion()
+
+    cache.invalidar(["A1"])
+    cache.guardar(_alimento("A1"), generacion)
+    cache.guardar(_alimento("A2"), generacion)
+    cache.guardar_todos([_alimento("A3")], generacion)
+
+    assert cache.obtener("A1") is None
+    assert cache.obtener("A2") is not None
+    assert cache.obtener("A3") is not None
+    assert cache.obtener_todos() is None
+
+    generacion = cache.generacion()
+    cache.invalidar()
+    cache.guardar(_alimento("A2"), generacion)
+    assert cache.obtener("A2") is None
@@ -2,6 +2,8 @@
 Tests unitarios para ComunicacionAPIService para subir cobertura >80%.
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock
 
@@ -216,6 +218,91 @@ async def test_consultar_respuesta_hormigas_fallback_mensaje_procesado():
     assert hormigas[0].id == "H1"
 
 
+@pytest.mark.asyncio
+async def test_consultar_respuesta_hormigas_pendiente_distingue_sin_respuesta():
+    """Sin respuesta ni mensaje procesado se informa None (pendiente), no lista vacía."""
+    service = ComunicacionAPIService(base_url="http://fake")
+    service._make_request = AsyncMock(return_value=None)  # type: ignore[assignment]
+    service.consultar_mensaje = AsyncMock(return_value=None)  # type: ignore[assignment]
+
+    assert await service.consultar_respuesta_hormigas_pendiente("msg1") is None
+    assert await service.consultar_respuesta_hormigas("msg1") == []
+
+    service._make_request = AsyncMock(return_value={"hormigas": []})  # type: ignore[assignment]
+    assert await service.consultar_respuesta_hormigas_pendiente("msg1") == []
+
+
+@pytest.mark.asyncio
+async def test_consultar_respuesta_hormigas_pendiente_sin_conexion_no_queda_pendiente():
+    """Con el servicio caído no se informa "pendiente": el sondeo termina enseguida."""
+    import httpx
+    from src.recoleccion.services.correlador_respuestas import CorreladorRespuestas
+
+    service = ComunicacionAPIService(base_url="http://fake")
+    llamadas = []
+
+    async def fake_request(method, url, **kwargs):
+        llamadas.append(url)
+        raise httpx.ConnectError("sin conexión")
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    with pytest.raises(ConnectionError):
+        await service.consultar_respuesta_hormigas_pendiente("msg1")
+    assert len(llamadas) == 1
+    assert await service.consultar_respuesta_hormigas("msg1") == []
+
+    correlador = CorreladorRespuestas(intervalo_inicial=0.001, timeout=5)
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(
+            correlador.esperar("msg1", service.consultar_respuesta_hormigas_pendiente), 1
+        )
+
+
+@pytest.mark.asyncio
+async def test_solicitar_hormigas_recuerda_fallback_a_mensajes():
+    """Tras un 404 en /ants/request las siguientes solicitudes van directo a /messages."""
+    service = ComunicacionAPIService(base_url="http://fake")
+    urls = []
+
+    async def fake_request(method, url, **kwargs):
+        urls.append(url.replace("http://fake", ""))
+        if urls[-1] == "/messages":
+            return FakeResponse(201, {"id": f"msg{len(urls)}"})
+        return FakeResponse(404, {})
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    await service.solicitar_hormigas(3)
+    await service.solicitar_hormigas(3)
+    assert urls == ["/ants/request", "/messages", "/messages"]
+
+
+@pytest.mark.asyncio
+async def test_respuesta_hormigas_usa_mensajes_cuando_es_la_ruta_que_responde():
+    """Si la respuesta llegó por /messages, los sondeos siguientes no pasan por /ants/response."""
+    service = ComunicacionAPIService(base_url="http://fake")
+    urls = []
+    mensaje = {
+        "id": "msg1",
+        "tipo": "confirmacion",
+        "contenido": {"hormigas": [{"id": "H1"}]},
+        "procesado": True,
+    }
+
+    async def fake_request(method, url, **kwargs):
+        urls.append(url.replace("http://fake", ""))
+        if urls[-1].startswith("/messages/"):
+            return FakeResponse(200, mensaje)
+        return FakeResponse(404, {})
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    assert len(await service.consultar_respuesta_hormigas("msg1")) == 1
+    assert len(await service.consultar_respuesta_hormigas("msg1")) == 1
+    assert urls == ["/ants/response/msg1", "/messages/msg1", "/messages/msg1"]
+
+
 @pytest.mark.asyncio
 async def test_devolver_hormigas_usa_endpoint_especifico():
     """devolver_hormigas debe usar /ants/return y devolver id de la respuesta."""
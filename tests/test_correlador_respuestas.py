@@ -0,0 +1,80 @@
+"""
+Pruebas unitarias para el correlador de solicitudes y respuestas.
+"""
+
+import asyncio
+
+import pytest
+
+from src.recoleccion.services.correlador_respuestas import CorreladorRespuestas
+from src.recoleccion.services.mock_comunicacion_service import MockComunicacionService
+from src.recoleccion.services.recoleccion_service import RecoleccionService
+from src.recoleccion.services.mock_entorno_service import MockEntornoService
+from src.recoleccion.models.hormiga import Hormiga
+
+
+class TestCorreladorRespuestas:
+    """Pruebas para CorreladorRespuestas."""
+
+    @pytest.mark.asyncio
+    async def test_sondeo_con_backoff_hasta_la_respuesta(self):
+        """La espera termina en cuanto el sondeo encuentra la respuesta."""
+        correlador = CorreladorRespuestas(intervalo_inicial=0.001, intervalo_maximo=0.004, timeout=1)
+        consultas = []
+
+        async def consultar(mensaje_id):
+            consultas.append(mensaje_id)
+            return ["H1"] if len(consultas) == 4 else None
+
+        assert await correlador.esperar("M1", consultar) == ["H1"]
+        assert len(consultas) == 4
+        assert correlador.pendientes == {}
+
+    @pytest.mark.asyncio
+    async def test_callback_resuelve_antes_que_el_sondeo(self):
+        """`resolver` despierta la espera sin aguardar al siguiente sondeo."""
+        correlador = CorreladorRespuestas(intervalo_inicial=10, timeout=5)
+
+        async def consultar(mensaje_id):
+            return None
+
+        espera = asyncio.ensure_future(correlador.esperar("M1", consultar))
+        await asyncio.sleep(0)
+        assert correlador.resolver("M1", ["H1"]) is True
+
+        assert await asyncio.wait_for(espera, 1) == ["H1"]
+        assert correlador.resolver("M1", ["H2"]) is False
+
+    @pytest.mark.asyncio
+    async def test_timeout_cancelacion_y_errores(self):
+        """Timeout y cancelación devuelven None; un error de la consulta se propaga."""
+        correlador = CorreladorRespuestas(intervalo_inicial=0.001, timeout=0.02)
+
+        async def pendiente(mensaje_id):
+            return None
+
+        assert await correlador.esperar("M1", pendiente) is None
+
+        espera = asyncio.ensure_future(correlador.esperar("M2", pendiente, timeout=5))
+        await asyncio.sleep(0)
+        assert correlador.cancelar("M2") is True
+        assert await espera is None
+
+        async def fallar(mensaje_id):
+            raise RuntimeError("reina caída")
+
+        with pytest.raises(RuntimeError):
+            await correlador.esperar("M3", fallar)
+
+    @pytest.mark.asyncio
+    async def test_solicitar_hormigas_no_espera_tiempo_fijo(self):
+        """Con una respuesta inmediata, solicitar_hormigas no añade latencia fija."""
+        comunicacion = MockComunicacionService()
+        servicio = RecoleccionService(MockEntornoService(), comunicacion)
+        loop = asyncio.get_running_loop()
+
+        inicio = loop.time()
+        hormigas = await servicio.solicitar_hormigas(3)
+
+        assert len(hormigas) == 3 and all(isinstance(h, Hormiga) for h in hormigas)
+        assert loop.time() - inicio < 0.05
@@ -0,0 +1,364 @@
+"""
+Pruebas de las consultas filtradas de tareas en DatabaseManager (SQLite).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.recoleccion.database.database_manager import CacheLRU, DatabaseManager, SqlServerDatabaseManager
+from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion
+from src.recoleccion.models.alimento import Alimento
+from src.recoleccion.models.hormiga import Hormiga
+from src.recoleccion.models.estado_tarea import EstadoTarea
+from src.recoleccion.models.estado_hormiga import EstadoHormiga
+
+
+class TestConsultasTareas:
+    """Pruebas para obtener_tarea_por_id, obtener_tareas_por_estado y paginación."""
+
+    @pytest.fixture
+    def db(self):
+        """Base de datos temporal con cuatro tareas en distintos estados."""
+        db_path = "test_consultas_tareas.db"
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        db = DatabaseManager(db_path)
+
+        alimento = Alimento(
+            id="A1",
+            nombre="Fruta",
+            cantidad_hormigas_necesarias=1,
+            puntos_stock=10,
+            tiempo_recoleccion=60
+        )
+        db.guardar_alimento(alimento)
+        estados = [EstadoTarea.PENDIENTE, EstadoTarea.EN_PROCESO, EstadoTarea.COMPLETADA, EstadoTarea.PENDIENTE]
+        for i, estado in enumerate(estados, start=1):
+            tarea = TareaRecoleccion(id=f"T{i}", alimento=alimento, estado=estado)
+            tarea.agregar_hormiga(Hormiga(id=f"H{i}", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5))
+            db.guardar_tarea(tarea)
+
+        yield db
+
+        db.cerrar()
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+    def test_obtener_tarea_por_id(self, db):
+        """La búsqueda por clave devuelve la tarea hidratada o None."""
+        tarea = db.obtener_tarea_por_id("T2")
+
+        assert tarea is not None
+        assert tarea.estado == EstadoTarea.EN_PROCESO
+        assert tarea.alimento.id == "A1"
+        assert db.obtener_tarea_por_id("T99") is None
+
+    def test_obtener_tarea_por_id_ignorando_mayusculas(self, db):
+        """Sin coincidencia exacta solo se acepta otra capitalización si se pide."""
+        assert db.obtener_tarea_por_id("t3") is None
+        assert db.obtener_tarea_por_id(" t3 ", ignorar_mayusculas=True).id == "T3"
+
+    def test_obtener_tareas_por_estado(self, db):
+        """El filtro por estado acepta un estado o una lista de estados."""
+        pendientes = db.obtener_tareas_por_estado(EstadoTarea.PENDIENTE)
+        activas = db.obtener_tareas_por_estado([EstadoTarea.PENDIENTE, EstadoTarea.EN_PROCESO])
+
+        assert sorted(t.id for t in pendientes) == ["T1", "T4"]
+        assert sorted(t.id for t in activas) == ["T1", "T2", "T4"]
+        assert db.obtener_tareas_por_estado([]) == []
+
+    def test_obtener_tareas_paginado(self, db):
+        """Al paginar las tareas se ordenan por ID."""
+        primera = db.obtener_tareas(limit=2)
+        segunda = db.obtener_tareas(limit=2, offset=2)
+
+        assert [t.id for t in primera] == ["T1", "T2"]
+        assert [t.id for t in segunda] == ["T3", "T4"]
+        assert [t.id for t in db.obtener_tareas(offset=3)] == ["T4"]
+        assert [t.id for t in db.obtener_tareas(limit=1, estado=EstadoTarea.PENDIENTE, offset=1)] == ["T4"]
+
+    def test_consultas_desde_otros_hilos(self, db):
+        """Cada hilo usa su propia conexión y ve los datos confirmados."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            tareas = list(executor.map(db.obtener_tarea_por_id, ["T1", "T2", "T3", "T4"]))
+
+        assert [t.id for t in tareas] == ["T1", "T2", "T3", "T4"]
+        assert db.connection is db.connection
+
+    def test_guardar_eventos_en_lote(self, db):
+        """Los eventos de un lote se insertan en una sola transacción."""
+        assert db.guardar_eventos([("a", "evento a", None), ("b", "evento b", {"x": 1})]) is True
+
+        tipos = [e["tipo_evento"] for e in db.obtener_eventos(10)]
+        assert "a" in tipos and "b" in tipos
+
+    def test_transaccion_confirma_todo_junto(self, db):
+        """Dentro de una transacción las escrituras se confirman con un único commit."""
+        db.iniciar_transaccion()
+        assert db.crear_lote_hormigas("L1", "T1", 2, 2) is True
+        assert db.actualizar_estado_tarea("T1", "en_proceso") is True
+        # Otra conexión aún no ve los cambios
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(db.obtener_tarea_por_id, "T1").result().estado == EstadoTarea.PENDIENTE
+        assert db.confirmar_transaccion() is True
+
+        assert db.obtener_tarea_por_id("T1").estado == EstadoTarea.EN_PROCESO
+        assert "no encontrado" not in (db.verificar_lote_disponible("L1", 2)[1] or "")
+
+    def test_transaccion_con_paso_fallido_se_revierte(self, db):
+        """Si un paso falla, confirmar revierte también los pasos anteriores."""
+        db.iniciar_transaccion()
+        assert db.actualizar_estado_tarea("T1", "en_proceso") is True
+        db._revertir()  # lo que hace un método de escritura al fallar
+        assert db.confirmar_transaccion() is False
+
+        assert db.obtener_tarea_por_id("T1").estado == EstadoTarea.PENDIENTE
+
+        db.iniciar_transaccion()
+        db.actualizar_estado_tarea("T1", "en_proceso")
+        db.revertir_transaccion()
+        assert db.obtener_tarea_por_id("T1").estado == EstadoTarea.PENDIENTE
+
+    def test_completar_tareas_en_lote(self, db):
+        """El cierre de un lote actualiza tareas y alimentos y guarda las tareas nuevas."""
+        alimento = db.obtener_tarea_por_id("T1").alimento
+        tareas = [db.obtener_tarea_por_id("T1"), db.obtener_tarea_por_id("T2")]
+        nueva = TareaRecoleccion(id="T5", alimento=alimento, estado=EstadoTarea.EN_PROCESO)
+        nueva.agregar_hormiga(Hormiga(id="H5", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5))
+        tareas.append(nueva)
+        for tarea in tareas:
+            tarea.estado = EstadoTarea.COMPLETADA
+            tarea.alimento_recolectado = 10
+
+        assert db.completar_tareas(tareas) is True
+
+        completadas = {t.id: t for t in db.obtener_tareas_por_estado(EstadoTarea.COMPLETADA)}
+        assert sorted(completadas) == ["T1", "T2", "T3", "T5"]
+        assert completadas["T1"].alimento_recolectado == 10
+        assert db.obtener_alimento_por_id("A1")["disponible"] in (0, False)
+
+    def test_obtener_alimentos_por_ids(self, db):
+        """Varios alimentos se resuelven de una vez; los inexistentes se omiten."""
+        db.guardar_alimento(Alimento(
+            id="A2",
+            nombre="Hoja",
+            cantidad_hormigas_necesarias=2,
+            puntos_stock=5,
+            tiempo_recoleccion=30,
+            disponible=False
+        ))
+
+        filas = db.obtener_alimentos_por_ids(["A1", "A2", "A9", "A1"])
+
+        assert sorted(filas) == ["A1", "A2"]
+        assert filas["A2"]["nombre"] == "Hoja"
+        assert db.obtener_alimentos_por_ids([]) == {}
+
+    def test_guardar_hormigas_en_lote_grande(self, db):
+        hormigas = [Hormiga(id=f"HL{i}", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5) for i in range(600)]
+        assert db.crear_lote_hormigas("L1", "T1", 600, 600) is True
+
+        assert db.guardar_hormigas_en_lote("L1", hormigas + hormigas[:10]) is True
+
+        assert len(db.obtener_hormigas_por_lote("L1")) >= 600
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM hormigas WHERE id LIKE 'HL%'")
+        assert cursor.fetchone()[0] == 600
+        cursor.execute("SELECT COUNT(DISTINCT hormiga_id) FROM asignaciones_hormiga_tarea WHERE lote_id = 'L1'")
+        assert cursor.fetchone()[0] == 600
+
+    def test_guardar_tarea_con_muchas_hormigas(self, db):
+        tarea = db.obtener_tarea_por_id("T2")
+        for i in range(500):
+            tarea.agregar_hormiga(Hormiga(id=f"HT{i}", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5))
+
+        assert db.guardar_tarea(tarea) is True
+
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM asignaciones_hormiga_tarea WHERE tarea_id = 'T2'")
+        assert cursor.fetchone()[0] == len(tarea.hormigas_asignadas)
+
+    def test_obtener_ids_tareas_existentes(self, db):
+        assert db.obtener_ids_tareas_existentes(["T1", "T9", "T3", "T1"]) == {"T1", "T3"}
+        assert db.obtener_ids_tareas_existentes([]) == set()
+
+    def test_actualizar_cambios_tarea(self, db):
+        tarea = db.obtener_tarea_por_id("T1")
+        tarea.hormigas_asignadas = [Hormiga(id="H1", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5)]
+        instantanea = tarea.instantanea()
+        tarea.estado = EstadoTarea.EN_PROCESO
+        tarea.hormigas_asignadas = [Hormiga(id="H9", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5)]
+
+        assert db.actualizar_cambios_tarea(tarea, tarea.cambios_desde(instantanea)) is True
+
+        assert db.obtener_tarea_por_id("T1").estado == EstadoTarea.EN_PROCESO
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT hormiga_id FROM asignaciones_hormiga_tarea WHERE tarea_id = 'T1'")
+        assert [fila[0] for fila in cursor.fetchall()] == ["H9"]
+        cursor.execute("SELECT hormigas_asignadas FROM tareas WHERE id = 'T1'")
+        assert cursor.fetchone()[0] == 1
+
+    def test_actualizar_cambios_tarea_cambiada_por_otro_proceso(self, db):
+        tarea = db.obtener_tarea_por_id("T1")
+        instantanea = tarea.instantanea()
+        # Otro proceso completa la tarea después de tomar la instantánea
+        db.actualizar_estado_tarea("T1", EstadoTarea.COMPLETADA.value)
+        tarea.alimento_recolectado = 3
+
+        assert db.actualizar_cambios_tarea(tarea, tarea.cambios_desde(instantanea)) is True
+
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT estado, alimento_recolectado FROM tareas WHERE id = 'T1'")
+        assert tuple(cursor.fetchone()) == (EstadoTarea.PENDIENTE.value, 3)
+
+    def test_actualizar_cambios_tarea_conserva_asignaciones_de_lote(self, db):
+        tarea = db.obtener_tarea_por_id("T1")
+        tarea.hormigas_lote_id = "L1"
+        tarea.hormigas_asignadas = [Hormiga(id="HL", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5)]
+        assert db.guardar_tarea(tarea) is True
+        instantanea = tarea.instantanea()
+        tarea.hormigas_asignadas = []
+
+        assert db.actualizar_cambios_tarea(tarea, tarea.cambios_desde(instantanea)) is True
+
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM asignaciones_hormiga_tarea WHERE tarea_id = 'T1' AND hormiga_id = 'HL'")
+        assert cursor.fetchone()[0] == 1
+
+    def test_actualizar_cambios_tarea_inexistente_la_guarda_completa(self, db):
+        tarea = db.obtener_tarea_por_id("T1")
+        instantanea = tarea.instantanea()
+        tarea.id = "T99"
+        tarea.estado = EstadoTarea.CANCELADA
+
+        assert db.actualizar_cambios_tarea(tarea, tarea.cambios_desde(instantanea)) is True
+        assert db.obtener_tarea_por_id("T99").estado == EstadoTarea.CANCELADA
+
+
+class TestPerfilSqlite:
+    """Pruebas del perfil de PRAGMA y de la migración de bases antiguas."""
+
+    def test_perfil_rendimiento_por_defecto(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("SQLITE_PERFIL", raising=False)
+        db = DatabaseManager(str(tmp_path / "perfil.db"))
+        try:
+            conexion = db.connection
+            assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conexion.execute("PRAGMA synchronous").fetchone()[0] == 1
+            assert conexion.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        finally:
+            db.cerrar()
+
+    def test_perfil_seguro_mantiene_el_journal(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("SQLITE_PERFIL", "seguro")
+        db = DatabaseManager(str(tmp_path / "perfil.db"))
+        try:
+            assert db.connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        finally:
+            db.cerrar()
+
+    def test_migra_base_antigua(self, tmp_path):
+        import sqlite3
+
+        db_path = str(tmp_path / "antigua.db")
+        conexion = sqlite3.connect(db_path)
+        conexion.execute(
+            "CREATE TABLE asignaciones_hormiga_tarea ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, tarea_id TEXT NOT NULL, "
+            "hormiga_id TEXT NOT NULL, fecha_asignacion TIMESTAMP)"
+        )
+        conexion.commit()
+        conexion.close()
+
+        db = DatabaseManager(db_path)
+        try:
+            cursor = db.connection.cursor()
+            cursor.execute("PRAGMA table_info(asignaciones_hormiga_tarea)")
+            assert "lote_id" in [row[1] for row in cursor.fetchall()]
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+            indices = {row[0] for row in cursor.fetchall()}
+            assert {"idx_asignaciones_lote", "idx_eventos_fecha", "idx_tareas_estado"} <= indices
+            cursor.execute("EXPLAIN QUERY PLAN SELECT * FROM eventos ORDER BY fecha_evento DESC LIMIT 10")
+            assert "idx_eventos_fecha" in " ".join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            db.cerrar()
+
+    def test_migraciones_se_registran_y_no_se_repiten(self, tmp_path):
+        import sqlite3
+        from src.recoleccion.database.database_manager import MIGRACIONES_SQLITE
+
+        db_path = str(tmp_path / "antigua.db")
+        conexion = sqlite3.connect(db_path)
+        conexion.execute(
+            "CREATE TABLE tareas (id TEXT PRIMARY KEY, alimento_id TEXT NOT NULL, estado TEXT NOT NULL, "
+            "fecha_inicio TIMESTAMP, fecha_fin TIMESTAMP, alimento_recolectado INTEGER DEFAULT 0)"
+        )
+        conexion.commit()
+        conexion.close()
+
+        db = DatabaseManager(db_path)
+        ultima = MIGRACIONES_SQLITE[-1][0]
+        assert db.version_esquema == ultima
+        alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+        db.guardar_alimento(alimento)
+        assert db.guardar_tarea(TareaRecoleccion(id="T1", alimento=alimento)) is True
+        db.cerrar()
+
+        db = DatabaseManager(db_path)
+        try:
+            cursor = db.connection.cursor()
+            cursor.execute("SELECT version FROM version_esquema ORDER BY version")
+            assert [row[0] for row in cursor.fetchall()] == [m[0] for m in MIGRACIONES_SQLITE]
+            assert db.version_esquema == ultima
+            assert db.obtener_tarea_por_id("T1") is not None
+        finally:
+            db.cerrar()
+
+
+class TestCacheLRU:
+    """Pruebas de la caché LRU de IDs y sentencias de SQL Server."""
+
+    def test_desaloja_el_menos_usado(self):
+        cerrados = []
+        cache = CacheLRU(2, cerrados.append)
+        cache.guardar("a", 1)
+        cache.guardar("b", 2)
+        assert cache.obtener("a") == 1
+        cache.guardar("c", 3)
+
+        assert cache.obtener("b") is None
+        assert cerrados == [2]
+        assert len(cache) == 2
+        assert cache.obtener_metricas()["desalojos"] == 1
+
+    def test_uso_concurrente(self):
+        cache = CacheLRU(8)
+
+        def usar(hilo):
+            for i in range(2000):
+                cache.guardar((hilo, i % 16), i)
+                cache.obtener((hilo, (i + 1) % 16))
+                cache.invalidar((hilo, (i + 2) % 16))
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(usar, range(4)))
+
+        assert len(cache) <= 8
+
+    def test_traduccion_de_ids_de_alimento_sin_consultar_la_bd(self):
+        db = SqlServerDatabaseManager.__new__(SqlServerDatabaseManager)
+        db.schema_type = "script"
+        db.ids_alimentos = CacheLRU(10)
+        db.ids_alimentos.guardar("A1", 7)
+
+        db.ids_alimentos.guardar("3", 99)
+
+        assert db._traducir_alimento_id("A1") == 7
+        # Los IDs numéricos ya son el ID de la tabla: nunca se traducen
+        assert db._traducir_alimento_id("3") == 3
+        assert db._traducir_alimento_id("desconocido") == "desconocido"
+
+        db.schema_type = "nuevo"
+        assert db._traducir_alimento_id("A1") == "A1"
@@ -0,0 +1,114 @@
+"""
+Pruebas unitarias para el diario de eventos con escritura por lotes.
+"""
+
+import asyncio
+
+import pytest
+
+from src.recoleccion.services.diario_eventos import (
+    DiarioEventos, MODO_SYNC, MODO_GRUPO, MODO_SIN_ESPERA
+)
+
+
+class EscritorFalso:
+    """Escritor de lotes que registra cada transacción."""
+
+    def __init__(self, demora: float = 0.0, exito: bool = True):
+        self.lotes = []
+        self.demora = demora
+        self.exito = exito
+
+    async def __call__(self, eventos):
+        if self.demora:
+            await asyncio.sleep(self.demora)
+        self.lotes.append(list(eventos))
+        return self.exito
+
+    @property
+    def eventos(self):
+        return [evento for lote in self.lotes for evento in lote]
+
+
+class TestDiarioEventos:
+    """Pruebas para DiarioEventos."""
+
+    @pytest.mark.asyncio
+    async def test_modo_sync_escribe_cada_evento(self):
+        """En modo sync cada evento es su propia transacción."""
+        escritor = EscritorFalso()
+        diario = DiarioEventos(escritor, modo=MODO_SYNC)
+
+        assert await diario.registrar("a", "evento a") is True
+        assert await diario.registrar("b", "evento b", {"x": 1}) is True
+
+        assert escritor.lotes == [[("a", "evento a", None)], [("b", "evento b", {"x": 1})]]
+
+    @pytest.mark.asyncio
+    async def test_modo_grupo_agrupa_eventos_concurrentes(self):
+        """Los eventos que llegan durante una escritura van en el siguiente lote."""
+        escritor = EscritorFalso(demora=0.01)
+        diario = DiarioEventos(escritor, modo=MODO_GRUPO)
+
+        resultados = await asyncio.gather(*[diario.registrar("t", f"evento {i}") for i in range(10)])
+
+        assert all(resultados)
+        assert len(escritor.eventos) == 10
+        assert len(escritor.lotes) < 10
+        assert diario.obtener_metricas()["pendientes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_modo_sin_espera_escribe_por_tamano_y_al_vaciar(self):
+        """En fire_and_forget se escribe al llenar un lote o al vaciar."""
+        escritor = EscritorFalso()
+        diario = DiarioEventos(escritor, modo=MODO_SIN_ESPERA, tamano_lote=3, intervalo=60)
+
+        for i in range(3):
+            assert await diario.registrar("t", f"evento {i}") is True
+        await asyncio.sleep(0)
+        assert [len(lote) for lote in escritor.lotes] == [3]
+
+        await diario.registrar("t", "evento 3")
+        assert [len(lote) for lote in escritor.lotes] == [3]
+
+        await diario.vaciar()
+        assert [len(lote) for lote in escritor.lotes] == [3, 1]
+
+    @pytest.mark.asyncio
+    async def test_modo_sin_espera_escribe_por_tiempo(self):
+        """Un lote incompleto se escribe al cumplirse el intervalo."""
+        escritor = EscritorFalso()
+        diario = DiarioEventos(escritor, modo=MODO_SIN_ESPERA, tamano_lote=100, intervalo=0.01)
+
+        await diario.registrar("t", "evento")
+        assert escritor.lotes == []
+
+        await asyncio.sleep(0.05)
+        assert len(escritor.eventos) == 1
+
+    @pytest.mark.asyncio
+    async def test_backpressure_con_buffer_lleno(self):
+        """Con el buffer lleno, registrar espera en lugar de crecer sin límite."""
+        escritor = EscritorFalso(demora=0.01)
+        diario = DiarioEventos(escritor, modo=MODO_SIN_ESPERA, tamano_lote=2, capacidad=2, intervalo=60)
+
+        for i in range(7):
+            await diario.registrar("t", f"evento {i}")
+            assert diario.obtener_metricas()["pendientes"] <= 2
+        await diario.vaciar()
+
+        assert len(escritor.eventos) == 7
+        assert diario.obtener_metricas()["esperas_backpressure"] > 0
+
+    @pytest.mark.asyncio
+    async def test_error_de_escritura_se_informa(self):
+        """Si la transacción falla, los llamadores en modo group reciben False."""
+        diario = DiarioEventos(EscritorFalso(exito=False), modo=MODO_GRUPO)
+
+        assert await diario.registrar("t", "evento") is False
+        assert diario.obtener_metricas()["eventos_fallidos"] == 1
+
+    def test_modo_desconocido(self):
+        """Un modo de durabilidad inválido se rechaza."""
+        with pytest.raises(ValueError):
+            DiarioEventos(EscritorFalso(), modo="otro")
@@ -0,0 +1,137 @@
+"""
+Pruebas unitarias para el difusor de eventos de tareas (SSE).
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.recoleccion.services.difusor_eventos import DifusorEventosTareas, Suscripcion
+from src.recoleccion.services.timer_service import TimerService
+from src.recoleccion.models.alimento import Alimento
+from src.recoleccion.models.hormiga import Hormiga
+from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion
+from src.recoleccion.models.estado_hormiga import EstadoHormiga
+
+
+def _tarea(tarea_id: str, tiempo_recoleccion: int = 60) -> TareaRecoleccion:
+    alimento = Alimento(
+        id="A1",
+        nombre="Fruta",
+        cantidad_hormigas_necesarias=1,
+        puntos_stock=10,
+        tiempo_recoleccion=tiempo_recoleccion
+    )
+    tarea = TareaRecoleccion(id=tarea_id, alimento=alimento)
+    tarea.agregar_hormiga(Hormiga(id=f"H-{tarea_id}", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5))
+    return tarea
+
+
+class TestSuscripcion:
+    """Pruebas de la cola acotada de un suscriptor."""
+
+    @pytest.mark.asyncio
+    async def test_cola_llena_descarta_el_mas_antiguo(self):
+        """Un suscriptor lento pierde los eventos más antiguos, no los nuevos."""
+        suscripcion = Suscripcion(capacidad=2)
+        for i in range(4):
+            suscripcion.publicar({"tipo": "completada", "tarea_id": f"T{i}"})
+
+        eventos = await suscripcion.siguiente(timeout=0.1)
+
+        assert [e["tarea_id"] for e in eventos] == ["T2", "T3"]
+        assert suscripcion.descartados == 2
+
+    @pytest.mark.asyncio
+    async def test_progreso_se_agrupa_por_tarea(self):
+        """Solo se entrega el último tick de progreso de cada tarea."""
+        suscripcion = Suscripcion(capacidad=10)
+        suscripcion.publicar({"tipo": "progreso", "tarea_id": "T1", "progreso": 0.1})
+        suscripcion.publicar({"tipo": "iniciada", "tarea_id": "T2"})
+        suscripcion.publicar({"tipo": "progreso", "tarea_id": "T1", "progreso": 0.5})
+
+        eventos = await suscripcion.siguiente(timeout=0.1)
+
+        assert [(e["tipo"], e["tarea_id"]) for e in eventos] == [("iniciada", "T2"), ("progreso", "T1")]
+        assert eventos[1]["progreso"] == 0.5
+        assert suscripcion.descartados == 0
+
+    @pytest.mark.asyncio
+    async def test_progreso_de_una_tarea_terminada_se_descarta(self):
+        """Un tick de progreso agrupado no se entrega después del fin de su tarea."""
+        suscripcion = Suscripcion(capacidad=10)
+        suscripcion.publicar({"tipo": "progreso", "tarea_id": "T1", "progreso": 0.9})
+        suscripcion.publicar({"tipo": "progreso", "tarea_id": "T2", "progreso": 0.5})
+        suscripcion.publicar({"tipo": "completada", "tarea_id": "T1"})
+
+        eventos = await suscripcion.siguiente(timeout=0.1)
+
+        assert [(e["tipo"], e["tarea_id"]) for e in eventos] == [("completada", "T1"), ("progreso", "T2")]
+
+    @pytest.mark.asyncio
+    async def test_filtro_y_timeout(self):
+        """Los eventos de otras tareas se ignoran; sin eventos se devuelve lista vacía."""
+        suscripcion = Suscripcion(capacidad=10, tareas=["T1"])
+        suscripcion.publicar({"tipo": "iniciada", "tarea_id": "T2"})
+
+        assert await suscripcion.siguiente(timeout=0.01) == []
+
+
+class TestDifusorEventosTareas:
+    """Pruebas del reparto de eventos del timer."""
+
+    @pytest.mark.asyncio
+    async def test_eventos_del_timer_llegan_a_cada_suscriptor(self):
+        """Inicio y fin de una tarea se publican a todos los suscriptores."""
+        timer = TimerService()
+        difusor = DifusorEventosTareas(timer, capacidad=10, intervalo_progreso=60)
+        primero = difusor.suscribir()
+        segundo = difusor.suscribir()
+
+        tarea = _tarea("T1")
+        await timer.iniciar_tarea_timer(tarea)
+        await timer.cancelar_tarea(tarea.id)
+
+        for suscripcion in (primero, segundo):
+            eventos = await suscripcion.siguiente(timeout=0.1)
+            tipos = [e["tipo"] for e in eventos if e["tipo"] != "progreso"]
+            assert tipos == ["iniciada", "cancelada"]
+
+        difusor.desuscribir(primero)
+        difusor.desuscribir(segundo)
+        assert difusor._tarea_progreso is None
+        await timer.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_flujo_sse_formatea_eventos(self):
+        """El flujo SSE emite un evento por mensaje y libera la suscripción al cerrarse."""
+        timer = TimerService()
+        difusor = DifusorEventosTareas(timer, capacidad=10, intervalo_progreso=60)
+        flujo = difusor.flujo_sse(["T1"], keepalive=0.01)
+        assert not difusor.suscripciones
+
+        assert await flujo.__anext__() == "retry: 3000\n\n"
+        (suscripcion,) = difusor.suscripciones
+        assert await flujo.__anext__() == ": keep-alive\n\n"
+
+        difusor.publicar({"tipo": "completada", "tarea_id": "T1"})
+        mensaje = await flujo.__anext__()
+        assert mensaje.startswith("event: completada\ndata: ")
+        assert json.loads(mensaje.split("data: ", 1)[1])["tarea_id"] == "T1"
+
+        await flujo.aclose()
+        assert suscripcion not in difusor.suscripciones
+        await asyncio.sleep(0)
+
+    @pytest.mark.asyncio
+    async def test_flujo_sin_consumir_no_deja_suscripcion(self):
+        """Si el cliente se va antes de que arranque la respuesta no queda nada suscrito."""
+        timer = TimerService()
+        difusor = DifusorEventosTareas(timer, capacidad=10, intervalo_progreso=60)
+
+        flujo = difusor.flujo_sse()
+        await flujo.aclose()
+
+        assert not difusor.suscripciones
+        assert difusor._tarea_progreso is None
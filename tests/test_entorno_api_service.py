@@ -169,6 +169,33 @@ async def test_entorno_api_consultar_alimentos_disponibles_sin_respuesta():
     assert alimentos == []
 
 
+@pytest.mark.asyncio
+async def test_entorno_api_ruta_de_recursos_se_descubre_una_vez():
+    """La ruta que responde se recuerda; solo un 404 obliga a volver a probar."""
+    service = EntornoAPIService(base_url="http://fake")
+    rutas_validas = {"/entorno/resources"}
+    urls = []
+
+    async def fake_request(method, url, **kwargs):
+        urls.append(url.replace("http://fake", ""))
+        if urls[-1] in rutas_validas:
+            return FakeResponse(200, [])
+        return FakeResponse(404, {})
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    await service.consultar_alimentos_disponibles()
+    await service.consultar_alimentos_disponibles()
+    assert urls == ["/resources", "/api/resources", "/entorno/resources", "/entorno/resources"]
+
+    # El despliegue cambia de ruta: el 404 provoca un nuevo descubrimiento
+    rutas_validas = {"/resources"}
+    urls.clear()
+    await service.consultar_alimentos_disponibles()
+    await service.consultar_alimentos_disponibles()
+    assert urls == ["/entorno/resources", "/resources", "/resources"]
+
+
 @pytest.mark.asyncio
 async def test_entorno_api_consultar_alimento_por_id_not_found():
     """consultar_alimento_por_id debe devolver None si _make_request devuelve None."""
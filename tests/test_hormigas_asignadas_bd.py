@@ -211,6 +211,29 @@ class TestHormigasAsignadasBD:
         cursor.execute("SELECT hormigas_asignadas FROM tareas WHERE id = ?", ("T6",))
         result = cursor.fetchone()
         assert result[0] == 3, f"Se esperaba 3 después de agregar una hormiga, se encontró {result[0]}"
-
-
-
+    
+    def test_obtener_tareas_hidrata_lotes_y_hormigas_por_tarea(self, db, alimento_ejemplo):
+        """Test que verifica que cada tarea recibe solo las hormigas de su lote."""
+        # Arrange
+        db.guardar_alimento(alimento_ejemplo)
+        for tarea_id in ("T10", "T11", "T12"):
+            db.guardar_tarea(TareaRecoleccion(id=tarea_id, alimento=alimento_ejemplo))
+        db.crear_lote_hormigas("L10", "T10", 3, 3)
+        db.guardar_hormigas_en_lote("L10", [
+            Hormiga(id=f"H10_{i}", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5) for i in range(3)
+        ])
+        db.crear_lote_hormigas("L11", "T11", 3, 3)
+        db.guardar_hormigas_en_lote("L11", [
+            Hormiga(id=f"H11_{i}", estado=EstadoHormiga.DISPONIBLE, capacidad_carga=5) for i in range(3)
+        ])
+        
+        # Act
+        tareas = {t.id: t for t in db.obtener_tareas()}
+        
+        # Assert
+        assert tareas["T10"].hormigas_lote_id == "L10"
+        assert [h.id for h in tareas["T10"].hormigas_asignadas] == ["H10_0", "H10_1", "H10_2"]
+        assert tareas["T11"].hormigas_lote_id == "L11"
+        assert [h.id for h in tareas["T11"].hormigas_asignadas] == ["H11_0", "H11_1", "H11_2"]
+        assert tareas["T12"].hormigas_lote_id is None
+        assert tareas["T12"].hormigas_asignadas == []
@@ -0,0 +1,150 @@
+"""
+Pruebas unitarias para el interruptor de circuito de las APIs externas.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
+
+from src.recoleccion.api.recoleccion_controller import create_app
+from src.recoleccion.services.entorno_api_service import EntornoAPIService
+from src.recoleccion.services.interruptor_circuito import InterruptorCircuito
+
+
+class TestInterruptorCircuito:
+    """Pruebas de las transiciones cerrado/abierto/semiabierto."""
+
+    def test_se_abre_tras_el_umbral_y_rechaza_llamadas(self):
+        """Con `umbral_fallos` fallos seguidos deja de permitir llamadas."""
+        circuito = InterruptorCircuito("prueba", umbral_fallos=2, tiempo_apertura=60)
+        circuito.registrar_fallo()
+        assert circuito.permite_llamada() is True
+
+        circuito.registrar_fallo()
+        assert circuito.disponible is False
+        assert circuito.permite_llamada() is False
+        assert circuito.disponibilidad_conocida() is False
+        assert circuito.obtener_metricas()["llamadas_rechazadas"] == 1
+
+    def test_semiabierto_deja_pasar_una_prueba(self):
+        """Pasado el tiempo de apertura solo pasa una llamada; su resultado decide."""
+        circuito = InterruptorCircuito("prueba", umbral_fallos=1, tiempo_apertura=0.01)
+        circuito.registrar_fallo()
+        time.sleep(0.02)
+
+        assert circuito.permite_llamada() is True
+        assert circuito.permite_llamada() is False
+        circuito.registrar_fallo()
+        assert circuito.estado == "abierto"
+
+        time.sleep(0.02)
+        assert circuito.permite_llamada() is True
+        circuito.registrar_exito()
+        assert circuito.estado == "cerrado"
+        assert circuito.disponibilidad_conocida() is True
+
+    def test_prueba_sin_resultado_no_bloquea_el_circuito(self):
+        """Una prueba que nunca registra resultado caduca y admite otra."""
+        circuito = InterruptorCircuito("prueba", umbral_fallos=1, tiempo_apertura=0.01)
+        circuito.registrar_fallo()
+        time.sleep(0.02)
+
+        assert circuito.permite_llamada() is True
+        assert circuito.permite_llamada() is False
+        time.sleep(0.02)
+        assert circuito.permite_llamada() is True
+
+        circuito.liberar_prueba()
+        assert circuito.permite_llamada() is True
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, json_data=None):
+        self.status_code = status_code
+        self._json = json_data if json_data is not None else {}
+
+    def json(self):
+        return self._json
+
+
+@pytest.mark.asyncio
+async def test_entorno_api_falla_rapido_con_el_circuito_abierto():
+    """Con el entorno caído se deja de llamar y is_disponible no hace peticiones."""
+    service = EntornoAPIService(base_url="http://fake")
+    service.circuito = InterruptorCircuito("entorno", umbral_fallos=3, tiempo_apertura=60)
+    llamadas = []
+
+    async def fake_request(method, url, **kwargs):
+        llamadas.append(url)
+        raise httpx.ConnectError("sin conexión")
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    assert await service.consultar_alimentos_disponibles() == []
+    assert len(llamadas) == 3
+    assert await service.consultar_alimentos_disponibles() == []
+    assert await service.is_disponible() is False
+    assert len(llamadas) == 3
+
+
+@pytest.mark.asyncio
+async def test_entorno_api_is_disponible_reutiliza_exito_reciente():
+    """Tras una respuesta correcta, is_disponible no repite la petición."""
+    service = EntornoAPIService(base_url="http://fake")
+    llamadas = []
+
+    async def fake_request(method, url, **kwargs):
+        llamadas.append(url)
+        return FakeResponse(200, [])
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    assert await service.is_disponible() is True
+    assert await service.is_disponible() is True
+    await service.consultar_alimentos_disponibles()
+    assert await service.is_disponible() is True
+    assert len(llamadas) == 2
+
+
+@pytest.mark.asyncio
+async def test_prueba_cancelada_libera_el_circuito():
+    """Cancelar la llamada de prueba no deja el circuito semiabierto para siempre."""
+    service = EntornoAPIService(base_url="http://fake")
+    service.circuito = InterruptorCircuito("entorno", umbral_fallos=1, tiempo_apertura=0.01)
+    service.circuito.registrar_fallo()
+    time.sleep(0.02)
+    empezada = asyncio.Event()
+
+    async def fake_request(method, url, **kwargs):
+        empezada.set()
+        await asyncio.sleep(10)
+
+    service.client.request = fake_request  # type: ignore[assignment]
+
+    tarea = asyncio.create_task(service.consultar_alimentos_disponibles())
+    await empezada.wait()
+    tarea.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await tarea
+
+    assert service.circuito.estado == "semiabierto"
+    assert service.circuito.permite_llamada() is True
+
+
+def test_health_expone_el_estado_de_los_circuitos():
+    """/health informa la disponibilidad cacheada sin llamar a los subsistemas."""
+    entorno = EntornoAPIService(base_url="http://fake")
+    entorno.circuito = InterruptorCircuito("entorno", umbral_fallos=1, tiempo_apertura=60)
+    entorno.circuito.registrar_fallo()
+
+    client = TestClient(create_app(entorno, AsyncMock()))
+    data = client.get("/health").json()
+
+    assert data["status"] == "healthy"
+    assert data["entorno_disponible"] is False
+    assert data["comunicacion_disponible"] is True
+    assert data["circuitos"]["entorno"]["estado"] == "abierto"
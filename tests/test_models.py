@@ -474,3 +474,25 @@ class TestTareaRecoleccion:
         assert "tarea_001" in str_repr
         assert "Fruta" in str_repr
         assert "pendiente" in str_repr
+
+    def test_cambios_desde_instantanea(self, alimento_ejemplo, hormiga_ejemplo):
+        """Prueba que solo se informan los campos y hormigas que cambiaron."""
+        tarea = TareaRecoleccion(
+            id="tarea_001",
+            alimento=alimento_ejemplo
+        )
+        tarea.agregar_hormiga(hormiga_ejemplo)
+        instantanea = tarea.instantanea()
+        
+        assert tarea.cambios_desde(instantanea) == {
+            "campos": {}, "hormigas_agregadas": [], "hormigas_quitadas": [],
+            "estado_anterior": EstadoTarea.PENDIENTE
+        }
+        
+        tarea.hormigas_asignadas = [Hormiga(id="hormiga_002", capacidad_carga=5)]
+        tarea.estado = EstadoTarea.EN_PROCESO
+        cambios = tarea.cambios_desde(instantanea)
+        
+        assert cambios["campos"] == {"estado": EstadoTarea.EN_PROCESO}
+        assert cambios["hormigas_agregadas"] == ["hormiga_002"]
+        assert cambios["hormigas_quitadas"] == ["hormiga_001"]
@@ -7,6 +7,9 @@ El objetivo es cubrir la lógica de:
 - manejo de excepciones
 """
 
+import asyncio
+import threading
+
 import pytest
 from types import SimpleNamespace
 
@@ -215,4 +218,348 @@ async def test_obtener_info_bd_devuelve_engine_y_implementation(persistence_with
     assert "implementation" in info
 
 
+@pytest.mark.asyncio
+async def test_llamadas_bd_se_ejecutan_fuera_del_event_loop(persistence_with_fake_db):
+    ps = persistence_with_fake_db
+    hilos = []
+    ps.db.obtener_alimentos = lambda: hilos.append(threading.current_thread()) or []
+
+    assert await ps.obtener_alimentos() == []
+    assert hilos and hilos[0] is not threading.current_thread()
+
+    metricas = ps.obtener_metricas_pool()
+    assert metricas["tamano_pool"] == ps.tamano_pool
+    assert metricas["llamadas_completadas"] == 1
+    assert metricas["en_cola"] == 0 and metricas["en_ejecucion"] == 0
+    assert metricas["espera_cola_maxima_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_errores_de_bd_se_propagan_y_se_cuentan(persistence_with_fake_db):
+    ps = persistence_with_fake_db
+
+    def fallar(limite):
+        raise RuntimeError("BD caída")
+
+    ps.db.obtener_eventos = fallar
+    with pytest.raises(RuntimeError):
+        await ps.obtener_eventos_recientes(10)
+    assert ps.obtener_metricas_pool()["llamadas_con_error"] == 1
+
+
+class FakeTransactionalDB(FakeDB):
+    """DB fake con transacciones que registra el hilo de cada llamada."""
+
+    def __init__(self):
+        super().__init__()
+        self.transacciones = []
+        self.hilos = set()
+
+    def iniciar_transaccion(self):
+        self.hilos.add(threading.get_ident())
+        self.transacciones.append("inicio")
+
+    def confirmar_transaccion(self):
+        self.hilos.add(threading.get_ident())
+        self.transacciones.append("commit")
+        return True
+
+    def revertir_transaccion(self):
+        self.hilos.add(threading.get_ident())
+        self.transacciones.append("rollback")
+
+    def guardar_tarea(self, tarea):
+        self.hilos.add(threading.get_ident())
+        return super().guardar_tarea(tarea)
+
+    def guardar_eventos(self, eventos):
+        self.hilos.add(threading.get_ident())
+        self.transacciones.append(("eventos", [tipo for tipo, _, _ in eventos]))
+        return True
+
+
+@pytest.mark.asyncio
+async def test_unidad_de_trabajo_confirma_una_vez_en_un_solo_hilo():
+    ps = PersistenceService()
+    ps.db = FakeTransactionalDB()
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+
+    async with ps.unidad_de_trabajo() as unidad:
+        await ps.guardar_tarea(TareaRecoleccion(id="T1", alimento=alimento))
+        async with ps.unidad_de_trabajo() as anidada:
+            assert anidada is unidad
+            await ps.guardar_tarea(TareaRecoleccion(id="T2", alimento=alimento))
+
+    assert unidad.confirmada is True
+    # Los eventos se escriben dentro de la transacción, antes del único commit
+    assert ps.db.transacciones == ["inicio", ("eventos", ["tarea_guardada", "tarea_guardada"]), "commit"]
+    assert len(ps.db.hilos) == 1
+    assert ps.diario_eventos.obtener_metricas()["eventos_registrados"] == 0
+
+
+@pytest.mark.asyncio
+async def test_unidad_de_trabajo_revierte_ante_excepcion_o_cancelacion():
+    ps = PersistenceService()
+    ps.db = FakeTransactionalDB()
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+
+    with pytest.raises(RuntimeError):
+        async with ps.unidad_de_trabajo():
+            await ps.guardar_tarea(TareaRecoleccion(id="T1", alimento=alimento))
+            raise RuntimeError("fallo a mitad de operación")
+
+    async with ps.unidad_de_trabajo() as unidad:
+        unidad.cancelar()
+
+    assert unidad.confirmada is False
+    assert ps.db.transacciones == ["inicio", "rollback", "inicio", "rollback"]
+
+
+@pytest.mark.asyncio
+async def test_unidad_de_trabajo_sin_soporte_de_transacciones(persistence_with_fake_db):
+    ps = persistence_with_fake_db
+
+    async with ps.unidad_de_trabajo() as unidad:
+        assert await ps.marcar_lote_en_uso("L1") is True
+
+    assert unidad.confirmada is True
+    assert ("lote_en_uso", "L1") in ps.db.guardados
+
+
+@pytest.mark.asyncio
+async def test_completar_tareas_lote_sin_soporte_en_bd(persistence_with_fake_db):
+    ps = persistence_with_fake_db
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+    tareas = [TareaRecoleccion(id=f"T{i}", alimento=alimento, estado=EstadoTarea.COMPLETADA) for i in range(3)]
+
+    assert await ps.completar_tareas_lote(tareas) is True
+    await ps.vaciar_eventos()
+
+    assert [g for g in ps.db.guardados if g[0] == "tarea"] == [("tarea", "T0"), ("tarea", "T1"), ("tarea", "T2")]
+    assert ("alimento_disponible", "A1", False) in ps.db.guardados
+    assert [e[0] for e in ps.db.eventos].count("tarea_completada_automatica") == 3
+
+
+@pytest.mark.asyncio
+async def test_completar_tareas_lote_usa_la_escritura_por_lotes():
+    ps = PersistenceService()
+    ps.db = FakeTransactionalDB()
+    ps.db.completar_tareas = lambda tareas: ps.db.transacciones.append(("completar", len(tareas))) or True
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+    tareas = [TareaRecoleccion(id=f"T{i}", alimento=alimento, estado=EstadoTarea.COMPLETADA) for i in range(3)]
+
+    assert await ps.completar_tareas_lote(tareas) is True
+    assert ps.db.transacciones == [
+        "inicio",
+        ("completar", 3),
+        ("eventos", ["tarea_completada_automatica"] * 3),
+        "commit",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_proyeccion_de_estado_se_actualiza_solo_al_confirmar():
+    ps = PersistenceService()
+    ps.db = FakeTransactionalDB()
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+    ps.db.obtener_tareas = lambda: [TareaRecoleccion(id="T1", alimento=alimento)]
+
+    consulta = await ps.consultar_status_tareas()
+    assert [t["tarea_id"] for t in consulta["tareas"]] == ["T1"]
+
+    async with ps.unidad_de_trabajo() as unidad:
+        await ps.guardar_tarea(TareaRecoleccion(id="T2", alimento=alimento))
+        unidad.cancelar()
+    assert (await ps.consultar_status_tareas())["total"] == 1
+
+    await ps.guardar_tarea(TareaRecoleccion(id="T2", alimento=alimento))
+    await ps.actualizar_estado_tarea("T1", EstadoTarea.EN_PROCESO)
+
+    consulta = await ps.consultar_status_tareas(estado="en_proceso")
+    assert [t["tarea_id"] for t in consulta["tareas"]] == ["T1"]
+    assert (await ps.consultar_status_tareas())["total"] == 2
 
+
+@pytest.mark.asyncio
+async def test_guardar_tareas_lote_en_una_transaccion():
+    ps = PersistenceService()
+    ps.db = FakeTransactionalDB()
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+
+    tareas = [TareaRecoleccion(id=f"T{i}", alimento=alimento) for i in range(3)]
+    assert await ps.guardar_tareas_lote(tareas) is True
+
+    assert ps.db.transacciones == ["inicio", ("eventos", ["tarea_guardada"] * 3), "commit"]
+    assert [g for g in ps.db.guardados if g[0] == "tarea"] == [("tarea", "T0"), ("tarea", "T1"), ("tarea", "T2")]
+
+    ps.db.guardar_tarea = lambda tarea: tarea.id != "T1"
+    assert await ps.guardar_tareas_lote(tareas) is False
+    assert ps.db.transacciones[-1] == "rollback"
+
+
+@pytest.mark.asyncio
+async def test_obtener_alimentos_por_ids_sin_soporte_en_bd(persistence_with_fake_db):
+    alimentos = await persistence_with_fake_db.obtener_alimentos_por_ids(["A1", "A2", "A1"])
+
+    assert sorted(alimentos) == ["A1", "A2"]
+    assert alimentos["A2"].disponible is True
+
+
+@pytest.mark.asyncio
+async def test_cache_de_alimentos_se_invalida_al_escribir(persistence_with_fake_db):
+    ps = persistence_with_fake_db
+    lecturas = []
+    leer = ps.db.obtener_alimento_por_id
+    ps.db.obtener_alimento_por_id = lambda alimento_id: lecturas.append(alimento_id) or leer(alimento_id)
+
+    assert (await ps.obtener_alimento_por_id("A1")).id == "A1"
+    assert sorted(await ps.obtener_alimentos_por_ids(["A1", "A2"])) == ["A1", "A2"]
+    assert lecturas == ["A1", "A2"]
+
+    assert await ps.actualizar_alimento_disponibilidad("A1", False) is True
+    await ps.obtener_alimento_por_id("A1")
+    await ps.obtener_alimento_por_id("A2")
+    assert lecturas == ["A1", "A2", "A1"]
+
+    metricas = ps.obtener_metricas_cache_alimentos()
+    assert metricas["aciertos"] == 2
+    assert metricas["invalidaciones"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_de_alimentos_no_guarda_una_lectura_invalidada_en_curso(persistence_with_fake_db):
+    ps = persistence_with_fake_db
+    lecturas = []
+    leer = ps.db.obtener_alimento_por_id
+
+    def leer_con_escritura_concurrente(alimento_id):
+        fila = leer(alimento_id)
+        if not lecturas:
+            # Otra escritura invalida el alimento mientras se lee la fila vieja
+            ps._invalidar_alimentos([alimento_id])
+        lecturas.append(alimento_id)
+        return fila
+
+    ps.db.obtener_alimento_por_id = leer_con_escritura_concurrente
+
+    await ps.obtener_alimento_por_id("A1")
+    await ps.obtener_alimento_por_id("A1")
+    await ps.obtener_alimento_por_id("A1")
+
+    assert lecturas == ["A1", "A1"]
+
+
+@pytest.mark.asyncio
+async def test_cache_de_alimentos_no_guarda_lecturas_de_una_transaccion():
+    ps = PersistenceService()
+    ps.db = FakeTransactionalDB()
+    lecturas = []
+    ps.db.obtener_alimentos = lambda: lecturas.append("todos") or []
+
+    async with ps.unidad_de_trabajo() as unidad:
+        await ps.obtener_alimentos()
+        unidad.cancelar()
+    await ps.obtener_alimentos()
+    await ps.obtener_alimentos()
+
+    assert lecturas == ["todos", "todos"]
+
+
+class FakeDiffDB(FakeTransactionalDB):
+    """DB fake que además admite guardar solo los cambios de una tarea."""
+
+    def actualizar_cambios_tarea(self, tarea, cambios):
+        self.guardados.append(("cambios_tarea", tarea.id, cambios))
+        return True
+
+
+@pytest.mark.asyncio
+async def test_guardar_tarea_escribe_solo_los_cambios():
+    ps = PersistenceService()
+    ps.db = FakeDiffDB()
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=2, puntos_stock=10, tiempo_recoleccion=60)
+    tarea = TareaRecoleccion(id="T1", alimento=alimento)
+    for hormiga_id in ("H1", "H2"):
+        tarea.agregar_hormiga(Hormiga(id=hormiga_id, capacidad_carga=5, estado=EstadoHormiga.DISPONIBLE))
+
+    assert await ps.guardar_tarea(tarea) is True
+    assert await ps.guardar_tarea(tarea) is True
+    assert ps.db.guardados == [("tarea", "T1")]
+
+    tarea.iniciar_tarea()
+    tarea.hormigas_asignadas = [h for h in tarea.hormigas_asignadas if h.id != "H2"]
+    assert await ps.guardar_tarea(tarea) is True
+
+    tipo, tarea_id, cambios = ps.db.guardados[-1]
+    assert (tipo, tarea_id) == ("cambios_tarea", "T1")
+    assert sorted(cambios["campos"]) == ["estado", "fecha_inicio"]
+    assert cambios["hormigas_quitadas"] == ["H2"]
+    assert cambios["hormigas_agregadas"] == []
+
+    # Otro alimento obliga a guardar la tarea completa
+    tarea.alimento = Alimento(id="A2", nombre="Hoja", cantidad_hormigas_necesarias=1, puntos_stock=5, tiempo_recoleccion=60)
+    assert await ps.guardar_tarea(tarea) is True
+    assert ps.db.guardados[-1] == ("tarea", "T1")
+
+
+@pytest.mark.asyncio
+async def test_instantanea_de_tarea_solo_se_registra_al_confirmar():
+    ps = PersistenceService()
+    ps.db = FakeDiffDB()
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+    tarea = TareaRecoleccion(id="T1", alimento=alimento)
+
+    async with ps.unidad_de_trabajo() as unidad:
+        await ps.guardar_tarea(tarea)
+        unidad.cancelar()
+    await ps.guardar_tarea(tarea)
+    assert ps.db.guardados == [("tarea", "T1"), ("tarea", "T1")]
+
+    # Un cambio de estado por otra vía también actualiza la instantánea
+    assert await ps.actualizar_estado_tarea("T1", EstadoTarea.EN_PROCESO) is True
+    tarea.estado = EstadoTarea.EN_PROCESO
+    await ps.guardar_tarea(tarea)
+    assert ps.db.guardados[-1] == ("estado_tarea", "T1", "en_proceso")
+
+    # Las tareas terminadas se olvidan y vuelven a guardarse completas
+    assert await ps.actualizar_estado_tarea("T1", EstadoTarea.CANCELADA) is True
+    tarea.estado = EstadoTarea.CANCELADA
+    await ps.guardar_tarea(tarea)
+    assert ps.db.guardados[-1] == ("tarea", "T1")
+    assert "T1" not in ps._tareas_persistidas
+
+
+@pytest.mark.asyncio
+async def test_instantaneas_de_tareas_acotadas_y_con_ttl():
+    ps = PersistenceService()
+    ps.db = FakeDiffDB()
+    ps.capacidad_instantaneas = 2
+    alimento = Alimento(id="A1", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=60)
+    tareas = [TareaRecoleccion(id=f"T{i}", alimento=alimento) for i in range(3)]
+
+    for tarea in tareas:
+        await ps.guardar_tarea(tarea)
+    assert list(ps._tareas_persistidas) == ["T1", "T2"]
+
+    # Con la instantánea caducada se guarda la tarea completa
+    ps.ttl_instantaneas = 0
+    await ps.guardar_tarea(tareas[2])
+    assert ps.db.guardados[-1] == ("tarea", "T2")
+
+
+@pytest.mark.asyncio
+async def test_carril_pasa_al_siguiente_si_el_despertado_se_cancela():
+    ps = PersistenceService(tamano_pool=1)
+    carril = await ps._tomar_carril()
+    segunda = asyncio.create_task(ps._tomar_carril())
+    tercera = asyncio.create_task(ps._tomar_carril())
+    await asyncio.sleep(0)
+
+    # La segunda se despierta y se cancela antes de llegar a reanudarse
+    ps._devolver_carril(carril)
+    segunda.cancel()
+
+    assert await asyncio.wait_for(tercera, timeout=1) is carril
+    with pytest.raises(asyncio.CancelledError):
+        await segunda
+    ps._devolver_carril(carril)
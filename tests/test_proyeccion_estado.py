@@ -0,0 +1,122 @@
+"""
+Pruebas unitarias para la proyección de estado de tareas.
+"""
+
+from src.recoleccion.services.proyeccion_estado import ProyeccionEstadoTareas
+from src.recoleccion.models.alimento import Alimento
+from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion
+from src.recoleccion.models.estado_tarea import EstadoTarea
+
+
+def _tarea(tarea_id: str) -> TareaRecoleccion:
+    alimento = Alimento(
+        id="A1",
+        nombre="Fruta",
+        cantidad_hormigas_necesarias=1,
+        puntos_stock=10,
+        tiempo_recoleccion=60
+    )
+    return TareaRecoleccion(id=tarea_id, alimento=alimento)
+
+
+class TestProyeccionEstadoTareas:
+    """Pruebas para ProyeccionEstadoTareas."""
+
+    def test_paginacion_ordenada_por_id(self):
+        """Las páginas se sirven en orden de ID aunque se inserten desordenadas."""
+        proyeccion = ProyeccionEstadoTareas()
+        for tarea_id in ["T3", "T1", "T4", "T2"]:
+            proyeccion.actualizar(_tarea(tarea_id))
+
+        pagina = proyeccion.consultar(limit=2, offset=1)
+
+        assert [r["tarea_id"] for r in pagina["tareas"]] == ["T2", "T3"]
+        assert pagina["total"] == 4
+
+    def test_registro_sin_cambios_no_cambia_version(self):
+        """Proyectar el mismo estado no incrementa la versión ni el ETag."""
+        proyeccion = ProyeccionEstadoTareas()
+        tarea = _tarea("T1")
+        proyeccion.actualizar(tarea)
+        antes = proyeccion.consultar()
+
+        assert proyeccion.actualizar(tarea) is False
+        assert proyeccion.consultar() == antes
+
+        tarea.estado = EstadoTarea.EN_PROCESO
+        assert proyeccion.actualizar(tarea) is True
+        assert proyeccion.consultar()["etag"] != antes["etag"]
+
+    def test_cargar_no_pisa_registros_mas_recientes(self):
+        """La carga inicial desde BD conserva las transiciones ya proyectadas."""
+        proyeccion = ProyeccionEstadoTareas()
+        reciente = _tarea("T1")
+        reciente.estado = EstadoTarea.COMPLETADA
+        proyeccion.actualizar(reciente)
+
+        proyeccion.cargar([_tarea("T1"), _tarea("T2")])
+
+        assert proyeccion.cargada is True
+        estados = {r["tarea_id"]: r["estado"] for r in proyeccion.consultar()["tareas"]}
+        assert estados == {"T1": "completada", "T2": "pendiente"}
+        assert proyeccion.actualizar_estado("T99", "completada") is False
+
+    def test_cambios_desde_cursor(self):
+        """El feed devuelve solo lo modificado tras el cursor, en orden de cambio."""
+        proyeccion = ProyeccionEstadoTareas()
+        proyeccion.cargar([_tarea("T1"), _tarea("T2"), _tarea("T3")])
+        inicial = proyeccion.cambios_desde()
+        assert [r["tarea_id"] for r in inicial["tareas"]] == ["T1", "T2", "T3"]
+
+        proyeccion.actualizar_estado("T2", "en_proceso")
+        proyeccion.actualizar_estado("T1", "en_proceso")
+        proyeccion.actualizar_estado("T2", "completada")
+        cambios = proyeccion.cambios_desde(inicial["cursor"])
+
+        assert [(r["tarea_id"], r["estado"]) for r in cambios["tareas"]] == [("T1", "en_proceso"), ("T2", "completada")]
+        assert cambios["reinicio"] is False
+        assert proyeccion.cambios_desde(cambios["cursor"])["tareas"] == []
+
+    def test_cambios_con_limite_y_cursor_ajeno(self):
+        """Con límite el cursor avanza por tramos; un cursor de otra instancia fuerza reinicio."""
+        proyeccion = ProyeccionEstadoTareas()
+        proyeccion.cargar([_tarea(f"T{i}") for i in range(5)])
+
+        primera = proyeccion.cambios_desde(limite=3)
+        segunda = proyeccion.cambios_desde(primera["cursor"], limite=3)
+
+        assert primera["hay_mas"] is True and segunda["hay_mas"] is False
+        assert [r["tarea_id"] for r in primera["tareas"] + segunda["tareas"]] == [f"T{i}" for i in range(5)]
+
+        otra = proyeccion.cambios_desde("otra-epoca-3")
+        assert otra["reinicio"] is True
+        assert len(otra["tareas"]) == 5
+
+    def test_filtro_por_estado_sigue_las_transiciones(self):
+        """El índice por estado se actualiza en cada cambio, sin perder el orden por ID."""
+        proyeccion = ProyeccionEstadoTareas()
+        proyeccion.cargar([_tarea("T3"), _tarea("T1"), _tarea("T2")])
+        proyeccion.actualizar_estado("T3", "en_proceso")
+        proyeccion.actualizar_estado("T1", "en_proceso")
+
+        en_proceso = proyeccion.consultar(estado="en_proceso")
+        pendientes = proyeccion.consultar(estado="pendiente")
+
+        assert [r["tarea_id"] for r in en_proceso["tareas"]] == ["T1", "T3"]
+        assert [r["tarea_id"] for r in pendientes["tareas"]] == ["T2"]
+        assert proyeccion.consultar(estado="pausada")["total"] == 0
+
+    def test_conserva_todas_las_tareas_terminadas(self):
+        """Las tareas terminadas no se descartan: el status y el filtro las cuentan todas."""
+        proyeccion = ProyeccionEstadoTareas()
+        proyeccion.cargar([_tarea(f"T{i:04d}") for i in range(1500)])
+        cursor = proyeccion.cambios_desde()["cursor"]
+
+        for i in range(1200):
+            proyeccion.actualizar_estado(f"T{i:04d}", "completada")
+
+        completadas = proyeccion.consultar(estado="completada", limit=10, offset=1190)
+        assert completadas["total"] == 1200
+        assert [r["tarea_id"] for r in completadas["tareas"]] == [f"T{i:04d}" for i in range(1190, 1200)]
+        assert proyeccion.consultar()["total"] == 1500
+        assert proyeccion.cambios_desde(cursor)["reinicio"] is False
@@ -291,6 +291,95 @@ class TestRecoleccionService:
         mock_comunicacion_service.devolver_hormigas.assert_called_once()
         mock_entorno_service.marcar_alimento_como_recolectado.assert_called_once()
 
+    @pytest.mark.asyncio
+    @patch('src.recoleccion.services.recoleccion_service.timer_service')
+    async def test_procesar_recoleccion_concurrente(
+        self, mock_timer_service, recoleccion_service, hormiga_ejemplo
+    ):
+        """Las solicitudes de hormigas respetan el límite y el informe cubre cada alimento."""
+        import asyncio
+        
+        mock_timer_service.iniciar_tarea_timer = AsyncMock(return_value=True)
+        alimentos = [
+            Alimento(id=f"A{i}", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=300)
+            for i in range(6)
+        ]
+        alimentos[2].cantidad_hormigas_necesarias = 2
+        en_vuelo = {"actual": 0, "maximo": 0}
+        
+        async def solicitar(cantidad):
+            en_vuelo["actual"] += 1
+            en_vuelo["maximo"] = max(en_vuelo["maximo"], en_vuelo["actual"])
+            await asyncio.sleep(0.01)
+            en_vuelo["actual"] -= 1
+            # La reina no tiene hormigas para el alimento que pide dos
+            return [hormiga_ejemplo] if cantidad == 1 else []
+        recoleccion_service.solicitar_hormigas = solicitar
+        
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence:
+            mock_persistence.obtener_alimentos = AsyncMock(return_value=alimentos)
+            mock_persistence.guardar_tareas_lote = AsyncMock(return_value=True)
+            mock_persistence.actualizar_estado_tarea = AsyncMock(return_value=True)
+            mock_persistence.guardar_evento = AsyncMock(return_value=True)
+            mock_persistence.guardar_tarea = AsyncMock(return_value=True)
+            
+            informe = await recoleccion_service.procesar_recoleccion_concurrente(concurrencia=2)
+        
+        assert en_vuelo["maximo"] == 2
+        assert [r["alimento_id"] for r in informe] == [a.id for a in alimentos]
+        assert mock_persistence.guardar_tareas_lote.await_count == 1
+        resultados = [r["resultado"] for r in informe]
+        assert resultados == ["iniciada", "iniciada", "cancelada", "iniciada", "iniciada", "iniciada"]
+
+    @pytest.mark.asyncio
+    @patch('src.recoleccion.services.recoleccion_service.timer_service')
+    async def test_procesar_recoleccion_concurrente_commit_fallido(
+        self, mock_timer_service, recoleccion_service, hormiga_ejemplo
+    ):
+        """Si la transacción de una tarea no se confirma, no hay timer, sus hormigas se devuelven y el informe da error."""
+        from contextlib import asynccontextmanager
+        from types import SimpleNamespace
+        
+        mock_timer_service.iniciar_tarea_timer = AsyncMock(return_value=True)
+        alimentos = [
+            Alimento(id=f"A{i}", nombre="Fruta", cantidad_hormigas_necesarias=1, puntos_stock=10, tiempo_recoleccion=300)
+            for i in range(2)
+        ]
+        recoleccion_service.solicitar_hormigas = AsyncMock(return_value=[hormiga_ejemplo])
+        unidades = []
+        abierta = []
+        
+        @asynccontextmanager
+        async def unidad_de_trabajo():
+            # Las unidades anidadas se unen a la exterior; la segunda exterior no se confirma
+            if abierta:
+                yield abierta[0]
+                return
+            unidad = SimpleNamespace(confirmada=False, cancelar=lambda: None)
+            unidades.append(unidad)
+            abierta.append(unidad)
+            try:
+                yield unidad
+            finally:
+                abierta.clear()
+            unidad.confirmada = len(unidades) == 1
+        
+        with patch('src.recoleccion.services.persistence_service.persistence_service', new_callable=AsyncMock) as mock_persistence:
+            mock_persistence.obtener_alimentos = AsyncMock(return_value=alimentos)
+            mock_persistence.crear_lote_hormigas = AsyncMock(return_value=(True, None))
+            mock_persistence.guardar_hormigas_en_lote = AsyncMock(return_value=(True, None))
+            mock_persistence.verificar_lote_disponible = AsyncMock(return_value=(False, "Lote no encontrado"))
+            mock_persistence.unidad_de_trabajo = unidad_de_trabajo
+            
+            informe = await recoleccion_service.procesar_recoleccion_concurrente()
+        
+        assert [r["resultado"] for r in informe] == ["iniciada", "error"]
+        assert mock_timer_service.iniciar_tarea_timer.await_count == 1
+        fallida = recoleccion_service.registro_tareas.obtener(informe[1]["tarea_id"])
+        assert fallida.estado == EstadoTarea.PENDIENTE
+        assert fallida.hormigas_asignadas == []
+        recoleccion_service.comunicacion_service.devolver_hormigas.assert_awaited_once_with([hormiga_ejemplo], 0)
+
     @pytest.mark.asyncio
     @patch('src.recoleccion.services.recoleccion_service.timer_service')
     async def test_iniciar_tarea_con_hormigas_lote_id(
@@ -489,3 +578,30 @@ class TestRecoleccionService:
         # Assert: aun así la tarea se mueve a completadas
         assert tarea not in recoleccion_service.tareas_activas
         assert tarea in recoleccion_service.tareas_completadas
+
+    @pytest.mark.asyncio
+    async def test_recuperar_tareas_en_proceso_rearma_timers(self, recoleccion_service, alimento_ejemplo):
+        """Al arrancar se reprograman las tareas en proceso con su tiempo restante."""
+        from datetime import timedelta
+        from src.recoleccion.services.timer_service import TimerService
+
+        vencida = TareaRecoleccion(id="T_VENCIDA", alimento=alimento_ejemplo, estado=EstadoTarea.EN_PROCESO)
+        vencida.fecha_inicio = datetime.now() - timedelta(seconds=600)
+        en_curso = TareaRecoleccion(id="T_EN_CURSO", alimento=alimento_ejemplo, estado=EstadoTarea.EN_PROCESO)
+        en_curso.fecha_inicio = datetime.now() - timedelta(seconds=100)
+        timer = TimerService()
+
+        with patch('src.recoleccion.services.persistence_service.persistence_service') as mock_persistence, \
+                patch('src.recoleccion.services.recoleccion_service.timer_service', timer):
+            mock_persistence.obtener_tareas_por_estado = AsyncMock(return_value=[vencida, en_curso])
+
+            resumen = await recoleccion_service.recuperar_tareas_en_proceso()
+            # Una segunda recuperación no duplica timers
+            repetido = await recoleccion_service.recuperar_tareas_en_proceso()
+
+        mock_persistence.obtener_tareas_por_estado.assert_awaited_with(EstadoTarea.EN_PROCESO)
+        assert resumen == {"recuperadas": 2, "vencidas": 1}
+        assert repetido == {"recuperadas": 0, "vencidas": 0}
+        assert recoleccion_service.obtener_tarea("T_VENCIDA") is vencida
+        assert 195 <= timer.get_tiempo_restante("T_EN_CURSO") <= 200
+        await timer.cleanup()
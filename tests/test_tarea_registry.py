@@ -0,0 +1,115 @@
+"""
+Pruebas unitarias para el registro indexado de tareas.
+"""
+
+import pytest
+
+from src.recoleccion.services.tarea_registry import TareaRegistry, TareasView, ACTIVAS, COMPLETADAS
+from src.recoleccion.models.tarea_recoleccion import TareaRecoleccion
+from src.recoleccion.models.alimento import Alimento
+from src.recoleccion.models.estado_tarea import EstadoTarea
+
+
+class TestTareaRegistry:
+    """Pruebas para TareaRegistry y TareasView."""
+
+    @pytest.fixture
+    def alimento(self):
+        """Alimento de ejemplo para las pruebas."""
+        return Alimento(
+            id="A1",
+            nombre="Fruta",
+            cantidad_hormigas_necesarias=1,
+            puntos_stock=10,
+            tiempo_recoleccion=60
+        )
+
+    def test_registrar_y_obtener_por_id(self, alimento):
+        """Prueba la búsqueda exacta y tolerante a mayúsculas."""
+        registro = TareaRegistry()
+        tarea = TareaRecoleccion(id="T1", alimento=alimento)
+        registro.registrar(tarea)
+
+        assert registro.obtener("T1") is tarea
+        assert registro.obtener(" t1 ") is tarea
+        assert registro.obtener("t1", ignorar_mayusculas=False) is None
+        assert registro.grupo_de("T1") == ACTIVAS
+
+    def test_mover_entre_grupos_mantiene_un_solo_grupo(self, alimento):
+        """Una tarea solo puede pertenecer a un grupo a la vez."""
+        registro = TareaRegistry()
+        tarea = TareaRecoleccion(id="T1", alimento=alimento)
+        activas = TareasView(registro, ACTIVAS)
+        completadas = TareasView(registro, COMPLETADAS)
+
+        activas.append(tarea)
+        completadas.append(tarea)
+
+        assert tarea not in activas
+        assert tarea in completadas
+        assert len(registro) == 1
+
+    def test_indices_por_estado_y_alimento(self, alimento):
+        """Prueba los índices secundarios por estado y por alimento."""
+        registro = TareaRegistry()
+        t1 = TareaRecoleccion(id="T1", alimento=alimento)
+        t2 = TareaRecoleccion(id="T2", alimento=alimento, estado=EstadoTarea.EN_PROCESO)
+        registro.registrar(t1)
+        registro.registrar(t2)
+
+        assert registro.por_estado(EstadoTarea.PENDIENTE) == [t1]
+        assert registro.por_estado(EstadoTarea.EN_PROCESO) == [t2]
+        assert {t.id for t in registro.por_alimento("A1")} == {"T1", "T2"}
+
+        # Cambio de estado directo sobre el modelo: la consulta revalida
+        t2.estado = EstadoTarea.COMPLETADA
+        assert registro.por_estado(EstadoTarea.EN_PROCESO) == []
+        assert registro.por_estado(EstadoTarea.COMPLETADA) == [t2]
+
+    def test_por_estado_ve_cambios_directos_sobre_el_modelo(self, alimento):
+        """El nuevo estado aparece aunque se consulte antes que el anterior."""
+        registro = TareaRegistry()
+        tarea = TareaRecoleccion(id="T1", alimento=alimento)
+        registro.registrar(tarea)
+
+        tarea.estado = EstadoTarea.CANCELADA
+        assert registro.por_estado(EstadoTarea.CANCELADA) == [tarea]
+        assert registro.por_estado(EstadoTarea.PENDIENTE) == []
+
+        # Una tarea eliminada deja de reindexarse
+        registro.eliminar("T1")
+        tarea.estado = EstadoTarea.PENDIENTE
+        assert registro.por_estado(EstadoTarea.PENDIENTE) == []
+
+    def test_vista_compatible_con_lista(self, alimento):
+        """La vista conserva la interfaz de las antiguas listas."""
+        registro = TareaRegistry()
+        activas = TareasView(registro, ACTIVAS)
+        t1 = TareaRecoleccion(id="T1", alimento=alimento)
+        t2 = TareaRecoleccion(id="T2", alimento=alimento)
+
+        activas.append(t1)
+        activas.append(t2)
+
+        assert len(activas) == 2
+        assert activas[0] is t1
+        assert activas == [t1, t2]
+        assert activas + [] == [t1, t2]
+
+        activas.remove(t1)
+        assert list(activas) == [t2]
+        assert registro.obtener("T1") is None
+        with pytest.raises(ValueError):
+            activas.remove(t1)
+
+    def test_reemplazar_grupo(self, alimento):
+        """Asignar una lista a un grupo reemplaza su contenido."""
+        registro = TareaRegistry()
+        t1 = TareaRecoleccion(id="T1", alimento=alimento)
+        t2 = TareaRecoleccion(id="T2", alimento=alimento)
+        registro.registrar(t1)
+
+        registro.reemplazar_grupo(ACTIVAS, [t2])
+
+        assert registro.obtener("T1") is None
+        assert registro.obtener("T2") is t2
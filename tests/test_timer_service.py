@@ -270,3 +270,161 @@ class TestTimerService:
 
         assert resultado is False
 
+
+
+class TestPlanificadorTimers:
+    """Pruebas del planificador único basado en heap."""
+
+    @staticmethod
+    def _crear_tarea(tarea_id: str, tiempo: float) -> TareaRecoleccion:
+        alimento = Alimento(
+            id=f"A_{tarea_id}",
+            nombre="Fruta",
+            cantidad_hormigas_necesarias=1,
+            puntos_stock=10,
+            tiempo_recoleccion=tiempo,
+        )
+        tarea = TareaRecoleccion(id=tarea_id, alimento=alimento)
+        tarea.agregar_hormiga(Hormiga(id=f"H_{tarea_id}", capacidad_carga=5, estado=EstadoHormiga.DISPONIBLE))
+        return tarea
+
+    @pytest.mark.asyncio
+    async def test_un_solo_planificador_completa_en_orden_de_vencimiento(self):
+        """Muchas tareas comparten un planificador y se completan por orden de fin."""
+        timer_service = TimerService()
+        completadas = []
+
+        async def callback(t, evento):
+            if evento == "completada":
+                completadas.append(t.id)
+
+        timer_service.add_callback(callback)
+        tareas_antes = len(asyncio.all_tasks())
+
+        for i, tiempo in enumerate([0.06, 0.02, 0.04]):
+            await timer_service.iniciar_tarea_timer(self._crear_tarea(f"T{i}", tiempo))
+        for i in range(100):
+            await timer_service.iniciar_tarea_timer(self._crear_tarea(f"L{i}", 0.03))
+
+        assert len(asyncio.all_tasks()) == tareas_antes + 1
+        await asyncio.sleep(0.15)
+
+        assert completadas.index("T1") < completadas.index("T2") < completadas.index("T0")
+        assert len(completadas) == 103
+        assert len(timer_service.tareas_en_proceso) == 0
+        assert len(timer_service.timer_tasks) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelar_no_completa_y_compacta_el_heap(self):
+        """Las tareas canceladas no se completan y sus entradas se descartan."""
+        timer_service = TimerService()
+        completadas = []
+
+        async def callback(t, evento):
+            if evento == "completada":
+                completadas.append(t.id)
+
+        timer_service.add_callback(callback)
+        for i in range(200):
+            await timer_service.iniciar_tarea_timer(self._crear_tarea(f"T{i}", 0.05))
+        for i in range(150):
+            assert await timer_service.cancelar_tarea(f"T{i}") is True
+
+        assert len(timer_service._heap) < 200
+        await asyncio.sleep(0.1)
+
+        assert sorted(completadas) == sorted(f"T{i}" for i in range(150, 200))
+        await timer_service.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_callback_por_lotes_recibe_las_vencidas_juntas(self):
+        """Las tareas que vencen en el mismo tick llegan en una sola llamada por lotes."""
+        timer_service = TimerService()
+        lotes = []
+        individuales = []
+
+        async def callback(t, evento):
+            if evento == "completada":
+                individuales.append(t.id)
+
+        async def callback_lote(tareas, evento):
+            lotes.append((evento, sorted(t.id for t in tareas)))
+
+        timer_service.add_callback(callback, callback_lote=callback_lote)
+        for i in range(20):
+            await timer_service.iniciar_tarea_timer(self._crear_tarea(f"T{i:02d}", 0.02))
+        await asyncio.sleep(0.08)
+
+        assert individuales == []
+        assert sum(len(ids) for _, ids in lotes) == 20
+        assert len(lotes) < 20
+        assert all(evento == "completada" for evento, _ in lotes)
+        assert len(timer_service.tareas_en_proceso) == 0
+
+    @pytest.mark.asyncio
+    async def test_error_en_un_lote_no_detiene_el_planificador(self):
+        """Si un lote falla, el planificador sigue completando los siguientes."""
+        timer_service = TimerService()
+        completadas = []
+        completar_lote = timer_service._completar_lote
+        fallos = []
+
+        async def completar_con_fallo(tareas):
+            if not fallos:
+                fallos.append([t.id for t in tareas])
+                raise RuntimeError("fallo en el lote")
+            await completar_lote(tareas)
+
+        async def callback(t, evento):
+            if evento == "completada":
+                completadas.append(t.id)
+
+        timer_service._completar_lote = completar_con_fallo
+        timer_service.add_callback(callback)
+        await timer_service.iniciar_tarea_timer(self._crear_tarea("T0", 0.01))
+        await timer_service.iniciar_tarea_timer(self._crear_tarea("T1", 0.05))
+        planificador = timer_service._planificador
+        await asyncio.sleep(0.1)
+
+        assert fallos == [["T0"]]
+        assert completadas == ["T1"]
+        assert timer_service._planificador is planificador
+        await timer_service.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_reanudar_no_revive_tareas_terminadas(self):
+        """Una tarea completada o cancelada no se reprograma ni cambia de estado."""
+        timer_service = TimerService()
+        for estado in (EstadoTarea.COMPLETADA, EstadoTarea.CANCELADA):
+            tarea = self._crear_tarea(f"T_{estado.value}", 60)
+            tarea.estado = estado
+            tarea.fecha_inicio = datetime.now()
+
+            assert await timer_service.reanudar_tarea_timer(tarea) is False
+            assert tarea.estado == estado
+            assert tarea.id not in timer_service.tareas_en_proceso
+        await timer_service.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_reanudar_tarea_vencida_se_completa_en_su_instante(self):
+        """Una tarea reanudada ya vencida se completa en el primer lote con su fecha de fin prevista."""
+        from datetime import timedelta
+
+        timer_service = TimerService()
+        completadas = []
+
+        async def callback(t, evento):
+            completadas.append((t.id, evento))
+
+        timer_service.add_callback(callback)
+        tarea = self._crear_tarea("T_VIEJA", 60)
+        tarea.estado = EstadoTarea.EN_PROCESO
+        tarea.fecha_inicio = datetime.now() - timedelta(seconds=300)
+
+        assert await timer_service.reanudar_tarea_timer(tarea) is True
+        assert await timer_service.reanudar_tarea_timer(tarea) is False
+        await asyncio.sleep(0.02)
+
+        assert completadas == [("T_VIEJA", "completada")]
+        assert tarea.estado == EstadoTarea.COMPLETADA
+        assert tarea.fecha_fin == tarea.fecha_inicio + timedelta(seconds=60)
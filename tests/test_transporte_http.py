@@ -0,0 +1,69 @@
+"""
+Tests del transporte HTTP compartido (configuración, cierre y latencias).
+"""
+
+import httpx
+import pytest
+
+from src.recoleccion.services import entorno_api_service as modulo_entorno
+from src.recoleccion.services.entorno_api_service import EntornoAPIService
+from src.recoleccion.services.transporte_http import HistogramaLatencia, TransporteHTTP
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, json_data=None):
+        self.status_code = status_code
+        self._json = json_data or {}
+
+    def json(self):
+        return self._json
+
+
+def test_histograma_cuenta_por_tramos_y_percentiles():
+    histograma = HistogramaLatencia([10, 100])
+    for segundos in (0.001, 0.002, 0.05, 0.5):
+        histograma.registrar(segundos)
+    histograma.registrar(0.003, error=True)
+
+    datos = histograma.como_dict()
+    assert datos["tramos_ms"] == {"<=10": 3, "<=100": 1, ">100": 1}
+    assert (datos["peticiones"], datos["errores"]) == (5, 1)
+    assert datos["p50_ms"] == 10.0
+    assert datos["p99_ms"] == 500.0
+
+
+@pytest.mark.asyncio
+async def test_crear_cliente_aplica_la_configuracion_compartida():
+    transporte = TransporteHTTP(
+        max_conexiones=7, max_keepalive=3, keepalive_expiry=9, timeout_conexion=2, http2=False
+    )
+    cliente = transporte.crear_cliente("entorno", timeout=12)
+
+    assert cliente.timeout == httpx.Timeout(12, connect=2)
+    assert transporte.obtener_metricas()["clientes_abiertos"] == 1
+
+    await transporte.cerrar()
+    assert cliente.is_closed
+    assert transporte.obtener_metricas()["clientes_abiertos"] == 0
+
+
+@pytest.mark.asyncio
+async def test_servicio_registra_latencias_y_reabre_cliente_cerrado(monkeypatch):
+    transporte = TransporteHTTP(http2=False)
+    monkeypatch.setattr(modulo_entorno, "transporte_http", transporte)
+    service = EntornoAPIService(base_url="http://fake")
+    await transporte.cerrar()
+
+    await service._make_request("GET", "/resources")
+    assert service.client.is_closed is False
+
+    async def fake_request(method, url, **kwargs):
+        return FakeResponse(503)
+
+    service.client.request = fake_request  # type: ignore[assignment]
+    await service._make_request("GET", "/resources")
+
+    latencias = transporte.obtener_metricas()["latencias"]["entorno"]
+    assert latencias["peticiones"] == 2
+    assert latencias["errores"] == 2
+    await service.cerrar()